@@ -0,0 +1,69 @@
+"""search indexes
+
+Revision ID: 9c1d2e7f4a10
+Revises: 4228e44add37
+Create Date: 2026-10-18 10:12:40.118532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1d2e7f4a10'
+down_revision: Union[str, Sequence[str], None] = '4228e44add37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_flights_outbound',
+        'flights',
+        ['from_airport', 'date', 'to_airport'],
+        postgresql_where=sa.text("status = 'SCHEDULED'"),
+    )
+    op.create_index(
+        'ix_flights_return',
+        'flights',
+        ['to_airport', 'date', 'from_airport'],
+        postgresql_where=sa.text("status = 'SCHEDULED'"),
+    )
+    op.create_index(
+        'ix_hotels_location_price',
+        'hotels',
+        ['location', 'price_per_night', 'id'],
+    )
+    op.create_index(
+        'ix_hotel_availability_window',
+        'hotel_availability',
+        ['hotel_id', 'date_from', 'date_to'],
+        postgresql_include=['max_guests'],
+        postgresql_where=sa.text('is_available'),
+    )
+    op.create_index(
+        'ix_hotel_availability_dates',
+        'hotel_availability',
+        ['date_to', 'date_from'],
+        postgresql_include=['hotel_id', 'max_guests'],
+        postgresql_where=sa.text('is_available'),
+    )
+    op.create_index(
+        'ix_transfers_location_price',
+        'transfers',
+        ['location', 'price', 'id'],
+        postgresql_where=sa.text('available'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transfers_location_price', table_name='transfers')
+    op.drop_index('ix_hotel_availability_dates', table_name='hotel_availability')
+    op.drop_index('ix_hotel_availability_window', table_name='hotel_availability')
+    op.drop_index('ix_hotels_location_price', table_name='hotels')
+    op.drop_index('ix_flights_return', table_name='flights')
+    op.drop_index('ix_flights_outbound', table_name='flights')
@@ -0,0 +1,43 @@
+"""price calendar
+
+Revision ID: a8c15e2f7b63
+Revises: f5a83c6e9d41
+Create Date: 2026-10-18 19:12:46.017385
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c15e2f7b63'
+down_revision: Union[str, Sequence[str], None] = 'f5a83c6e9d41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('price_calendar',
+    sa.Column('origin', sa.String(length=10), nullable=False),
+    sa.Column('nights', sa.Integer(), nullable=False),
+    sa.Column('date_from', sa.Date(), nullable=False),
+    sa.Column('destination', sa.String(length=100), nullable=False),
+    sa.Column('outbound_flight_id', sa.Integer(), nullable=False),
+    sa.Column('return_flight_id', sa.Integer(), nullable=False),
+    sa.Column('hotel_id', sa.Integer(), nullable=False),
+    sa.Column('transfer_id', sa.Integer(), nullable=False),
+    sa.Column('flights_price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('hotel_price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('transfer_price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('total_price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('origin', 'nights', 'date_from', 'destination')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('price_calendar')
@@ -0,0 +1,40 @@
+"""watchdog indexes
+
+Revision ID: b41f6a0c2d93
+Revises: 9c1d2e7f4a10
+Create Date: 2026-10-18 15:40:12.503117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41f6a0c2d93'
+down_revision: Union[str, Sequence[str], None] = '9c1d2e7f4a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_news_events_unprocessed',
+        'news_events',
+        ['id'],
+        postgresql_where=sa.text('NOT processed'),
+    )
+    op.create_index(
+        'ix_stays_hotel_dates',
+        'stays',
+        ['hotel_id', 'date_from', 'date_to'],
+        postgresql_where=sa.text("status <> 'CANCELLED'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_stays_hotel_dates', table_name='stays')
+    op.drop_index('ix_news_events_unprocessed', table_name='news_events')
@@ -0,0 +1,32 @@
+"""news events location index
+
+Revision ID: d7e2a9b35c18
+Revises: b41f6a0c2d93
+Create Date: 2026-10-18 16:22:51.904310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7e2a9b35c18'
+down_revision: Union[str, Sequence[str], None] = 'b41f6a0c2d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_news_events_location_start',
+        'news_events',
+        ['location', 'start_time'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_news_events_location_start', table_name='news_events')
@@ -0,0 +1,107 @@
+"""alert unread counts
+
+Revision ID: e3f0c4a81b27
+Revises: d7e2a9b35c18
+Create Date: 2026-10-18 17:05:33.218640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3f0c4a81b27'
+down_revision: Union[str, Sequence[str], None] = 'd7e2a9b35c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# triggery na poziomie instrukcji (tabele przejsciowe) - INSERT ... SELECT
+# watchdoga i zbiorcze oznaczanie jako przeczytane to jedna aktualizacja
+# licznika na pobyt, nie na wiersz; nowe i przeczytane alerty -> NOTIFY
+# alerts (stay_id)
+UNREAD_COUNTS_FUNCTION = """
+CREATE FUNCTION alerts_unread_counts() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO alert_unread_counts (stay_id, unread)
+        SELECT stay_id, count(*) FROM new_rows WHERE NOT read GROUP BY stay_id
+        ON CONFLICT (stay_id) DO UPDATE
+            SET unread = alert_unread_counts.unread + EXCLUDED.unread;
+
+        PERFORM pg_notify('alerts', stay_id::text)
+        FROM (SELECT DISTINCT stay_id FROM new_rows) AS changed;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO alert_unread_counts (stay_id, unread)
+        SELECT stay_id, sum(delta) FROM (
+            SELECT stay_id, CASE WHEN read THEN 0 ELSE 1 END AS delta FROM new_rows
+            UNION ALL
+            SELECT stay_id, CASE WHEN read THEN 0 ELSE -1 END AS delta FROM old_rows
+        ) AS changes
+        GROUP BY stay_id
+        HAVING sum(delta) <> 0
+        ON CONFLICT (stay_id) DO UPDATE
+            SET unread = alert_unread_counts.unread + EXCLUDED.unread;
+
+        PERFORM pg_notify('alerts', stay_id::text)
+        FROM (SELECT DISTINCT stay_id FROM new_rows) AS changed;
+    ELSE
+        UPDATE alert_unread_counts AS c
+        SET unread = c.unread - d.unread
+        FROM (
+            SELECT stay_id, count(*) AS unread FROM old_rows WHERE NOT read GROUP BY stay_id
+        ) AS d
+        WHERE c.stay_id = d.stay_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+TRIGGERS = (
+    ("alerts_unread_insert", "INSERT", "NEW TABLE AS new_rows"),
+    ("alerts_unread_update", "UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+    ("alerts_unread_delete", "DELETE", "OLD TABLE AS old_rows"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('alert_unread_counts',
+    sa.Column('stay_id', sa.Integer(), nullable=False),
+    sa.Column('unread', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['stay_id'], ['stays.id'], ),
+    sa.PrimaryKeyConstraint('stay_id')
+    )
+    op.create_index(
+        'ix_alerts_stay_created',
+        'alerts',
+        ['stay_id', 'created_at', 'id'],
+    )
+
+    op.execute(
+        "INSERT INTO alert_unread_counts (stay_id, unread) "
+        "SELECT stay_id, count(*) FROM alerts WHERE NOT read GROUP BY stay_id"
+    )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(UNREAD_COUNTS_FUNCTION)
+        for name, operation, transition in TRIGGERS:
+            op.execute(
+                f"CREATE TRIGGER {name} AFTER {operation} ON alerts "
+                f"REFERENCING {transition} "
+                "FOR EACH STATEMENT EXECUTE FUNCTION alerts_unread_counts()"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        for name, _, _ in TRIGGERS:
+            op.execute(f"DROP TRIGGER {name} ON alerts")
+        op.execute("DROP FUNCTION alerts_unread_counts()")
+
+    op.drop_index('ix_alerts_stay_created', table_name='alerts')
+    op.drop_table('alert_unread_counts')
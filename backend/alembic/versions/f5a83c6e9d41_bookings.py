@@ -0,0 +1,62 @@
+"""bookings
+
+Revision ID: f5a83c6e9d41
+Revises: e3f0c4a81b27
+Create Date: 2026-10-18 18:31:07.442915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5a83c6e9d41'
+down_revision: Union[str, Sequence[str], None] = 'e3f0c4a81b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'hotel_availability',
+        sa.Column('version', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    )
+    op.create_table('bookings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('stay_id', sa.Integer(), nullable=False),
+    sa.Column('return_flight_id', sa.Integer(), nullable=False),
+    sa.Column('availability_id', sa.Integer(), nullable=False),
+    sa.Column('guests', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('idempotency_key', sa.String(length=100), nullable=True),
+    sa.Column('request_hash', sa.String(length=64), nullable=False),
+    sa.Column('payment_token', sa.String(length=200), nullable=True),
+    sa.Column('payment_reference', sa.String(length=100), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.CheckConstraint("status IN ('PENDING', 'PROCESSING', 'CONFIRMED', 'FAILED')", name='booking_status_check'),
+    sa.ForeignKeyConstraint(['availability_id'], ['hotel_availability.id'], ),
+    sa.ForeignKeyConstraint(['return_flight_id'], ['flights.id'], ),
+    sa.ForeignKeyConstraint(['stay_id'], ['stays.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'idempotency_key', name='uq_bookings_idempotency')
+    )
+    op.create_index(
+        'ix_bookings_payment_queue',
+        'bookings',
+        ['status', 'updated_at'],
+        postgresql_where=sa.text("status IN ('PENDING', 'PROCESSING')"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bookings_payment_queue', table_name='bookings')
+    op.drop_table('bookings')
+    op.drop_column('hotel_availability', 'version')
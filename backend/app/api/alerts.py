@@ -1,8 +1,65 @@
-from fastapi import APIRouter
+from typing import List, Optional
 
-router = APIRouter()
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
 
+from app.database import SessionLocal
+from app.schemas.alert import AlertPage, MarkReadRequest, MarkReadResponse, UnreadCounts
+from app.packages.alerts.alert_service import InvalidCursor, list_alerts, mark_read, unread_counts
+from app.packages.alerts.notifications import alert_broker, alert_stream
 
-@router.get("/alerts")
-def list_alerts():
-    return {"alerts": []}
+router = APIRouter(prefix="/alerts", tags=["Alerts"])
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@router.get("", response_model=AlertPage)
+def get_alerts(
+    stay_id: Optional[List[int]] = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    unread_only: bool = False,
+    db: Session = Depends(get_db),
+):
+    try:
+        items, next_cursor = list_alerts(db, stay_id, limit, cursor, unread_only)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return AlertPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/unread", response_model=UnreadCounts)
+def get_unread(stay_id: Optional[List[int]] = Query(default=None), db: Session = Depends(get_db)):
+    counts = unread_counts(db, stay_id)
+    return UnreadCounts(counts=counts, total=sum(counts.values()))
+
+
+@router.post("/read", response_model=MarkReadResponse)
+def read_alerts(request: MarkReadRequest, db: Session = Depends(get_db)):
+    updated = mark_read(db, request.ids, request.stay_ids)
+    if updated:
+        # strumienie tego procesu od razu - bez NOTIFY (sqlite) odpytywanie
+        # widzi tylko nowe alerty, nie przeczytane
+        alert_broker.publish(set(request.stay_ids) if request.stay_ids and not request.ids else None)
+    return MarkReadResponse(updated=updated)
+
+
+@router.get("/stream")
+def stream_alerts(
+    stay_id: Optional[List[int]] = Query(default=None),
+    last_event_id: Optional[int] = Header(default=None),
+):
+    # EventSource po zerwaniu polaczenia wysyla Last-Event-ID - bez luk
+    return StreamingResponse(
+        alert_stream(stay_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
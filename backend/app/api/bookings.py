@@ -1,8 +1,75 @@
-from fastapi import APIRouter
+from typing import List, Optional
 
-router = APIRouter()
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy.orm import Session
 
+from app.database import SessionLocal
+from app.models import Booking
+from app.schemas.booking import BookingCreate, BookingRead
+from app.packages.booking.db_service import (
+    BookingDBService,
+    BookingError,
+    IdempotencyConflict,
+    SoldOut,
+)
+from app.packages.booking.payment_queue import payment_queue
 
-@router.get("/bookings")
-def list_bookings():
-    return {"bookings": []}
+router = APIRouter(prefix="/bookings", tags=["Bookings"])
+
+bookings = BookingDBService()
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@router.post("", response_model=BookingRead, status_code=202)
+def create_booking(
+    data: BookingCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, max_length=100),
+    db: Session = Depends(get_db),
+):
+    """Rezerwuje noce i zwraca od razu (202, PENDING) - platnosc idzie
+    przez kolejke. Powtorzenie z tym samym Idempotency-Key zwraca te sama
+    rezerwacje (200)."""
+    try:
+        booking, created = bookings.create_booking(db, data, idempotency_key)
+    except (SoldOut, IdempotencyConflict) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except BookingError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    if created:
+        payment_queue.enqueue(booking.id)
+    else:
+        response.status_code = 200
+
+    return booking
+
+
+@router.get("", response_model=List[BookingRead])
+def list_bookings(
+    user_id: int,
+    limit: int = Query(default=20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    return (
+        db.query(Booking)
+        .filter(Booking.user_id == user_id)
+        .order_by(Booking.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+@router.get("/{booking_id}", response_model=BookingRead)
+def get_booking(booking_id: int, db: Session = Depends(get_db)):
+    booking = db.get(Booking, booking_id)
+    if booking is None:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    return booking
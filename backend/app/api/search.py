@@ -1,9 +1,41 @@
-from fastapi import APIRouter, Depends
+from datetime import date
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal
-from app.schemas.search import SearchPreferences, SearchResponse
-from app.packages.stays.search_service import search_stays
+from app.schemas.search import (
+    BatchSearchRequest,
+    BatchSearchResponse,
+    PriceCalendarResponse,
+    SearchPage,
+    SearchPreferences,
+    SearchResponse,
+)
+from app.packages.stays.search_cache import (
+    search_cache,
+    search_stays_batch_cached,
+    search_stays_cached,
+    search_stays_cached_async,
+)
+from app.packages.metrics.registry import span
+from app.packages.metrics.profiling import sampled_profile
+from app.packages.stays.pagination_service import InvalidCursor, search_page
+from app.packages.stays.price_calendar_service import (
+    PRICE_CALENDAR_NIGHTS,
+    CalendarNotReady,
+    read_calendar,
+)
+from app.packages.stays.response_json import dumps
+from app.packages.stays.single_flight import CoalescingTimeout, single_flight
+from app.packages.stays.stream_search_service import (
+    stream_search_events,
+    to_ndjson,
+    to_sse,
+)
 
 router = APIRouter(prefix="/search", tags=["Search"])
 
@@ -16,7 +48,103 @@ def get_db():
         db.close()
 
 
+def serialized(response: BaseModel) -> Response:
+    # ten sam JSON co z response_model, bez drugiej walidacji w FastAPI
+    with span("serialize"):
+        return Response(dumps(response), media_type="application/json")
+
+
 @router.post("", response_model=SearchResponse)
+@sampled_profile("search")
 def search(prefs: SearchPreferences, db: Session = Depends(get_db)):
-    items = search_stays(db, prefs)
-    return SearchResponse(items=items)
+    try:
+        items = search_stays_cached(db, prefs)
+    except CoalescingTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return serialized(SearchResponse(items=items))
+
+
+@router.post("/async", response_model=SearchResponse)
+@sampled_profile("search_async")
+async def search_async(prefs: SearchPreferences):
+    try:
+        items = await search_stays_cached_async(prefs)
+    except CoalescingTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return serialized(SearchResponse(items=items))
+
+
+@router.post("/batch", response_model=BatchSearchResponse)
+@sampled_profile("search_batch")
+def search_batch(request: BatchSearchRequest, db: Session = Depends(get_db)):
+    results = search_stays_batch_cached(db, request.queries)
+    return serialized(BatchSearchResponse(results=[SearchResponse(items=items) for items in results]))
+
+
+@router.post("/stream")
+def search_stream(prefs: SearchPreferences, format: Literal["ndjson", "sse"] = "ndjson"):
+    def events():
+        # sesja zyje tyle co strumien, nie tyle co obsluga zadania
+        with SessionLocal() as db:
+            yield from stream_search_events(db, prefs)
+
+    if format == "sse":
+        return StreamingResponse(to_sse(events()), media_type="text/event-stream")
+    return StreamingResponse(to_ndjson(events()), media_type="application/x-ndjson")
+
+
+@router.post("/page", response_model=SearchPage)
+@sampled_profile("search_page")
+def search_paginated(
+    prefs: SearchPreferences,
+    limit: int = Query(default=10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    try:
+        items, next_cursor = search_page(db, prefs, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return serialized(SearchPage(items=items, next_cursor=next_cursor))
+
+
+# najwyzej tyle dni w jednym zapytaniu kalendarza
+CALENDAR_MAX_DAYS = 92
+
+
+@router.get("/calendar", response_model=PriceCalendarResponse)
+def search_calendar(
+    from_location: str,
+    date_from: date,
+    date_to: date,
+    nights: int,
+    destination: Optional[List[str]] = Query(default=None),
+    db: Session = Depends(get_db),
+):
+    if nights not in PRICE_CALENDAR_NIGHTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"nights must be one of {list(PRICE_CALENDAR_NIGHTS)}",
+        )
+    if date_to < date_from or (date_to - date_from).days >= CALENDAR_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"date range must cover 1-{CALENDAR_MAX_DAYS} days",
+        )
+
+    try:
+        cells = read_calendar(db, from_location, nights, date_from, date_to, destination)
+    except CalendarNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return serialized(PriceCalendarResponse(cells=cells))
+
+
+@router.get("/cache")
+def search_cache_stats():
+    return search_cache.stats()
+
+
+@router.get("/inflight")
+def search_inflight_stats():
+    return single_flight.stats()
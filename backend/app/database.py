@@ -6,6 +6,9 @@ from sqlalchemy.orm import sessionmaker, declarative_base
 
 load_dotenv()  
 
+# po load_dotenv - progi czytane sa z env przy imporcie
+from app.packages.metrics.slow_queries import install_slow_query_log
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 
@@ -14,6 +17,52 @@ if not DATABASE_URL:
 
 engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 
+# wolne zapytania z planem (SLOW_QUERY_MS, SLOW_QUERY_EXPLAIN) - plany
+# osobnym malym silnikiem
+install_slow_query_log(engine, explain_url=DATABASE_URL)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
+
+
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def _async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return _ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+ASYNC_POOL_SIZE = int(os.getenv("ASYNC_POOL_SIZE", "20"))
+
+_async_session_factory = None
+
+
+def get_async_sessionmaker():
+    """Sesje asynchroniczne - silnik tworzony przy pierwszym uzyciu, zeby
+    sterownik async (asyncpg) byl potrzebny tylko dla endpointow async."""
+    global _async_session_factory
+
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        options = {"pool_pre_ping": True}
+        if not ASYNC_DATABASE_URL.startswith("sqlite"):
+            options["pool_size"] = ASYNC_POOL_SIZE
+
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, **options)
+        # inny sterownik (parametry $1) - bez planow
+        install_slow_query_log(async_engine.sync_engine)
+        _async_session_factory = async_sessionmaker(
+            async_engine,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+
+    return _async_session_factory
@@ -0,0 +1,342 @@
+"""Generator danych syntetycznych w duzej skali.
+
+Ten sam seed i parametry daja zawsze te same wiersze (razem z id), wiec
+wyniki benchmarkow i testow mozna porownywac miedzy uruchomieniami.
+Wiersze ida do bazy paczkami przez Core executemany, a na PostgreSQL
+(psycopg2 / psycopg) przez COPY.
+
+    python -m app.datagen --seed 1 --airports 3 --cities 200 --days 60 \\
+        --hotels-per-city 40 --availability-density 0.8 --truncate
+"""
+from __future__ import annotations
+import argparse
+import csv
+import io
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from sqlalchemy import Table, delete, func, select, text
+from sqlalchemy.engine import Connection
+
+from app.database import engine
+from app.models.entities import (
+    Alert,
+    AlertUnreadCount,
+    Booking,
+    Flight,
+    Hotel,
+    HotelAvailability,
+    NewsEvent,
+    Stay,
+    Transfer,
+)
+
+
+CHUNK_ROWS = 50_000
+
+BASE_DATE = date(2026, 1, 1)
+
+TRANSFER_TYPES = ("BUS", "TRAIN", "TAXI")
+NEWS_TYPES = ("WEATHER_ALERT", "AIRPORT_CLOSED", "STRIKE")
+SEVERITIES = ("LOW", "MEDIUM", "HIGH")
+
+
+@dataclass(frozen=True)
+class DataSpec:
+    seed: int = 1
+    airports: int = 1          # lotniska wylotowe
+    cities: int = 5            # miasta docelowe (kod lotniska == lokalizacja)
+    days: int = 10
+    base_date: date = BASE_DATE
+
+    flights_per_route: int = 2  # na dzien, w kazda strone
+    hotels_per_city: int = 5
+    transfers_per_city: int = 3
+    news_per_city: int = 0
+
+    # czesc okien dostepnosci, ktore sa dostepne
+    availability_density: float = 0.75
+    cancelled_ratio: float = 0.05
+
+
+def airport_code(index: int) -> str:
+    """AAA, AAB, ... - 3 litery jak kody IATA."""
+    letters = []
+    for _ in range(3):
+        index, rest = divmod(index, 26)
+        letters.append(chr(ord("A") + rest))
+    return "".join(reversed(letters))
+
+
+def origin_airports(spec: DataSpec) -> List[str]:
+    return [airport_code(i) for i in range(spec.airports)]
+
+
+def destination_cities(spec: DataSpec) -> List[str]:
+    return [airport_code(spec.airports + i) for i in range(spec.cities)]
+
+
+def _rng(spec: DataSpec, table: str) -> random.Random:
+    # osobny generator na tabele - zmiana np. liczby hoteli nie zmienia lotow
+    return random.Random(f"{spec.seed}:{table}")
+
+
+# wiersze (krotki w kolejnosci kolumn z COLUMNS)
+
+COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "flights": ("id", "from_airport", "to_airport", "date", "price", "status"),
+    "hotels": ("id", "name", "location", "standard", "price_per_night", "has_wifi", "has_pool", "has_parking"),
+    "hotel_availability": ("id", "hotel_id", "date_from", "date_to", "max_guests", "is_available"),
+    "transfers": ("id", "type", "location", "price", "available"),
+    "news_events": ("id", "type", "location", "start_time", "end_time", "severity", "processed"),
+}
+
+
+def flight_rows(spec: DataSpec, first_id: int = 1) -> Iterator[Tuple]:
+    rng = _rng(spec, "flights")
+    id = first_id
+
+    for origin in origin_airports(spec):
+        for city in destination_cities(spec):
+            # kazda trasa ma swoj poziom cen
+            route_price = rng.randint(150, 900)
+
+            for day in range(spec.days):
+                flight_date = spec.base_date + timedelta(days=day)
+
+                for from_airport, to_airport in ((origin, city), (city, origin)):
+                    for _ in range(spec.flights_per_route):
+                        status = "CANCELLED" if rng.random() < spec.cancelled_ratio else "SCHEDULED"
+                        price = round(route_price * rng.uniform(0.6, 1.8), 2)
+                        yield (id, from_airport, to_airport, flight_date, price, status)
+                        id += 1
+
+
+def hotel_rows(spec: DataSpec, first_id: int = 1) -> Iterator[Tuple]:
+    rng = _rng(spec, "hotels")
+    id = first_id
+
+    for city in destination_cities(spec):
+        for n in range(spec.hotels_per_city):
+            standard = rng.randint(1, 5)
+            price = round(rng.uniform(60, 120) * standard, 2)
+            yield (
+                id,
+                f"Hotel {city} {n + 1}",
+                city,
+                standard,
+                price,
+                rng.random() < 0.8,
+                rng.random() < 0.3,
+                rng.random() < 0.5,
+            )
+            id += 1
+
+
+def availability_rows(spec: DataSpec, hotel_ids: Iterable[int], first_id: int = 1) -> Iterator[Tuple]:
+    """Kolejne okna dla kazdego hotelu, pokrywajace caly zakres dni."""
+    rng = _rng(spec, "hotel_availability")
+    id = first_id
+    end = spec.base_date + timedelta(days=spec.days + 14)
+
+    for hotel_id in hotel_ids:
+        start = spec.base_date - timedelta(days=rng.randint(0, 7))
+
+        while start < end:
+            window_end = start + timedelta(days=rng.randint(3, 21))
+            yield (
+                id,
+                hotel_id,
+                start,
+                window_end,
+                rng.choice((2, 2, 3, 4, 4, 6)),
+                rng.random() < spec.availability_density,
+            )
+            id += 1
+            start = window_end + timedelta(days=rng.randint(0, 3))
+
+
+def transfer_rows(spec: DataSpec, first_id: int = 1) -> Iterator[Tuple]:
+    rng = _rng(spec, "transfers")
+    id = first_id
+
+    for city in destination_cities(spec):
+        for n in range(spec.transfers_per_city):
+            yield (
+                id,
+                TRANSFER_TYPES[n % len(TRANSFER_TYPES)],
+                city,
+                round(rng.uniform(20, 150), 2),
+                rng.random() < 0.9,
+            )
+            id += 1
+
+
+def news_rows(spec: DataSpec, first_id: int = 1) -> Iterator[Tuple]:
+    rng = _rng(spec, "news_events")
+    id = first_id
+    base = datetime.combine(spec.base_date, datetime.min.time())
+
+    for city in destination_cities(spec):
+        for _ in range(spec.news_per_city):
+            start = base + timedelta(hours=rng.randint(0, spec.days * 24))
+            yield (
+                id,
+                rng.choice(NEWS_TYPES),
+                city,
+                start,
+                start + timedelta(hours=rng.randint(2, 72)),
+                rng.choice(SEVERITIES),
+                False,
+            )
+            id += 1
+
+
+# ladowanie
+
+def _chunks(rows: Iterable[Tuple], size: int = CHUNK_ROWS) -> Iterator[List[Tuple]]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _uses_copy(conn: Connection) -> bool:
+    return conn.dialect.name == "postgresql" and conn.dialect.driver in ("psycopg2", "psycopg")
+
+
+def _copy(conn: Connection, table: Table, columns: Sequence[str], chunk: List[Tuple]) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(chunk)
+    buffer.seek(0)
+
+    sql = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if conn.dialect.driver == "psycopg2":
+            cursor.copy_expert(sql, buffer)
+        else:
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+
+def bulk_insert(conn: Connection, table: Table, rows: Iterable[Tuple]) -> int:
+    columns = COLUMNS[table.name]
+    use_copy = _uses_copy(conn)
+    count = 0
+
+    for chunk in _chunks(rows):
+        if use_copy:
+            _copy(conn, table, columns, chunk)
+        else:
+            conn.execute(table.insert(), [dict(zip(columns, row)) for row in chunk])
+        count += len(chunk)
+
+    return count
+
+
+def _next_id(conn: Connection, table: Table) -> int:
+    return (conn.scalar(select(func.max(table.c.id))) or 0) + 1
+
+
+def _reset_sequence(conn: Connection, table: Table) -> None:
+    # id sa podawane jawnie, wiec sekwencja musi nadgonic
+    if conn.dialect.name == "postgresql":
+        conn.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+            )
+        )
+
+
+def truncate(conn: Connection) -> None:
+    """Czysci tabele oferty - razem z zaleznymi stays, alerts i bookings."""
+    if conn.dialect.name == "postgresql":
+        conn.execute(
+            text(
+                "TRUNCATE flights, hotels, hotel_availability, transfers, news_events "
+                "RESTART IDENTITY CASCADE"
+            )
+        )
+        return
+
+    for model in (Alert, AlertUnreadCount, Booking, Stay, HotelAvailability, Flight, Hotel, Transfer, NewsEvent):
+        conn.execute(delete(model.__table__))
+
+
+def generate(conn: Connection, spec: DataSpec) -> Dict[str, int]:
+    """Wstawia dane wedlug spec (dopisuje za istniejacymi id).
+
+    Zwraca liczbe wierszy na tabele. Transakcja nalezy do wywolujacego.
+    """
+    counts: Dict[str, int] = {}
+
+    hotels = Hotel.__table__
+    first_hotel_id = _next_id(conn, hotels)
+    counts["hotels"] = bulk_insert(conn, hotels, hotel_rows(spec, first_hotel_id))
+
+    hotel_ids = range(first_hotel_id, first_hotel_id + counts["hotels"])
+
+    for table, rows in (
+        (Flight.__table__, lambda first: flight_rows(spec, first)),
+        (HotelAvailability.__table__, lambda first: availability_rows(spec, hotel_ids, first)),
+        (Transfer.__table__, lambda first: transfer_rows(spec, first)),
+        (NewsEvent.__table__, lambda first: news_rows(spec, first)),
+    ):
+        counts[table.name] = bulk_insert(conn, table, rows(_next_id(conn, table)))
+
+    for model in (Flight, Hotel, HotelAvailability, Transfer, NewsEvent):
+        _reset_sequence(conn, model.__table__)
+
+    return counts
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Synthetic TripPlanner data")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--airports", type=int, default=1)
+    parser.add_argument("--cities", type=int, default=5)
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--flights-per-route", type=int, default=2)
+    parser.add_argument("--hotels-per-city", type=int, default=5)
+    parser.add_argument("--transfers-per-city", type=int, default=3)
+    parser.add_argument("--news-per-city", type=int, default=0)
+    parser.add_argument("--availability-density", type=float, default=0.75)
+    parser.add_argument("--truncate", action="store_true", help="wyczysc tabele przed generowaniem")
+    args = parser.parse_args(argv)
+
+    spec = DataSpec(
+        seed=args.seed,
+        airports=args.airports,
+        cities=args.cities,
+        days=args.days,
+        flights_per_route=args.flights_per_route,
+        hotels_per_city=args.hotels_per_city,
+        transfers_per_city=args.transfers_per_city,
+        news_per_city=args.news_per_city,
+        availability_density=args.availability_density,
+    )
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        if args.truncate:
+            truncate(conn)
+        counts = generate(conn, spec)
+
+    for table, count in counts.items():
+        print(f"{table}: {count}")
+    print(f"done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
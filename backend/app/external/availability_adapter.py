@@ -1,25 +1,82 @@
+import os
+from sqlalchemy import Select, select
 from sqlalchemy.orm import Session
 from datetime import date
-from typing import Set
+from typing import Iterable, Optional, Set
 
-from app.models.entities import HotelAvailability
+from app.models.entities import Hotel, HotelAvailability
+from app.packages.metrics.registry import instrumented
+from app.packages.stays.availability_index import (
+    AvailabilityIndex,
+    get_availability_index,
+)
 
 
+# dostepnosc z indeksu w pamieci zamiast zapytania przy kazdym wyszukiwaniu
+USE_AVAILABILITY_INDEX = os.getenv("USE_AVAILABILITY_INDEX", "0") == "1"
+
+
+def available_hotels_query(
+    date_from: date,
+    date_to: date,
+    guests: int,
+    hotel_ids: Optional[Set[int]] = None,
+    locations: Optional[Set[str]] = None,
+) -> Select:
+    q = select(HotelAvailability.hotel_id).where(
+        HotelAvailability.is_available.is_(True),
+        HotelAvailability.max_guests >= guests,
+        HotelAvailability.date_from <= date_from,
+        HotelAvailability.date_to >= date_to,
+    )
+
+    if hotel_ids is not None:
+        q = q.where(HotelAvailability.hotel_id.in_(hotel_ids))
+
+    if locations is not None:
+        q = q.join(Hotel, Hotel.id == HotelAvailability.hotel_id).where(
+            Hotel.location.in_(locations)
+        )
+
+    return q.distinct()
+
+
+@instrumented("availability")
 def get_available_hotels(
     db: Session,
     date_from: date,
     date_to: date,
     guests: int,
+    hotel_ids: Optional[Iterable[int]] = None,
 ) -> Set[int]:
-    availabilities = (
-        db.query(HotelAvailability)
-        .filter(
-            HotelAvailability.is_available.is_(True),
-            HotelAvailability.max_guests >= guests,
-            HotelAvailability.date_from <= date_from,
-            HotelAvailability.date_to >= date_to,
+    if hotel_ids is not None:
+        hotel_ids = set(hotel_ids)
+        if not hotel_ids:
+            return set()
+
+    if USE_AVAILABILITY_INDEX:
+        return get_availability_index(db).covering(
+            date_from,
+            date_to,
+            guests,
+            hotel_ids,
         )
-        .all()
+
+    return set(
+        db.scalars(available_hotels_query(date_from, date_to, guests, hotel_ids))
     )
 
-    return {a.hotel_id for a in availabilities}
+
+@instrumented("availability.windows")
+def get_availability_windows(
+    db: Session,
+    hotel_ids: Set[int],
+    guests: int,
+    latest_start: date,
+    earliest_end: date,
+) -> AvailabilityIndex:
+    """Okna dostepnosci do sprawdzania wielu par dat naraz (covering)."""
+    if USE_AVAILABILITY_INDEX:
+        return get_availability_index(db)
+
+    return AvailabilityIndex.load_range(db, hotel_ids, guests, latest_start, earliest_end)
@@ -1,39 +1,147 @@
+from sqlalchemy import Select, select
 from sqlalchemy.orm import Session
-from datetime import date
-from typing import List
+from datetime import date, timedelta
+from typing import List, Sequence
 
 from app.models.entities import Flight
+from app.packages.inventory.records import FLIGHT_COLUMNS, FlightRecord, fetch_records, use_records
+from app.packages.inventory.snapshot import get_inventory_snapshot
+from app.packages.metrics.registry import instrumented
 
 
-def get_outbound_flights(
-    db: Session,
+def outbound_flights_query(
     from_airport: str,
     date_from: date,
     to_airport: str | None = None,
-) -> List[Flight]:
-    q = db.query(Flight).filter(
+    columns: Sequence = (Flight,),
+) -> Select:
+    q = select(*columns).where(
         Flight.from_airport == from_airport,
         Flight.date == date_from,
         Flight.status == "SCHEDULED",
     )
 
     if to_airport:
-        q = q.filter(Flight.to_airport == to_airport)
+        q = q.where(Flight.to_airport == to_airport)
+
+    return q.order_by(Flight.id)
 
-    return q.all()
+
+def return_flights_query(
+    to_airport: str,
+    date_to: date,
+    columns: Sequence = (Flight,),
+) -> Select:
+    return (
+        select(*columns)
+        .where(
+            Flight.to_airport == to_airport,
+            Flight.date == date_to,
+            Flight.status == "SCHEDULED",
+        )
+        .order_by(Flight.id)
+    )
 
 
+@instrumented("flights.outbound")
+def get_outbound_flights(
+    db: Session,
+    from_airport: str,
+    date_from: date,
+    to_airport: str | None = None,
+) -> List[Flight]:
+    snapshot = get_inventory_snapshot(db)
+    if snapshot is not None:
+        return snapshot.outbound_flights(from_airport, date_from, to_airport)
+
+    if use_records():
+        return fetch_records(
+            db,
+            outbound_flights_query(from_airport, date_from, to_airport, FLIGHT_COLUMNS),
+            FlightRecord,
+        )
+
+    return db.scalars(outbound_flights_query(from_airport, date_from, to_airport)).all()
+
+
+@instrumented("flights.return")
 def get_return_flights(
     db: Session,
     to_airport: str,
     date_to: date,
 ) -> List[Flight]:
-    return (
-        db.query(Flight)
-        .filter(
+    snapshot = get_inventory_snapshot(db)
+    if snapshot is not None:
+        return snapshot.return_flights(to_airport, date_to)
+
+    if use_records():
+        return fetch_records(db, return_flights_query(to_airport, date_to, FLIGHT_COLUMNS), FlightRecord)
+
+    return db.scalars(return_flights_query(to_airport, date_to)).all()
+
+
+def _days(first_day: date, last_day: date) -> List[date]:
+    return [first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+
+
+@instrumented("flights.outbound_range")
+def get_outbound_flights_between(
+    db: Session,
+    from_airport: str,
+    first_day: date,
+    last_day: date,
+    to_airport: str | None = None,
+) -> List[Flight]:
+    snapshot = get_inventory_snapshot(db)
+    if snapshot is not None:
+        return [
+            f
+            for day in _days(first_day, last_day)
+            for f in snapshot.outbound_flights(from_airport, day, to_airport)
+        ]
+
+    records = use_records()
+    q = select(*(FLIGHT_COLUMNS if records else (Flight,))).where(
+        Flight.from_airport == from_airport,
+        Flight.date.between(first_day, last_day),
+        Flight.status == "SCHEDULED",
+    )
+
+    if to_airport:
+        q = q.where(Flight.to_airport == to_airport)
+
+    q = q.order_by(Flight.date, Flight.id)
+    if records:
+        return fetch_records(db, q, FlightRecord)
+    return db.scalars(q).all()
+
+
+@instrumented("flights.return_range")
+def get_return_flights_between(
+    db: Session,
+    to_airport: str,
+    first_day: date,
+    last_day: date,
+) -> List[Flight]:
+    snapshot = get_inventory_snapshot(db)
+    if snapshot is not None:
+        return [
+            f
+            for day in _days(first_day, last_day)
+            for f in snapshot.return_flights(to_airport, day)
+        ]
+
+    records = use_records()
+    q = (
+        select(*(FLIGHT_COLUMNS if records else (Flight,)))
+        .where(
             Flight.to_airport == to_airport,
-            Flight.date == date_to,
+            Flight.date.between(first_day, last_day),
             Flight.status == "SCHEDULED",
         )
-        .all()
+        .order_by(Flight.date, Flight.id)
     )
+
+    if records:
+        return fetch_records(db, q, FlightRecord)
+    return db.scalars(q).all()
@@ -1,19 +1,23 @@
+from sqlalchemy import Select, select
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
 from app.models.entities import Hotel
+from app.packages.inventory.records import HOTEL_COLUMNS, HotelRecord, fetch_records, use_records
 from app.packages.stays.filter_service import apply_hotel_filters
+from app.packages.inventory.snapshot import get_inventory_snapshot
+from app.packages.metrics.registry import instrumented
 
 
-def get_hotels(
-    db: Session,
+def hotels_query(
     locations: set[str],
     min_standard: Optional[int],
     require_wifi: Optional[bool],
     require_pool: Optional[bool],
     require_parking: Optional[bool],
-) -> List[Hotel]:
-    q = db.query(Hotel).filter(Hotel.location.in_(locations))
+    columns: Sequence = (Hotel,),
+) -> Select:
+    q = select(*columns).where(Hotel.location.in_(locations))
 
     q = apply_hotel_filters(
         q,
@@ -23,4 +27,48 @@ def get_hotels(
         require_parking,
     )
 
-    return q.all()
+    return q.order_by(Hotel.id)
+
+
+@instrumented("hotels")
+def get_hotels(
+    db: Session,
+    locations: set[str],
+    min_standard: Optional[int],
+    require_wifi: Optional[bool],
+    require_pool: Optional[bool],
+    require_parking: Optional[bool],
+) -> List[Hotel]:
+    snapshot = get_inventory_snapshot(db)
+    if snapshot is not None:
+        return snapshot.hotels_in(
+            locations,
+            min_standard,
+            require_wifi,
+            require_pool,
+            require_parking,
+        )
+
+    if use_records():
+        return fetch_records(
+            db,
+            hotels_query(
+                locations,
+                min_standard,
+                require_wifi,
+                require_pool,
+                require_parking,
+                HOTEL_COLUMNS,
+            ),
+            HotelRecord,
+        )
+
+    return db.scalars(
+        hotels_query(
+            locations,
+            min_standard,
+            require_wifi,
+            require_pool,
+            require_parking,
+        )
+    ).all()
@@ -1,18 +1,34 @@
+from sqlalchemy import Select, select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Sequence
 
 from app.models.entities import Transfer
+from app.packages.inventory.records import TRANSFER_COLUMNS, TransferRecord, fetch_records, use_records
+from app.packages.inventory.snapshot import get_inventory_snapshot
+from app.packages.metrics.registry import instrumented
 
 
-def get_transfers(
-    db: Session,
-    locations: set[str],
-) -> List[Transfer]:
+def transfers_query(locations: set[str], columns: Sequence = (Transfer,)) -> Select:
     return (
-        db.query(Transfer)
-        .filter(
+        select(*columns)
+        .where(
             Transfer.location.in_(locations),
             Transfer.available.is_(True),
         )
-        .all()
+        .order_by(Transfer.id)
     )
+
+
+@instrumented("transfers")
+def get_transfers(
+    db: Session,
+    locations: set[str],
+) -> List[Transfer]:
+    snapshot = get_inventory_snapshot(db)
+    if snapshot is not None:
+        return snapshot.transfers_in(locations)
+
+    if use_records():
+        return fetch_records(db, transfers_query(locations, TRANSFER_COLUMNS), TransferRecord)
+
+    return db.scalars(transfers_query(locations)).all()
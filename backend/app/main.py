@@ -1,10 +1,72 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from app.api.search import router as search_router
+from app.api.alerts import router as alerts_router
+from app.api.bookings import router as bookings_router
+from app.database import SessionLocal, engine
+from app.packages.metrics.registry import register_pool_gauges, registry
+from app.packages.metrics.slow_queries import SLOW_QUERY_DEBUG_ENDPOINT, slow_query_log
+from app.packages.booking.payment_queue import payment_queue
+from app.packages.inventory.changes import install_change_tracking, subscribe
+from app.packages.inventory.snapshot import (
+    USE_INVENTORY_SNAPSHOT,
+    load_inventory_snapshot,
+    on_inventory_change,
+)
+from app.packages.stays.availability_index import on_availability_change
+from app.packages.stays.search_cache import search_cache
+from app.packages.stays.price_calendar_service import price_calendar
 
 
 app = FastAPI()
 app.include_router(search_router)
+app.include_router(alerts_router)
+app.include_router(bookings_router)
+
+register_pool_gauges(engine)
+
+
+@app.on_event("startup")
+def track_inventory_changes():
+    install_change_tracking(SessionLocal)
+    subscribe(on_inventory_change)
+    subscribe(on_availability_change)
+    subscribe(search_cache.on_inventory_change)
+    subscribe(price_calendar.on_inventory_change)
+
+    if USE_INVENTORY_SNAPSHOT:
+        with SessionLocal() as db:
+            load_inventory_snapshot(db)
+
+
+@app.on_event("startup")
+def start_price_calendar():
+    # pusty kalendarz budowany w tle, nie w pierwszym zapytaniu
+    price_calendar.start()
+
+
+@app.on_event("startup")
+def start_payment_queue():
+    payment_queue.start()
+
+
+@app.on_event("shutdown")
+def stop_payment_queue():
+    payment_queue.stop()
+
 
 @app.get("/")
 def read_root():
     return {"message": "TripPlanner backend running"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+# bez autoryzacji - tylko z SLOW_QUERY_DEBUG_ENDPOINT=1
+if SLOW_QUERY_DEBUG_ENDPOINT:
+    @app.get("/debug/slow-queries")
+    def slow_queries():
+        return [entry.as_dict() for entry in reversed(slow_query_log.entries())]
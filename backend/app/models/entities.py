@@ -8,7 +8,10 @@ from sqlalchemy import (
     Boolean,
     ForeignKey,
     CheckConstraint,
+    Index,
+    UniqueConstraint,
     func,
+    text,
 )
 from app.database import Base
 
@@ -32,6 +35,20 @@ class Flight(Base):
             "status IN ('SCHEDULED', 'DELAYED', 'CANCELLED')",
             name="flight_status_check",
         ),
+        Index(
+            "ix_flights_outbound",
+            "from_airport",
+            "date",
+            "to_airport",
+            postgresql_where=text("status = 'SCHEDULED'"),
+        ),
+        Index(
+            "ix_flights_return",
+            "to_airport",
+            "date",
+            "from_airport",
+            postgresql_where=text("status = 'SCHEDULED'"),
+        ),
     )
 
 
@@ -50,6 +67,10 @@ class Hotel(Base):
     has_pool = Column(Boolean, nullable=False, default=False)
     has_parking = Column(Boolean, nullable=False, default=False)
 
+    __table_args__ = (
+        Index("ix_hotels_location_price", "location", "price_per_night", "id"),
+    )
+
 
 class HotelAvailability(Base):
     __tablename__ = "hotel_availability"
@@ -64,6 +85,29 @@ class HotelAvailability(Base):
     max_guests = Column(Integer, nullable=False)
     is_available = Column(Boolean, nullable=False)
 
+    # wersja wiersza - UPDATE przez ORM sprawdza ja w WHERE (rezerwacje)
+    version = Column(Integer, nullable=False, default=0, server_default=text("0"))
+
+    __table_args__ = (
+        Index(
+            "ix_hotel_availability_window",
+            "hotel_id",
+            "date_from",
+            "date_to",
+            postgresql_include=["max_guests"],
+            postgresql_where=text("is_available"),
+        ),
+        Index(
+            "ix_hotel_availability_dates",
+            "date_to",
+            "date_from",
+            postgresql_include=["hotel_id", "max_guests"],
+            postgresql_where=text("is_available"),
+        ),
+    )
+
+    __mapper_args__ = {"version_id_col": version}
+
 
 class Transfer(Base):
     __tablename__ = "transfers"
@@ -81,6 +125,13 @@ class Transfer(Base):
             "type IN ('BUS', 'TAXI', 'TRAIN')",
             name="transfer_type_check",
         ),
+        Index(
+            "ix_transfers_location_price",
+            "location",
+            "price",
+            "id",
+            postgresql_where=text("available"),
+        ),
     )
 
 
@@ -106,6 +157,14 @@ class NewsEvent(Base):
             "severity IN ('LOW', 'MEDIUM', 'HIGH')",
             name="news_severity_check",
         ),
+        # kolejka watchdoga
+        Index(
+            "ix_news_events_unprocessed",
+            "id",
+            postgresql_where=text("NOT processed"),
+        ),
+        # pomijanie zdarzen juz zapisanych przez monitory
+        Index("ix_news_events_location_start", "location", "start_time"),
     )
 
 
@@ -132,6 +191,14 @@ class Stay(Base):
             "status IN ('PROPOSED', 'RESERVED', 'CANCELLED')",
             name="stay_status_check",
         ),
+        # pobyty hotelu nakladajace sie z okresem zdarzenia (watchdog)
+        Index(
+            "ix_stays_hotel_dates",
+            "hotel_id",
+            "date_from",
+            "date_to",
+            postgresql_where=text("status <> 'CANCELLED'"),
+        ),
     )
 
 
@@ -148,3 +215,89 @@ class Alert(Base):
 
     created_at = Column(DateTime, server_default=func.now())
     read = Column(Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        # stronicowanie alertow pobytu po (created_at, id)
+        Index("ix_alerts_stay_created", "stay_id", "created_at", "id"),
+    )
+
+
+class AlertUnreadCount(Base):
+    """Liczba nieprzeczytanych alertow pobytu - utrzymywana przez triggery
+    na alerts (migracja e3f0c4a81b27), nie liczona przy odczycie. Bez
+    triggerow (sqlite, create_all) nieuzywana - patrz counters_maintained."""
+
+    __tablename__ = "alert_unread_counts"
+
+    stay_id = Column(Integer, ForeignKey("stays.id"), primary_key=True)
+
+    unread = Column(Integer, nullable=False, default=0)
+
+
+class Booking(Base):
+    __tablename__ = "bookings"
+
+    id = Column(Integer, primary_key=True)
+
+    user_id = Column(Integer, nullable=False)
+
+    stay_id = Column(Integer, ForeignKey("stays.id"), nullable=False)
+    return_flight_id = Column(Integer, ForeignKey("flights.id"), nullable=False)
+    # okno dostepnosci zajete przez rezerwacje
+    availability_id = Column(Integer, ForeignKey("hotel_availability.id"), nullable=False)
+
+    guests = Column(Integer, nullable=False)
+    amount = Column(Numeric(10, 2), nullable=False)
+
+    status = Column(String(20), nullable=False)
+
+    idempotency_key = Column(String(100), nullable=True)
+    # hash tresci zadania - ten sam klucz z inna trescia to blad
+    request_hash = Column(String(64), nullable=False)
+
+    payment_token = Column(String(200), nullable=True)
+    payment_reference = Column(String(100), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        CheckConstraint(
+            "status IN ('PENDING', 'PROCESSING', 'CONFIRMED', 'FAILED')",
+            name="booking_status_check",
+        ),
+        UniqueConstraint("user_id", "idempotency_key", name="uq_bookings_idempotency"),
+        # kolejka platnosci
+        Index(
+            "ix_bookings_payment_queue",
+            "status",
+            "updated_at",
+            postgresql_where=text("status IN ('PENDING', 'PROCESSING')"),
+        ),
+    )
+
+
+class PriceCalendar(Base):
+    """Najtanszy pobyt na (lotnisko wylotu, liczba nocy, dzien wylotu, cel)
+    - agregat odswiezany z feedu zmian oferty (price_calendar_service)."""
+
+    __tablename__ = "price_calendar"
+
+    # kolejnosc klucza = zapytanie kalendarza: origin, nights, zakres dni
+    origin = Column(String(10), primary_key=True)
+    nights = Column(Integer, primary_key=True)
+    date_from = Column(Date, primary_key=True)
+    destination = Column(String(100), primary_key=True)
+
+    outbound_flight_id = Column(Integer, nullable=False)
+    return_flight_id = Column(Integer, nullable=False)
+    hotel_id = Column(Integer, nullable=False)
+    transfer_id = Column(Integer, nullable=False)
+
+    flights_price = Column(Numeric(10, 2), nullable=False)
+    hotel_price = Column(Numeric(10, 2), nullable=False)
+    transfer_price = Column(Numeric(10, 2), nullable=False)
+    total_price = Column(Numeric(10, 2), nullable=False)
+
+    updated_at = Column(DateTime, server_default=func.now())
@@ -1,3 +1,150 @@
-class AlertService:
-    def get_alerts(self):
-        return []
+from __future__ import annotations
+import base64
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, text, tuple_, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models import Alert, AlertUnreadCount
+
+
+# triggery z migracji e3f0c4a81b27 - bez nich (sqlite, baza z create_all)
+# alert_unread_counts nie nadaza za alertami watchdoga i oznaczaniem
+COUNT_TRIGGERS = ("alerts_unread_insert", "alerts_unread_update", "alerts_unread_delete")
+
+_counters_maintained: Dict[Engine, bool] = {}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(alert: Alert) -> str:
+    payload = json.dumps([alert.created_at.isoformat(), alert.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor") from None
+
+
+def _for_stays(query, stay_ids: Optional[Sequence[int]]):
+    if stay_ids:
+        query = query.filter(Alert.stay_id.in_(stay_ids))
+    return query
+
+
+def list_alerts(
+    db: Session,
+    stay_ids: Optional[Sequence[int]],
+    limit: int,
+    cursor: Optional[str] = None,
+    unread_only: bool = False,
+) -> Tuple[List[Alert], Optional[str]]:
+    """Alerty od najnowszych, stronicowane po (created_at, id).
+
+    Kursor to ostatni zwrocony alert - kolejna strona to zakres indeksu
+    ix_alerts_stay_created za nim, bez OFFSET.
+    """
+    query = _for_stays(db.query(Alert), stay_ids)
+    if unread_only:
+        query = query.filter(Alert.read.is_(False))
+    if cursor:
+        query = query.filter(tuple_(Alert.created_at, Alert.id) < decode_cursor(cursor))
+
+    alerts = (
+        query
+        .order_by(Alert.created_at.desc(), Alert.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+
+    next_cursor = encode_cursor(alerts[limit - 1]) if len(alerts) > limit else None
+    return alerts[:limit], next_cursor
+
+
+def counters_maintained(db: Session) -> bool:
+    """Czy alert_unread_counts utrzymuja triggery (sprawdzane raz na silnik)."""
+    engine = db.get_bind()
+    if engine not in _counters_maintained:
+        found = 0
+        if engine.dialect.name == "postgresql":
+            found = db.execute(
+                text(
+                    "SELECT count(*) FROM pg_trigger "
+                    "WHERE tgrelid = 'alerts'::regclass AND tgname = ANY(:names)"
+                ),
+                {"names": list(COUNT_TRIGGERS)},
+            ).scalar()
+        _counters_maintained[engine] = found == len(COUNT_TRIGGERS)
+    return _counters_maintained[engine]
+
+
+def unread_counts(db: Session, stay_ids: Optional[Sequence[int]]) -> Dict[int, int]:
+    """Liczniki z alert_unread_counts - bez COUNT(*) po alerts. Bez
+    triggerow licznikom nie mozna ufac - wtedy COUNT(*) po alerts
+    (ix_alerts_stay_created)."""
+    if counters_maintained(db):
+        query = db.query(AlertUnreadCount.stay_id, AlertUnreadCount.unread).filter(AlertUnreadCount.unread > 0)
+        if stay_ids:
+            query = query.filter(AlertUnreadCount.stay_id.in_(stay_ids))
+    else:
+        query = (
+            _for_stays(db.query(Alert.stay_id, func.count(Alert.id)), stay_ids)
+            .filter(Alert.read.is_(False))
+            .group_by(Alert.stay_id)
+        )
+
+    counts = {stay_id: unread for stay_id, unread in query}
+    for stay_id in stay_ids or ():
+        counts.setdefault(stay_id, 0)
+    return counts
+
+
+def mark_read(
+    db: Session,
+    ids: Optional[Sequence[int]] = None,
+    stay_ids: Optional[Sequence[int]] = None,
+) -> int:
+    """Jedno UPDATE dla wszystkich wskazanych alertow; liczniki poprawia
+    trigger (i wysyla NOTIFY). Zwraca liczbe alertow oznaczonych teraz."""
+    if not ids and not stay_ids:
+        return 0
+
+    statement = update(Alert).where(Alert.read.is_(False))
+    if ids:
+        statement = statement.where(Alert.id.in_(ids))
+    if stay_ids:
+        statement = statement.where(Alert.stay_id.in_(stay_ids))
+
+    result = db.execute(statement.values(read=True), execution_options={"synchronize_session": False})
+    db.commit()
+    return result.rowcount
+
+
+def latest_alert_id(db: Session, stay_ids: Optional[Sequence[int]]) -> int:
+    return _for_stays(db.query(func.max(Alert.id)), stay_ids).scalar() or 0
+
+
+def alerts_after(
+    db: Session,
+    stay_ids: Optional[Sequence[int]],
+    after_id: int,
+    limit: int = 100,
+) -> List[Alert]:
+    """Nowe alerty (id > after_id) w kolejnosci dodania - dla strumienia."""
+    return (
+        _for_stays(db.query(Alert), stay_ids)
+        .filter(Alert.id > after_id)
+        .order_by(Alert.id)
+        .limit(limit)
+        .all()
+    )
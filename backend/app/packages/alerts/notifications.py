@@ -0,0 +1,181 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+import time
+from typing import AsyncIterator, Iterable, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, select as sql_select
+from sqlalchemy.engine import Engine
+
+from app.database import SessionLocal, engine
+from app.models import Alert
+from app.packages.alerts.alert_service import alerts_after, latest_alert_id, unread_counts
+from app.schemas.alert import Alert as AlertSchema
+
+
+# kanal NOTIFY z triggerow alerts_unread_insert/update (payload = stay_id)
+ALERTS_CHANNEL = "alerts"
+# bez LISTEN/NOTIFY (np. sqlite) - co ile sprawdzac nowe alerty
+ALERTS_POLL_INTERVAL = float(os.getenv("ALERTS_POLL_INTERVAL", "2"))
+# komentarz SSE, zeby proxy nie zamknelo bezczynnego polaczenia
+SSE_HEARTBEAT = float(os.getenv("ALERTS_SSE_HEARTBEAT", "15"))
+# alertow na jedno odczytanie strumienia
+STREAM_BATCH = 100
+
+logger = logging.getLogger("tripplanner.alerts")
+
+
+class Subscription:
+    def __init__(self, stay_ids: Optional[Iterable[int]], loop: asyncio.AbstractEventLoop):
+        # None - wszystkie pobyty
+        self.stay_ids = set(stay_ids) if stay_ids else None
+        self.loop = loop
+        self.changed = asyncio.Event()
+
+    def wants(self, stay_ids: Optional[Set[int]]) -> bool:
+        return stay_ids is None or self.stay_ids is None or not self.stay_ids.isdisjoint(stay_ids)
+
+    def notify(self) -> None:
+        # wolane z watku nasluchu
+        self.loop.call_soon_threadsafe(self.changed.set)
+
+
+class AlertBroker:
+    """Jedno polaczenie LISTEN na proces, rozsylane do subskrypcji SSE.
+
+    Powiadomienie mowi tylko, ktore pobyty maja nowe alerty - subskrybent
+    sam dociaga je z bazy (alerts_after), wiec zgubione lub zdublowane
+    powiadomienie niczego nie psuje.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._subscriptions: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, stay_ids: Optional[Iterable[int]]) -> Subscription:
+        subscription = Subscription(stay_ids, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="alerts-listen", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, stay_ids: Optional[Set[int]]) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.wants(stay_ids):
+                subscription.notify()
+
+    def _run(self) -> None:
+        if self.engine.dialect.name == "postgresql" and self.engine.dialect.driver == "psycopg2":
+            self._listen()
+        else:
+            self._poll()
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                raw = self.engine.raw_connection()
+                # polaczenie na stale poza pula
+                raw.detach()
+                connection = raw.driver_connection
+                connection.autocommit = True
+                connection.cursor().execute(f"LISTEN {ALERTS_CHANNEL}")
+                # po (ponownym) polaczeniu mogly przepasc powiadomienia
+                self.publish(None)
+
+                while True:
+                    if select.select([connection], [], [], 5) == ([], [], []):
+                        continue
+                    connection.poll()
+                    stay_ids = set()
+                    while connection.notifies:
+                        stay_ids.add(int(connection.notifies.pop(0).payload))
+                    if stay_ids:
+                        self.publish(stay_ids)
+            except Exception:
+                logger.exception("alerts LISTEN failed, reconnecting")
+                time.sleep(1)
+
+    def _poll(self) -> None:
+        last_id = None
+        while True:
+            try:
+                with self.engine.connect() as conn:
+                    if last_id is None:
+                        last_id = conn.execute(sql_select(func.max(Alert.id))).scalar() or 0
+                    rows = conn.execute(
+                        sql_select(Alert.stay_id, func.max(Alert.id))
+                        .where(Alert.id > last_id)
+                        .group_by(Alert.stay_id)
+                    ).all()
+                if rows:
+                    last_id = max(last_id, *(max_id for _, max_id in rows))
+                    self.publish({stay_id for stay_id, _ in rows})
+            except Exception:
+                logger.exception("alerts poll failed")
+            time.sleep(ALERTS_POLL_INTERVAL)
+
+
+alert_broker = AlertBroker(engine)
+
+
+def _sse(event: str, data, id: Optional[int] = None) -> str:
+    prefix = f"id: {id}\n" if id is not None else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+async def alert_stream(stay_ids: Optional[Iterable[int]], after_id: Optional[int] = None) -> AsyncIterator[str]:
+    """Zdarzenia SSE: unread (liczniki), alert (nowy alert, id = id alertu).
+
+    after_id - Last-Event-ID wznawianego polaczenia; bez niego strumien
+    zaczyna sie od biezacego stanu.
+    """
+    stay_ids = list(stay_ids) if stay_ids else None
+
+    def read(after):
+        with SessionLocal() as db:
+            if after is None:
+                after = latest_alert_id(db, stay_ids)
+                alerts = []
+            else:
+                alerts = alerts_after(db, stay_ids, after, STREAM_BATCH)
+            return after, [AlertSchema.model_validate(a) for a in alerts], unread_counts(db, stay_ids)
+
+    # najpierw subskrypcja - alert dodany w trakcie odczytu nie przepadnie
+    subscription = alert_broker.subscribe(stay_ids)
+    try:
+        while True:
+            after_id, alerts, counts = await run_in_threadpool(read, after_id)
+            for alert in alerts:
+                yield _sse("alert", alert, id=alert.id)
+                after_id = alert.id
+            yield _sse("unread", {"counts": counts, "total": sum(counts.values())})
+
+            # pelna partia - sa kolejne
+            if len(alerts) == STREAM_BATCH:
+                continue
+
+            while True:
+                try:
+                    await asyncio.wait_for(subscription.changed.wait(), SSE_HEARTBEAT)
+                    break
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+            subscription.changed.clear()
+    finally:
+        alert_broker.unsubscribe(subscription)
@@ -1,3 +1,254 @@
+from __future__ import annotations
+import hashlib
+import os
+import random
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.models import Booking, Flight, Hotel, HotelAvailability, Stay, Transfer
+from app.schemas.booking import BookingCreate
+from app.packages.stays.filter_service import nights_between
+
+
+# proby zajecia okna, gdy inna rezerwacja zmienila je w miedzyczasie
+RESERVE_ATTEMPTS = int(os.getenv("BOOKING_RESERVE_ATTEMPTS", "5"))
+# z ilu pasujacych okien losowane jest jedno - rownolegle rezerwacje
+# tego samego hotelu rzadziej celuja w ten sam wiersz
+RESERVE_CANDIDATES = int(os.getenv("BOOKING_RESERVE_CANDIDATES", "8"))
+
+
+class BookingError(ValueError):
+    pass
+
+
+class SoldOut(BookingError):
+    pass
+
+
+class IdempotencyConflict(BookingError):
+    pass
+
+
+def request_hash(data: BookingCreate) -> str:
+    return hashlib.sha256(data.model_dump_json().encode()).hexdigest()
+
+
+def _window(hotel_id: int, date_from, date_to, max_guests: int) -> HotelAvailability:
+    return HotelAvailability(
+        hotel_id=hotel_id,
+        date_from=date_from,
+        date_to=date_to,
+        max_guests=max_guests,
+        is_available=True,
+    )
+
+
 class BookingDBService:
-    def create_booking(self, data: dict):
-        return {"id": 1, **data}
+    def price(self, db: Session, data: BookingCreate) -> Decimal:
+        """Cena liczona jak w wyszukiwarce, z biezacych wierszy oferty -
+        po sprawdzeniu, ze elementy skladaja sie w ten pobyt."""
+        if data.date_to <= data.date_from:
+            raise BookingError("date_to must be after date_from")
+
+        outbound = db.get(Flight, data.outbound_flight_id)
+        return_flight = db.get(Flight, data.return_flight_id)
+        hotel = db.get(Hotel, data.hotel_id)
+        transfer = db.get(Transfer, data.transfer_id)
+
+        if outbound is None or return_flight is None or hotel is None or transfer is None:
+            raise BookingError("Unknown flight, hotel or transfer")
+        if outbound.status != "SCHEDULED" or return_flight.status != "SCHEDULED":
+            raise BookingError("Flight is not scheduled")
+        if not transfer.available:
+            raise BookingError("Transfer is not available")
+        if (
+            outbound.date != data.date_from
+            or return_flight.date != data.date_to
+            or outbound.to_airport != hotel.location
+            or return_flight.from_airport != hotel.location
+            or return_flight.to_airport != outbound.from_airport
+            or transfer.location != hotel.location
+        ):
+            raise BookingError("Offer elements do not form this stay")
+
+        nights = nights_between(data.date_from, data.date_to)
+        return (
+            outbound.price
+            + return_flight.price
+            + hotel.price_per_night * nights
+            + transfer.price
+        )
+
+    def reserve_window(self, db: Session, data: BookingCreate) -> HotelAvailability:
+        """Zajmuje okno dostepnosci obejmujace pobyt.
+
+        Optymistycznie: okno jest oznaczane jako niedostepne przez UPDATE
+        z warunkiem na version (version_id_col) - gdy rownolegla rezerwacja
+        zmieni je pierwsza, flush rzuca StaleDataError i probujemy
+        z innym oknem. Czesci okna przed i po pobycie wracaja jako nowe
+        okna, wiec zajmowane sa tylko noce pobytu.
+        """
+        for _ in range(RESERVE_ATTEMPTS):
+            windows = (
+                db.query(HotelAvailability)
+                .filter(
+                    HotelAvailability.hotel_id == data.hotel_id,
+                    HotelAvailability.is_available.is_(True),
+                    HotelAvailability.date_from <= data.date_from,
+                    HotelAvailability.date_to >= data.date_to,
+                    HotelAvailability.max_guests >= data.guests,
+                )
+                .order_by(HotelAvailability.max_guests, HotelAvailability.id)
+                .limit(RESERVE_CANDIDATES)
+                .all()
+            )
+            if not windows:
+                raise SoldOut("No availability for these dates")
+
+            window = random.choice(windows)
+            window.is_available = False
+
+            if window.date_from < data.date_from:
+                db.add(_window(window.hotel_id, window.date_from, data.date_from, window.max_guests))
+            if data.date_to < window.date_to:
+                db.add(_window(window.hotel_id, data.date_to, window.date_to, window.max_guests))
+
+            try:
+                db.flush()
+                return window
+            except StaleDataError:
+                db.rollback()
+
+        raise SoldOut("Availability changed concurrently, try again")
+
+    def find(self, db: Session, user_id: int, idempotency_key: str) -> Optional[Booking]:
+        return (
+            db.query(Booking)
+            .filter(Booking.user_id == user_id, Booking.idempotency_key == idempotency_key)
+            .one_or_none()
+        )
+
+    def _replay(self, db: Session, data: BookingCreate, idempotency_key: str) -> Optional[Booking]:
+        booking = self.find(db, data.user_id, idempotency_key)
+        if booking is not None and booking.request_hash != request_hash(data):
+            raise IdempotencyConflict("Idempotency key was used with a different request")
+        return booking
+
+    def create_booking(
+        self,
+        db: Session,
+        data: BookingCreate,
+        idempotency_key: Optional[str] = None,
+    ) -> tuple:
+        """(booking, created) - created=False, gdy to powtorzenie zadania
+        z tym samym kluczem idempotencji.
+
+        Okno, pobyt (PROPOSED) i rezerwacja (PENDING) powstaja w jednej
+        transakcji; platnosc idzie pozniej przez kolejke.
+        """
+        if idempotency_key:
+            existing = self._replay(db, data, idempotency_key)
+            if existing is not None:
+                return existing, False
+
+        amount = self.price(db, data)
+        window = self.reserve_window(db, data)
+
+        stay = Stay(
+            flight_id=data.outbound_flight_id,
+            hotel_id=data.hotel_id,
+            transfer_id=data.transfer_id,
+            date_from=data.date_from,
+            date_to=data.date_to,
+            total_price=amount,
+            status="PROPOSED",
+        )
+        db.add(stay)
+        db.flush()
+
+        booking = Booking(
+            user_id=data.user_id,
+            stay_id=stay.id,
+            return_flight_id=data.return_flight_id,
+            availability_id=window.id,
+            guests=data.guests,
+            amount=amount,
+            status="PENDING",
+            idempotency_key=idempotency_key,
+            request_hash=request_hash(data),
+            payment_token=data.payment_token,
+            attempts=0,
+        )
+        db.add(booking)
+
+        try:
+            db.commit()
+        except IntegrityError:
+            # rownolegle zadanie z tym samym kluczem bylo pierwsze - nasze
+            # okno wraca razem z wycofana transakcja
+            db.rollback()
+            existing = self._replay(db, data, idempotency_key) if idempotency_key else None
+            if existing is None:
+                raise
+            return existing, False
+
+        return booking, True
+
+    def release(self, db: Session, booking: Booking) -> None:
+        """Oddaje noce nieoplaconej rezerwacji.
+
+        Zwolnione noce lacza sie z wolnymi oknami tuz przed i tuz po nich
+        (np. czesciami odcietymi przy rezerwacji). Gdy wynik pokrywa sie
+        z zajetym oknem - wraca ono jako dostepne, bez nowego wiersza.
+        Sasiada usuwa DELETE z warunkiem na version, wiec okno zajete
+        w miedzyczasie przez inna rezerwacje zostaje nietkniete.
+        """
+        window = db.get(HotelAvailability, booking.availability_id)
+        stay = db.get(Stay, booking.stay_id)
+        stay.status = "CANCELLED"
+
+        date_from, date_to = stay.date_from, stay.date_to
+        for neighbour, edge in (("before", date_from), ("after", date_to)):
+            adjacent = (
+                HotelAvailability.date_to == edge
+                if neighbour == "before"
+                else HotelAvailability.date_from == edge
+            )
+            candidates = db.execute(
+                select(
+                    HotelAvailability.id,
+                    HotelAvailability.date_from,
+                    HotelAvailability.date_to,
+                    HotelAvailability.version,
+                )
+                .where(
+                    HotelAvailability.hotel_id == window.hotel_id,
+                    HotelAvailability.max_guests == window.max_guests,
+                    HotelAvailability.is_available.is_(True),
+                    adjacent,
+                )
+                .order_by(HotelAvailability.id)
+            ).all()
+
+            for id, start, end, version in candidates:
+                merged = db.execute(
+                    delete(HotelAvailability).where(
+                        HotelAvailability.id == id,
+                        HotelAvailability.version == version,
+                        HotelAvailability.is_available.is_(True),
+                    ),
+                    execution_options={"synchronize_session": False},
+                ).rowcount
+                if merged:
+                    date_from, date_to = min(date_from, start), max(date_to, end)
+                    break
+
+        if (date_from, date_to) == (window.date_from, window.date_to) and not window.is_available:
+            window.is_available = True
+        else:
+            db.add(_window(window.hotel_id, date_from, date_to, window.max_guests))
@@ -0,0 +1,171 @@
+from __future__ import annotations
+import logging
+import os
+import queue
+import threading
+from datetime import timedelta
+from typing import List, Optional
+
+from sqlalchemy import func, or_, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Booking, Stay
+from app.packages.booking.db_service import BookingDBService
+from app.packages.booking.payment_service import PaymentService
+
+
+PAYMENT_WORKERS = int(os.getenv("PAYMENT_WORKERS", "4"))
+# nieudane proby obciazenia (blad polaczenia itp.) przed FAILED
+PAYMENT_MAX_ATTEMPTS = int(os.getenv("PAYMENT_MAX_ATTEMPTS", "5"))
+# co ile sekund szukac rezerwacji, ktore nie trafily do kolejki (restart,
+# inny proces) albo utknely w PROCESSING
+PAYMENT_SWEEP_INTERVAL = float(os.getenv("PAYMENT_SWEEP_INTERVAL", "30"))
+PAYMENT_PROCESSING_TIMEOUT = float(os.getenv("PAYMENT_PROCESSING_TIMEOUT", "300"))
+
+logger = logging.getLogger("tripplanner.payments")
+
+
+def older_than(db: Session, column, seconds: float):
+    """column < teraz - seconds wedlug zegara bazy - created_at/updated_at
+    wypelnia now() bazy w jej strefie, wiec zegar aplikacji (utcnow) moze
+    sie z nimi rozjechac o godziny."""
+    if db.bind.dialect.name == "sqlite":
+        # CURRENT_TIMESTAMP w sqlite to UTC, tak samo jak datetime('now')
+        return column < func.datetime("now", f"-{seconds:.3f} seconds")
+    return column < func.now() - timedelta(seconds=seconds)
+
+
+class PaymentQueue:
+    """Obciazenia rezerwacji w tle.
+
+    Kolejka w pamieci daje tylko szybkie przekazanie id - stan trzyma
+    tabela bookings. Worker przejmuje rezerwacje warunkowym UPDATE
+    PENDING -> PROCESSING, wiec ta sama rezerwacja nie zostanie obciazona
+    rownolegle nawet przez kilka procesow aplikacji.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        workers: int = PAYMENT_WORKERS,
+        payments: Optional[PaymentService] = None,
+    ):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.payments = payments or PaymentService()
+        self.bookings = BookingDBService()
+        self._queue: "queue.Queue[int]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stopped.clear()
+        for n in range(self.workers):
+            self._threads.append(threading.Thread(target=self._worker, name=f"payment-{n}", daemon=True))
+        self._threads.append(threading.Thread(target=self._sweeper, name="payment-sweep", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        for _ in range(self.workers):
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def enqueue(self, booking_id: int) -> None:
+        self._queue.put(booking_id)
+
+    def join(self) -> None:
+        """Czeka, az kolejka sie oprozni (testy, benchmarki)."""
+        self._queue.join()
+
+    def _worker(self) -> None:
+        while True:
+            booking_id = self._queue.get()
+            try:
+                if booking_id is None:
+                    return
+                self.process(booking_id)
+            except Exception:
+                logger.exception("payment for booking %s failed", booking_id)
+            finally:
+                self._queue.task_done()
+
+    def process(self, booking_id: int) -> None:
+        with self.session_factory() as db:
+            claimed = db.execute(
+                update(Booking)
+                .where(Booking.id == booking_id, Booking.status == "PENDING")
+                .values(status="PROCESSING", attempts=Booking.attempts + 1),
+                execution_options={"synchronize_session": False},
+            ).rowcount
+            db.commit()
+            if not claimed:
+                return
+
+            booking = db.get(Booking, booking_id)
+            try:
+                result = self.payments.charge(
+                    int(booking.amount * 100),
+                    {"token": booking.payment_token, "idempotency_key": f"booking-{booking.id}"},
+                )
+            except Exception:
+                logger.exception("charge for booking %s failed", booking_id)
+                # blad bez odpowiedzi banku - ponowienie przy kolejnym przegladzie
+                booking.status = "PENDING" if booking.attempts < PAYMENT_MAX_ATTEMPTS else "FAILED"
+                if booking.status == "FAILED":
+                    self.bookings.release(db, booking)
+                db.commit()
+                return
+
+            if result["status"] == "ok":
+                booking.status = "CONFIRMED"
+                booking.payment_reference = result.get("reference")
+                db.get(Stay, booking.stay_id).status = "RESERVED"
+            else:
+                booking.status = "FAILED"
+                self.bookings.release(db, booking)
+            db.commit()
+
+    def sweep(self) -> int:
+        with self.session_factory() as db:
+            db.execute(
+                update(Booking)
+                .where(
+                    Booking.status == "PROCESSING",
+                    older_than(db, Booking.updated_at, PAYMENT_PROCESSING_TIMEOUT),
+                )
+                .values(status="PENDING"),
+                execution_options={"synchronize_session": False},
+            )
+            db.commit()
+
+            ids = [
+                id
+                for (id,) in db.query(Booking.id).filter(
+                    Booking.status == "PENDING",
+                    or_(
+                        Booking.attempts > 0,
+                        older_than(db, Booking.created_at, PAYMENT_SWEEP_INTERVAL),
+                    ),
+                )
+            ]
+
+        for booking_id in ids:
+            self.enqueue(booking_id)
+        return len(ids)
+
+    def _sweeper(self) -> None:
+        while not self._stopped.wait(PAYMENT_SWEEP_INTERVAL):
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("payment sweep failed")
+
+
+payment_queue = PaymentQueue()
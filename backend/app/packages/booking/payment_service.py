@@ -1,3 +1,13 @@
+from app.packages.external.bank_provider import BankProvider
+
+
 class PaymentService:
+    def __init__(self, bank: BankProvider = None):
+        self.bank = bank or BankProvider()
+
     def charge(self, amount_cents: int, payment_method: dict) -> dict:
-        return {"status": "ok", "amount": amount_cents}
+        """Obciazenie przez bank. payment_method niesie idempotency_key -
+        ponowienie po awarii nie obciazy drugi raz."""
+        result = self.bank.process_payment({"amount": amount_cents, **payment_method})
+        status = "ok" if result.get("status") == "processed" else "declined"
+        return {"status": status, "amount": amount_cents, "reference": result.get("reference")}
@@ -1,3 +1,3 @@
 class BankProvider:
     def process_payment(self, data: dict):
-        return {"status": "processed"}
+        return {"status": "processed", "reference": data.get("idempotency_key")}
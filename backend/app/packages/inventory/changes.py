@@ -0,0 +1,117 @@
+from __future__ import annotations
+import logging
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.models.entities import Flight, Hotel, HotelAvailability, Transfer
+
+
+logger = logging.getLogger(__name__)
+
+TRACKED_ENTITIES = (Flight, Hotel, HotelAvailability, Transfer)
+
+
+class Change:
+    """Zmiana jednego wiersza oferty, zapamietana w momencie flush.
+
+    values to wartosci kolumn po zmianie (przy usunieciu - ostatnie znane),
+    previous - wartosci kolumn, ktore zmienily sie w tej transakcji.
+    """
+
+    __slots__ = ("table", "id", "values", "previous", "deleted")
+
+    def __init__(
+        self,
+        table: str,
+        id: Optional[int],
+        values: Dict[str, object],
+        previous: Optional[Dict[str, object]] = None,
+        deleted: bool = False,
+    ):
+        self.table = table
+        self.id = id
+        self.values = values
+        self.previous = previous or {}
+        self.deleted = deleted
+
+
+Subscriber = Callable[[List[Change]], None]
+
+_subscribers: List[Subscriber] = []
+_installed_on = set()
+
+
+def subscribe(callback: Subscriber) -> None:
+    if callback not in _subscribers:
+        _subscribers.append(callback)
+
+
+def publish(changes: List[Change]) -> None:
+    """Przekazuje zmiany subskrybentom.
+
+    Wywolywane automatycznie po commit sesji ORM; zapisy przez Core
+    (bulk update/insert) musza wolac je recznie.
+    """
+    if not changes:
+        return
+
+    for callback in _subscribers:
+        try:
+            callback(changes)
+        except Exception:
+            logger.exception("Inventory change subscriber %r failed", callback)
+
+
+def notify(table: str, ids, **values) -> None:
+    publish([Change(table, id, dict(values)) for id in ids])
+
+
+def _describe(obj, deleted: bool) -> Change:
+    state = inspect(obj)
+    values = {attr.key: getattr(obj, attr.key) for attr in state.mapper.column_attrs}
+
+    previous = {}
+    for attr in state.mapper.column_attrs:
+        history = state.attrs[attr.key].history
+        if history.deleted:
+            previous[attr.key] = history.deleted[0]
+
+    return Change(obj.__tablename__, values.get("id"), values, previous, deleted)
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    # SQL jest juz wykonany (id nowych wierszy sa znane), ale listy
+    # new/dirty/deleted i historia atrybutow opisuja stan sprzed flush
+    pending = session.info.setdefault("inventory_changes", [])
+
+    for obj in session.new:
+        if isinstance(obj, TRACKED_ENTITIES):
+            pending.append(_describe(obj, deleted=False))
+
+    for obj in session.dirty:
+        if isinstance(obj, TRACKED_ENTITIES) and session.is_modified(obj):
+            pending.append(_describe(obj, deleted=False))
+
+    for obj in session.deleted:
+        if isinstance(obj, TRACKED_ENTITIES):
+            pending.append(_describe(obj, deleted=True))
+
+
+def _after_commit(session: Session) -> None:
+    publish(session.info.pop("inventory_changes", []))
+
+
+def _after_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop("inventory_changes", None)
+
+
+def install_change_tracking(session_factory) -> None:
+    if session_factory in _installed_on:
+        return
+
+    event.listen(session_factory, "after_flush", _after_flush)
+    event.listen(session_factory, "after_commit", _after_commit)
+    event.listen(session_factory, "after_soft_rollback", _after_rollback)
+    _installed_on.add(session_factory)
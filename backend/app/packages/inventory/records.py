@@ -0,0 +1,126 @@
+"""Lekkie rekordy oferty (__slots__) zamiast encji ORM.
+
+Uzywane przez snapshot i przez adaptery w trybie ADAPTER_FETCH_MODE=records:
+zapytanie wybiera tylko kolumny z *_COLUMNS (ceny rzutowane na float juz
+w bazie, bez Decimal), a wiersze trafiaja wprost do konstruktorow.
+"""
+from __future__ import annotations
+import os
+from datetime import date
+from typing import Callable, List
+
+from sqlalchemy import Float, Select, cast
+from sqlalchemy.orm import Session
+
+from app.models.entities import Flight, Hotel, Transfer
+
+
+# "orm" - adaptery zwracaja encje, "records" - rekordy z samych kolumn
+ADAPTER_FETCH_MODE = os.getenv("ADAPTER_FETCH_MODE", "orm")
+
+
+def use_records() -> bool:
+    return ADAPTER_FETCH_MODE == "records"
+
+
+def fetch_records(db: Session, query: Select, record: Callable) -> List:
+    """Wiersze zapytania po *_COLUMNS jako rekordy (bez mapy tozsamosci)."""
+    return [record(*row) for row in db.execute(query)]
+
+
+class FlightRecord:
+    __slots__ = ("id", "from_airport", "to_airport", "date", "price", "status")
+
+    def __init__(
+        self,
+        id: int,
+        from_airport: str,
+        to_airport: str,
+        date: date,
+        price: float,
+        status: str,
+    ):
+        self.id = id
+        self.from_airport = from_airport
+        self.to_airport = to_airport
+        self.date = date
+        self.price = price
+        self.status = status
+
+
+class HotelRecord:
+    __slots__ = (
+        "id",
+        "location",
+        "standard",
+        "price_per_night",
+        "has_wifi",
+        "has_pool",
+        "has_parking",
+    )
+
+    def __init__(
+        self,
+        id: int,
+        location: str,
+        standard: int,
+        price_per_night: float,
+        has_wifi: bool,
+        has_pool: bool,
+        has_parking: bool,
+    ):
+        self.id = id
+        self.location = location
+        self.standard = standard
+        self.price_per_night = price_per_night
+        self.has_wifi = has_wifi
+        self.has_pool = has_pool
+        self.has_parking = has_parking
+
+
+class TransferRecord:
+    __slots__ = ("id", "type", "location", "price", "available")
+
+    def __init__(
+        self,
+        id: int,
+        type: str,
+        location: str,
+        price: float,
+        available: bool,
+    ):
+        self.id = id
+        self.type = type
+        self.location = location
+        self.price = price
+        self.available = available
+
+
+# kolumny w kolejnosci argumentow konstruktorow
+
+FLIGHT_COLUMNS = (
+    Flight.id,
+    Flight.from_airport,
+    Flight.to_airport,
+    Flight.date,
+    cast(Flight.price, Float),
+    Flight.status,
+)
+
+HOTEL_COLUMNS = (
+    Hotel.id,
+    Hotel.location,
+    Hotel.standard,
+    cast(Hotel.price_per_night, Float),
+    Hotel.has_wifi,
+    Hotel.has_pool,
+    Hotel.has_parking,
+)
+
+TRANSFER_COLUMNS = (
+    Transfer.id,
+    Transfer.type,
+    Transfer.location,
+    cast(Transfer.price, Float),
+    Transfer.available,
+)
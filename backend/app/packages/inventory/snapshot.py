@@ -0,0 +1,262 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.entities import Flight, Hotel, Transfer
+from app.packages.inventory.changes import Change
+from app.packages.inventory.records import (
+    FLIGHT_COLUMNS,
+    HOTEL_COLUMNS,
+    TRANSFER_COLUMNS,
+    FlightRecord,
+    HotelRecord,
+    TransferRecord,
+    fetch_records,
+)
+from app.packages.stays.filter_service import hotel_matches
+
+
+USE_INVENTORY_SNAPSHOT = os.getenv("USE_INVENTORY_SNAPSHOT", "0") == "1"
+
+# pelne przeladowanie co tyle sekund - zmiany z innych procesow nie
+# przychodza przez hooki (0 = tylko zmiany przyrostowe)
+INVENTORY_SNAPSHOT_TTL = float(os.getenv("INVENTORY_SNAPSHOT_TTL", "900"))
+
+
+class _Table:
+    """Rekordy jednej tabeli po id oraz listy po kluczu (posortowane po id).
+
+    Listy w indeksie sa tylko podmieniane, nigdy modyfikowane w miejscu,
+    wiec czytelnicy nie potrzebuja blokady.
+    """
+
+    __slots__ = ("by_id", "buckets", "keys_of")
+
+    def __init__(self, keys_of: Callable[[object], Iterable]):
+        self.by_id: Dict[int, object] = {}
+        self.buckets: Dict[object, List] = {}
+        self.keys_of = keys_of
+
+    def load(self, records: Iterable) -> None:
+        by_id = {r.id: r for r in records}
+        buckets: Dict[object, List] = {}
+        for r in sorted(by_id.values(), key=lambda r: r.id):
+            for key in self.keys_of(r):
+                buckets.setdefault(key, []).append(r)
+
+        self.by_id = by_id
+        self.buckets = buckets
+
+    def replace(self, ids: Set[int], records: Iterable) -> None:
+        records = list(records)
+        touched = set()
+
+        for id in ids:
+            old = self.by_id.pop(id, None)
+            if old is not None:
+                touched.update(self.keys_of(old))
+
+        added: Dict[object, List] = {}
+        for r in records:
+            self.by_id[r.id] = r
+            for key in self.keys_of(r):
+                touched.add(key)
+                added.setdefault(key, []).append(r)
+
+        for key in touched:
+            bucket = [r for r in self.buckets.get(key, ()) if r.id not in ids]
+            bucket.extend(added.get(key, ()))
+            if bucket:
+                bucket.sort(key=lambda r: r.id)
+                self.buckets[key] = bucket
+            else:
+                self.buckets.pop(key, None)
+
+    def get(self, key) -> List:
+        return self.buckets.get(key, [])
+
+
+class InventorySnapshot:
+    """Hotele, transfery i zaplanowane loty w pamieci.
+
+    Odpowiada na te same pytania co adaptery w app/external i zwraca
+    rekordy z tymi samymi atrybutami co encje (ceny jako float).
+    """
+
+    def __init__(self):
+        self.flights = _Table(self._flight_keys)
+        self.hotels = _Table(lambda h: (h.location,))
+        self.transfers = _Table(lambda t: (t.location,) if t.available else ())
+
+        self.loaded_at = 0.0
+        self._pending: Dict[str, Set[int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _flight_keys(f: FlightRecord) -> Tuple:
+        if f.status != "SCHEDULED":
+            return ()
+        return (("from", f.from_airport, f.date), ("to", f.to_airport, f.date))
+
+    def load(self, db: Session) -> None:
+        with self._lock:
+            self.flights.load(
+                fetch_records(
+                    db,
+                    select(*FLIGHT_COLUMNS).where(Flight.status == "SCHEDULED"),
+                    FlightRecord,
+                )
+            )
+            self.hotels.load(fetch_records(db, select(*HOTEL_COLUMNS), HotelRecord))
+            self.transfers.load(
+                fetch_records(
+                    db,
+                    select(*TRANSFER_COLUMNS).where(Transfer.available.is_(True)),
+                    TransferRecord,
+                )
+            )
+            self._pending.clear()
+            self.loaded_at = time.monotonic()
+
+    def expired(self) -> bool:
+        return (
+            INVENTORY_SNAPSHOT_TTL > 0
+            and time.monotonic() - self.loaded_at > INVENTORY_SNAPSHOT_TTL
+        )
+
+    def mark_changed(self, table: str, ids: Iterable[int]) -> None:
+        with self._lock:
+            self._pending.setdefault(table, set()).update(ids)
+
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    def refresh(self, db: Session) -> None:
+        """Doczytuje z bazy tylko wiersze oznaczone jako zmienione."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+            if pending.get("flights"):
+                ids = pending["flights"]
+                self.flights.replace(
+                    ids,
+                    (
+                        r
+                        for r in fetch_records(
+                            db, select(*FLIGHT_COLUMNS).where(Flight.id.in_(ids)), FlightRecord
+                        )
+                        if r.status == "SCHEDULED"
+                    ),
+                )
+            if pending.get("hotels"):
+                ids = pending["hotels"]
+                self.hotels.replace(
+                    ids,
+                    fetch_records(db, select(*HOTEL_COLUMNS).where(Hotel.id.in_(ids)), HotelRecord),
+                )
+            if pending.get("transfers"):
+                ids = pending["transfers"]
+                self.transfers.replace(
+                    ids,
+                    (
+                        r
+                        for r in fetch_records(
+                            db, select(*TRANSFER_COLUMNS).where(Transfer.id.in_(ids)), TransferRecord
+                        )
+                        if r.available
+                    ),
+                )
+
+    # zapytania adapterow
+
+    def outbound_flights(
+        self,
+        from_airport: str,
+        date_from: date,
+        to_airport: Optional[str] = None,
+    ) -> List[FlightRecord]:
+        flights = self.flights.get(("from", from_airport, date_from))
+        if to_airport:
+            return [f for f in flights if f.to_airport == to_airport]
+        return list(flights)
+
+    def return_flights(self, to_airport: str, date_to: date) -> List[FlightRecord]:
+        return list(self.flights.get(("to", to_airport, date_to)))
+
+    def hotels_in(
+        self,
+        locations: Iterable[str],
+        min_standard: Optional[int],
+        require_wifi: Optional[bool],
+        require_pool: Optional[bool],
+        require_parking: Optional[bool],
+    ) -> List[HotelRecord]:
+        hotels = [
+            h
+            for location in set(locations)
+            for h in self.hotels.get(location)
+            if hotel_matches(h, min_standard, require_wifi, require_pool, require_parking)
+        ]
+        hotels.sort(key=lambda h: h.id)
+        return hotels
+
+    def transfers_in(self, locations: Iterable[str]) -> List[TransferRecord]:
+        transfers = [t for location in set(locations) for t in self.transfers.get(location)]
+        transfers.sort(key=lambda t: t.id)
+        return transfers
+
+
+_snapshot: Optional[InventorySnapshot] = None
+_load_lock = threading.Lock()
+
+
+def load_inventory_snapshot(db: Session) -> InventorySnapshot:
+    global _snapshot
+
+    snapshot = InventorySnapshot()
+    snapshot.load(db)
+    _snapshot = snapshot
+    return snapshot
+
+
+def current_inventory_snapshot() -> Optional[InventorySnapshot]:
+    """Zaladowany snapshot bez odswiezania (None, gdy jeszcze go nie ma)."""
+    return _snapshot
+
+
+def get_inventory_snapshot(db: Session) -> Optional[InventorySnapshot]:
+    """Aktualny snapshot albo None, gdy snapshot jest wylaczony.
+
+    Zaleglosci z hookow sa doczytywane przy pierwszym uzyciu, pelne
+    przeladowanie robi sie po INVENTORY_SNAPSHOT_TTL.
+    """
+    if not USE_INVENTORY_SNAPSHOT:
+        return None
+
+    snapshot = _snapshot
+    if snapshot is None or snapshot.expired():
+        with _load_lock:
+            if _snapshot is None or _snapshot.expired():
+                load_inventory_snapshot(db)
+            snapshot = _snapshot
+
+    if snapshot.has_pending():
+        snapshot.refresh(db)
+
+    return snapshot
+
+
+def on_inventory_change(changes: List[Change]) -> None:
+    snapshot = _snapshot
+    if snapshot is None:
+        return
+
+    for change in changes:
+        if change.table in ("flights", "hotels", "transfers") and change.id is not None:
+            snapshot.mark_changed(change.table, (change.id,))
@@ -0,0 +1,107 @@
+from __future__ import annotations
+import asyncio
+import cProfile
+import functools
+import os
+import random
+import time
+from contextlib import contextmanager
+
+
+# ulamek profilowanych zadan (0 = wylaczone, endpointy nie sa owijane)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/tripplanner-profiles")
+# auto - pyinstrument, jesli jest zainstalowany, inaczej cProfile
+PROFILER = os.getenv("PROFILER", "auto")
+
+# w petli zdarzen profiler widzi wszystkie korutyny - naraz tylko jeden
+_async_profiling = False
+
+
+def _pyinstrument():
+    if PROFILER == "cprofile":
+        return None
+    try:
+        import pyinstrument
+    except ImportError:
+        if PROFILER == "pyinstrument":
+            raise
+        return None
+    return pyinstrument
+
+
+def _path(name: str, ext: str) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(PROFILE_DIR, f"{name}-{stamp}-{os.getpid()}-{random.randrange(10**6):06d}.{ext}")
+
+
+@contextmanager
+def profile(name: str, async_mode: bool = False):
+    """Profil bloku zapisany do PROFILE_DIR.
+
+    pyinstrument - JSON speedscope (https://www.speedscope.app),
+    cProfile - plik .prof (snakeviz, flameprof -> flame graph).
+    """
+    pyinstrument = _pyinstrument()
+
+    if pyinstrument is not None:
+        from pyinstrument.renderers import SpeedscopeRenderer
+
+        profiler = pyinstrument.Profiler(async_mode="enabled" if async_mode else "disabled")
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(_path(name, "speedscope.json"), "w") as f:
+                f.write(profiler.output(SpeedscopeRenderer()))
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(_path(name, "prof"))
+
+
+def sampled_profile(name: str):
+    """Dekorator endpointu: co ktores zadanie (PROFILE_SAMPLE_RATE) jest
+    profilowane. Przy 0 zwraca funkcje bez zmian - zero narzutu.
+
+    Profil powstaje w watku, w ktorym dziala endpoint (endpointy sync
+    FastAPI wykonuje w puli watkow, wiec middleware by ich nie widzial).
+    """
+    def decorator(fn):
+        if PROFILE_SAMPLE_RATE <= 0:
+            return fn
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                global _async_profiling
+
+                if _async_profiling or random.random() >= PROFILE_SAMPLE_RATE:
+                    return await fn(*args, **kwargs)
+
+                _async_profiling = True
+                try:
+                    with profile(name, async_mode=True):
+                        return await fn(*args, **kwargs)
+                finally:
+                    _async_profiling = False
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if random.random() >= PROFILE_SAMPLE_RATE:
+                return fn(*args, **kwargs)
+            with profile(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
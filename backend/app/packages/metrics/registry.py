@@ -0,0 +1,223 @@
+from __future__ import annotations
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROWS_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(values: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in values.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = SECONDS_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        # na etykiety: [liczniki kubelkow (bez skumulowania)..., +Inf], suma
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            counts, total = entry
+            counts[index] += 1
+            total[0] += value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = {k: (list(c), t[0]) for k, (c, t) in self._values.items()}
+
+        for labels, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = ("le", _format_value(float(bound)))
+                yield f"{self.name}_bucket{_format_labels(labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(labels)} {cumulative}"
+
+
+class Gauge:
+    """Wartosci odczytywane w chwili scrape'a (np. stan puli polaczen)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], Dict[Labels, float]]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in sorted(self.read().items()):
+            yield f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self.register(Counter(name, help))
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = SECONDS_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, buckets))
+
+    def gauge(self, name: str, help: str, read: Callable[[], Dict[Labels, float]]) -> Gauge:
+        return self.register(Gauge(name, help, read))
+
+    def render(self) -> str:
+        """Format tekstowy Prometheusa (text/plain; version=0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# metryki wyszukiwarki
+
+STAGE_SECONDS = registry.histogram(
+    "tripplanner_stage_seconds",
+    "Czas etapu wyszukiwania / adaptera",
+)
+STAGE_ROWS = registry.histogram(
+    "tripplanner_stage_rows",
+    "Liczba wierszy zwroconych przez etap",
+    ROWS_BUCKETS,
+)
+COMBINATIONS = registry.counter(
+    "tripplanner_combinations_total",
+    "Kombinacje: candidates - iloczyn ofert, priced - wycenione po odcieciu "
+    "ograniczeniami, returned - w wyniku",
+)
+
+
+@contextmanager
+def span(stage: str, **labels):
+    if not METRICS_ENABLED:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage, **labels)
+
+
+def count_combinations(phase: str, count: int) -> None:
+    if METRICS_ENABLED and count:
+        COMBINATIONS.inc(count, phase=phase)
+
+
+def instrumented(stage: str):
+    """Czas i liczba zwroconych wierszy funkcji (adaptera)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not METRICS_ENABLED:
+                return fn(*args, **kwargs)
+
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+            try:
+                STAGE_ROWS.observe(len(result), stage=stage)
+            except TypeError:
+                pass
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def register_pool_gauges(engine) -> None:
+    """Stan puli polaczen silnika (QueuePool; inne pule maja czesc metod)."""
+    def read(method: str):
+        def values() -> Dict[Labels, float]:
+            fn = getattr(engine.pool, method, None)
+            if fn is None:
+                return {}
+            try:
+                return {_labels({"pool": engine.pool.__class__.__name__}): fn()}
+            except (TypeError, NotImplementedError):
+                return {}
+        return values
+
+    for method, help in (
+        ("size", "Rozmiar puli polaczen"),
+        ("checkedout", "Polaczenia w uzyciu"),
+        ("checkedin", "Wolne polaczenia w puli"),
+        ("overflow", "Polaczenia ponad rozmiar puli"),
+    ):
+        registry.gauge(f"tripplanner_db_pool_{method}", help, read(method))
@@ -0,0 +1,297 @@
+from __future__ import annotations
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Deque, List, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+from app.packages.metrics.registry import registry
+
+
+# prog w ms (0 = log wylaczony)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "250"))
+# plan EXPLAIN dla wolnych zapytan (bez wykonywania zapytania)
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "1") == "1"
+# EXPLAIN (ANALYZE, BUFFERS) - wykonuje zapytanie drugi raz, tylko na zyczenie
+SLOW_QUERY_EXPLAIN_ANALYZE = os.getenv("SLOW_QUERY_EXPLAIN_ANALYZE", "0") == "1"
+# plan tego samego zapytania najwyzej raz na tyle sekund
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "300"))
+# plany czekajace na pobranie - nadmiar jest pomijany
+SLOW_QUERY_EXPLAIN_QUEUE = int(os.getenv("SLOW_QUERY_EXPLAIN_QUEUE", "8"))
+# limit czasu EXPLAIN w ms (PostgreSQL, statement_timeout)
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "2000"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+# wartosci parametrow w logu i /debug/slow-queries - domyslnie tylko typy,
+# a i tak bez parametrow o nazwach jak token / password / key
+SLOW_QUERY_LOG_PARAMS = os.getenv("SLOW_QUERY_LOG_PARAMS", "0") == "1"
+# /debug/slow-queries (bez autoryzacji) - tylko na zyczenie
+SLOW_QUERY_DEBUG_ENDPOINT = os.getenv("SLOW_QUERY_DEBUG_ENDPOINT", "0") == "1"
+
+logger = logging.getLogger("tripplanner.slow_query")
+
+SLOW_QUERIES = registry.counter(
+    "tripplanner_slow_queries_total",
+    "Zapytania SQL wolniejsze niz SLOW_QUERY_MS",
+)
+EXPLAINS_SKIPPED = registry.counter(
+    "tripplanner_slow_query_explains_skipped_total",
+    "Wolne zapytania bez pobranego planu",
+)
+
+
+class SlowQuery:
+    __slots__ = ("statement", "parameters", "names", "duration_ms", "at", "plan")
+
+    def __init__(self, statement: str, parameters, duration_ms: float, names: Optional[List[str]] = None):
+        self.statement = statement
+        # surowe - tylko do EXPLAIN; na zewnatrz przez redacted()
+        self.parameters = parameters
+        # nazwy parametrow pozycyjnych (kolejnosc jak w parameters)
+        self.names = names
+        self.duration_ms = duration_ms
+        self.at = datetime.now(timezone.utc)
+        # uzupelniany w tle
+        self.plan: Optional[object] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "statement": self.statement,
+            "parameters": _printable(redacted(self.parameters, self.names)),
+            "duration_ms": round(self.duration_ms, 2),
+            "at": self.at.isoformat(),
+            "plan": self.plan,
+        }
+
+
+_SENSITIVE = re.compile(r"token|password|secret|key", re.IGNORECASE)
+
+
+def _masked(name: Optional[str], value, raw: bool):
+    if not raw or name is None:
+        return type(value).__name__
+    if _SENSITIVE.search(name):
+        return "***"
+    return value
+
+
+def redacted(parameters, names: Optional[List[str]] = None, raw: bool = SLOW_QUERY_LOG_PARAMS):
+    """Parametry do logu: typy wartosci, a z SLOW_QUERY_LOG_PARAMS=1
+    wartosci z maskowanymi sekretami. Parametr bez znanej nazwy - zawsze
+    tylko typ."""
+    if isinstance(parameters, dict):
+        return {name: _masked(name, value, raw) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        # executemany - lista wierszy
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return [redacted(row, names, raw) for row in parameters]
+        if names is None or len(names) != len(parameters):
+            names = [None] * len(parameters)
+        return [_masked(name, value, raw) for name, value in zip(names, parameters)]
+    return _masked(None, parameters, raw)
+
+
+def _param_names(context) -> Optional[List[str]]:
+    # sqlite (qmark) i inne sterowniki pozycyjne - nazwy z kompilacji
+    positions = getattr(getattr(context, "compiled", None), "positiontup", None)
+    return list(positions) if positions else None
+
+
+def _printable(parameters):
+    try:
+        json.dumps(parameters)
+        return parameters
+    except TypeError:
+        return repr(parameters)
+
+
+# blokady - plan nie jest potrzebny, a ANALYZE bralby je drugi raz
+_LOCKING = re.compile(r"\bpg_advisory\w*|\bFOR\s+(NO\s+KEY\s+)?(UPDATE|SHARE)\b", re.IGNORECASE)
+
+
+def _explainable(statement: str) -> bool:
+    # ANALYZE wykonuje zapytanie - tylko odczyty
+    head = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return head in ("SELECT", "WITH") and not _LOCKING.search(statement)
+
+
+def create_explain_engine(url: str) -> Engine:
+    """Maly osobny silnik do planow - nie zabiera polaczen aplikacji."""
+    if url.startswith("sqlite"):
+        return create_engine(url)
+    return create_engine(url, pool_size=1, max_overflow=0, pool_pre_ping=True)
+
+
+class SlowQueryLog:
+    """Zapytania ponad prog z parametrami i planem.
+
+    Plan jest pobierany poza obsluga zadania: osobnym polaczeniem w watku
+    w tle, w transakcji wycofywanej po EXPLAIN. Ten sam tekst zapytania
+    dostaje plan najwyzej raz na explain_interval sekund, a gdy w kolejce
+    czeka juz explain_queue planow, kolejne sa pomijane.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_MS,
+        explain: bool = SLOW_QUERY_EXPLAIN,
+        size: int = SLOW_QUERY_LOG_SIZE,
+        analyze: bool = SLOW_QUERY_EXPLAIN_ANALYZE,
+        explain_interval: float = SLOW_QUERY_EXPLAIN_INTERVAL,
+        explain_queue: int = SLOW_QUERY_EXPLAIN_QUEUE,
+        explain_timeout_ms: int = SLOW_QUERY_EXPLAIN_TIMEOUT_MS,
+    ):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.analyze = analyze
+        self.explain_interval = explain_interval
+        self.explain_queue = explain_queue
+        self.explain_timeout_ms = explain_timeout_ms
+        self._entries: Deque[SlowQuery] = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # tekst zapytania -> czas ostatniego planu (najstarsze pierwsze)
+        self._explained: "OrderedDict[str, float]" = OrderedDict()
+        self._pending = 0
+
+    # hooki silnika
+
+    def install(self, engine: Engine, explain_engine: Optional[Engine] = None) -> None:
+        """explain_engine - silnik, ktorym pobierane sa plany (None - bez
+        planow, np. dla silnika async z innymi parametrami)."""
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _start(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _stop(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["slow_query_start"].pop()
+            duration_ms = (time.perf_counter() - started) * 1000
+            if duration_ms >= self.threshold_ms and not conn.info.get("slow_query_explain"):
+                self.record(
+                    statement,
+                    parameters,
+                    duration_ms,
+                    None if executemany else explain_engine,
+                    _param_names(context),
+                )
+
+        @event.listens_for(engine, "handle_error")
+        def _error(context):
+            conn = context.connection
+            if conn is not None and conn.info.get("slow_query_start"):
+                conn.info["slow_query_start"].pop()
+
+    def record(
+        self,
+        statement: str,
+        parameters,
+        duration_ms: float,
+        explain_engine: Optional[Engine],
+        names: Optional[List[str]] = None,
+    ) -> None:
+        entry = SlowQuery(statement, parameters, duration_ms, names)
+        with self._lock:
+            self._entries.append(entry)
+        SLOW_QUERIES.inc()
+
+        logger.warning(
+            "slow query %.1f ms: %s | params=%r",
+            duration_ms,
+            " ".join(statement.split()),
+            redacted(parameters, names),
+        )
+
+        if self.explain and explain_engine is not None and _explainable(statement):
+            if self._reserve(statement):
+                self._background().submit(self._capture_plan, explain_engine, entry)
+            else:
+                EXPLAINS_SKIPPED.inc()
+
+    def _reserve(self, statement: str) -> bool:
+        """Miejsce w kolejce planow, jesli zapytanie nie mialo niedawno planu."""
+        now = time.monotonic()
+        with self._lock:
+            if self._pending >= self.explain_queue:
+                return False
+            last = self._explained.get(statement)
+            if last is not None and now - last < self.explain_interval:
+                return False
+
+            self._explained[statement] = now
+            self._explained.move_to_end(statement)
+            while self._explained:
+                oldest = next(iter(self._explained.values()))
+                if now - oldest < self.explain_interval:
+                    break
+                self._explained.popitem(last=False)
+            self._pending += 1
+            return True
+
+    def _background(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(1, thread_name_prefix="slow-query-explain")
+            return self._executor
+
+    def _capture_plan(self, engine: Engine, entry: SlowQuery) -> None:
+        try:
+            self._explain(engine, entry)
+        except Exception:
+            logger.exception("EXPLAIN failed for slow query")
+            return
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+        logger.warning("plan for slow query (%.1f ms): %s", entry.duration_ms, json.dumps(entry.plan))
+
+    def _explain(self, engine: Engine, entry: SlowQuery) -> None:
+        with engine.connect() as conn:
+            conn.info["slow_query_explain"] = True
+            try:
+                if conn.dialect.name == "postgresql":
+                    conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(self.explain_timeout_ms)}")
+                    options = "ANALYZE, BUFFERS, FORMAT JSON" if self.analyze else "FORMAT JSON"
+                    plan = conn.exec_driver_sql(
+                        f"EXPLAIN ({options}) " + entry.statement,
+                        entry.parameters,
+                    ).scalar_one()
+                    entry.plan = json.loads(plan) if isinstance(plan, str) else plan
+                elif conn.dialect.name == "sqlite":
+                    rows = conn.exec_driver_sql(
+                        "EXPLAIN QUERY PLAN " + entry.statement,
+                        entry.parameters,
+                    ).all()
+                    entry.plan = [row[-1] for row in rows]
+                conn.rollback()
+            finally:
+                conn.info.pop("slow_query_explain", None)
+
+    def entries(self) -> List[SlowQuery]:
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+
+def install_slow_query_log(engine: Engine, explain_url: Optional[str] = None) -> None:
+    """explain_url - baza, z ktorej pobierane sa plany (osobny maly silnik)."""
+    if SLOW_QUERY_MS > 0:
+        explain_engine = None
+        if SLOW_QUERY_EXPLAIN and explain_url:
+            explain_engine = create_explain_engine(explain_url)
+        slow_query_log.install(engine, explain_engine)
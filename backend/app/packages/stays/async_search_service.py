@@ -0,0 +1,132 @@
+from __future__ import annotations
+import asyncio
+from typing import List, Optional
+
+from sqlalchemy import Select
+
+from app.database import SessionLocal, get_async_sessionmaker
+from app.schemas.search import SearchPreferences, ProposedStay
+from app.packages.stays.combination_service import (
+    SearchInventory,
+    assemble_stays,
+    group_by,
+)
+from app.packages.stays.flexible_search_service import search_stays_flexible
+from app.packages.metrics.registry import span
+from app.packages.inventory.records import (
+    FLIGHT_COLUMNS,
+    HOTEL_COLUMNS,
+    TRANSFER_COLUMNS,
+    FlightRecord,
+    HotelRecord,
+    TransferRecord,
+    use_records,
+)
+
+from app.models.entities import Flight, Hotel, Transfer
+from app.external.flights_adapter import (
+    outbound_flights_query,
+    return_flights_query,
+)
+from app.external.hotels_adapter import hotels_query
+from app.external.availability_adapter import available_hotels_query
+from app.external.transfers_adapter import transfers_query
+
+
+async def _scalars(q: Select) -> List:
+    # osobna sesja (i polaczenie) na zapytanie - jedna AsyncSession nie
+    # moze wykonywac kilku zapytan naraz
+    async with get_async_sessionmaker()() as session:
+        return (await session.scalars(q)).all()
+
+
+async def _records(q: Select, record) -> List:
+    async with get_async_sessionmaker()() as session:
+        return [record(*row) for row in await session.execute(q)]
+
+
+def _fetch(q: Select, record):
+    return _records(q, record) if use_records() else _scalars(q)
+
+
+async def load_inventory_async(prefs: SearchPreferences) -> Optional[SearchInventory]:
+    records = use_records()
+    flight_columns = FLIGHT_COLUMNS if records else (Flight,)
+
+    # loty wylotowe - reszta zalezy tylko od miast docelowych
+    outbound_flights = await _fetch(
+        outbound_flights_query(
+            prefs.from_location,
+            prefs.date_from,
+            prefs.to_location,
+            flight_columns,
+        ),
+        FlightRecord,
+    )
+
+    if not outbound_flights:
+        return None
+
+    destinations = {f.to_airport for f in outbound_flights}
+
+    # dostepnosc liczona dla wszystkich hoteli w miastach docelowych, bo
+    # kandydaci (5 najtanszych) nie sa jeszcze znani - nadmiarowe id nie
+    # zmieniaja wyniku
+    return_flights, transfers, hotels, available_hotel_ids = await asyncio.gather(
+        _fetch(return_flights_query(prefs.from_location, prefs.date_to, flight_columns), FlightRecord),
+        _fetch(
+            transfers_query(destinations, TRANSFER_COLUMNS if records else (Transfer,)),
+            TransferRecord,
+        ),
+        _fetch(
+            hotels_query(
+                destinations,
+                prefs.min_hotel_standard,
+                prefs.require_wifi,
+                prefs.require_pool,
+                prefs.require_parking,
+                HOTEL_COLUMNS if records else (Hotel,),
+            ),
+            HotelRecord,
+        ),
+        _scalars(
+            available_hotels_query(
+                prefs.date_from,
+                prefs.date_to,
+                prefs.guests,
+                locations=destinations,
+            )
+        ),
+    )
+
+    if not return_flights or not transfers or not hotels or not available_hotel_ids:
+        return None
+
+    return SearchInventory(
+        outbound_flights,
+        group_by(return_flights, "from_airport"),
+        group_by(hotels, "location"),
+        group_by(transfers, "location"),
+        set(available_hotel_ids),
+    )
+
+
+def _search_flexible(prefs: SearchPreferences) -> List[ProposedStay]:
+    with SessionLocal() as db:
+        return search_stays_flexible(db, prefs)
+
+
+async def search_stays_async(prefs: SearchPreferences) -> List[ProposedStay]:
+    if prefs.date_flex_days:
+        # okno dat to kilka zapytan zaleznych od siebie - liczone w watku
+        return await asyncio.to_thread(_search_flexible, prefs)
+
+    with span("search", engine="async"):
+        with span("inventory", mode="async"):
+            inventory = await load_inventory_async(prefs)
+        if inventory is None:
+            return []
+
+        #skladanie kombinacji
+        with span("assemble", engine="python"):
+            return assemble_stays(prefs, inventory)
@@ -0,0 +1,190 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from bisect import bisect_right
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.entities import HotelAvailability
+from app.packages.inventory.changes import Change
+
+
+# po ilu sekundach indeks jest przeladowywany z bazy (0 = tylko po invalidate)
+AVAILABILITY_INDEX_TTL = float(os.getenv("AVAILABILITY_INDEX_TTL", "300"))
+
+
+class HotelWindows:
+    """Okna dostepnosci jednego hotelu posortowane po date_from.
+
+    reach[i] to najpozniejszy date_to sposrod okien 0..i - pozwala
+    przerwac szukanie okna obejmujacego przedzial, gdy zadne wczesniejsze
+    okno nie siega wystarczajaco daleko.
+    """
+
+    __slots__ = ("starts", "ends", "guests", "reach")
+
+    def __init__(self, windows: List[tuple]):
+        windows.sort()
+        self.starts = [w[0] for w in windows]
+        self.ends = [w[1] for w in windows]
+        self.guests = [w[2] for w in windows]
+
+        self.reach = []
+        furthest = -1
+        for end in self.ends:
+            furthest = max(furthest, end)
+            self.reach.append(furthest)
+
+    def covers(self, start: int, end: int, guests: int) -> bool:
+        i = bisect_right(self.starts, start) - 1
+        while i >= 0:
+            if self.reach[i] < end:
+                return False
+            if self.ends[i] >= end and self.guests[i] >= guests:
+                return True
+            i -= 1
+        return False
+
+
+class AvailabilityIndex:
+    __slots__ = ("hotels", "loaded_at")
+
+    def __init__(self, hotels: Dict[int, HotelWindows]):
+        self.hotels = hotels
+        self.loaded_at = time.monotonic()
+
+    @staticmethod
+    def _windows(
+        db: Session,
+        hotel_ids: Optional[Set[int]] = None,
+        guests: Optional[int] = None,
+        latest_start: Optional[date] = None,
+        earliest_end: Optional[date] = None,
+    ) -> Dict[int, HotelWindows]:
+        q = select(
+            HotelAvailability.hotel_id,
+            HotelAvailability.date_from,
+            HotelAvailability.date_to,
+            HotelAvailability.max_guests,
+        ).where(HotelAvailability.is_available.is_(True))
+
+        if hotel_ids is not None:
+            q = q.where(HotelAvailability.hotel_id.in_(hotel_ids))
+        if guests is not None:
+            q = q.where(HotelAvailability.max_guests >= guests)
+        if latest_start is not None:
+            q = q.where(HotelAvailability.date_from <= latest_start)
+        if earliest_end is not None:
+            q = q.where(HotelAvailability.date_to >= earliest_end)
+
+        windows: Dict[int, List[tuple]] = {}
+        for hotel_id, date_from, date_to, max_guests in db.execute(q):
+            windows.setdefault(hotel_id, []).append(
+                (date_from.toordinal(), date_to.toordinal(), max_guests)
+            )
+
+        return {hotel_id: HotelWindows(w) for hotel_id, w in windows.items()}
+
+    @classmethod
+    def load(cls, db: Session) -> "AvailabilityIndex":
+        return cls(cls._windows(db))
+
+    @classmethod
+    def load_range(
+        cls,
+        db: Session,
+        hotel_ids: Set[int],
+        guests: int,
+        latest_start: date,
+        earliest_end: date,
+    ) -> "AvailabilityIndex":
+        """Jednorazowy indeks okien, ktore moga objac jakikolwiek pobyt
+        zaczynajacy sie najpozniej latest_start i konczacy najwczesniej
+        earliest_end - jedno zapytanie zamiast jednego na kazda pare dat."""
+        return cls(cls._windows(db, hotel_ids, guests, latest_start, earliest_end))
+
+    def reload_hotels(self, db: Session, hotel_ids: Set[int]) -> None:
+        windows = self._windows(db, hotel_ids)
+
+        hotels = dict(self.hotels)
+        for hotel_id in hotel_ids:
+            hotels.pop(hotel_id, None)
+        hotels.update(windows)
+
+        self.hotels = hotels
+
+    def covering(
+        self,
+        date_from: date,
+        date_to: date,
+        guests: int,
+        hotel_ids: Optional[Iterable[int]] = None,
+    ) -> Set[int]:
+        """Hotele z oknem obejmujacym [date_from, date_to] dla guests osob."""
+        start = date_from.toordinal()
+        end = date_to.toordinal()
+
+        if hotel_ids is None:
+            hotel_ids = self.hotels.keys()
+
+        result: Set[int] = set()
+        for hotel_id in hotel_ids:
+            windows = self.hotels.get(hotel_id)
+            if windows is not None and windows.covers(start, end, guests):
+                result.add(hotel_id)
+
+        return result
+
+    def expired(self) -> bool:
+        return (
+            AVAILABILITY_INDEX_TTL > 0
+            and time.monotonic() - self.loaded_at > AVAILABILITY_INDEX_TTL
+        )
+
+
+_index: Optional[AvailabilityIndex] = None
+_pending_hotels: Set[int] = set()
+_lock = threading.Lock()
+
+
+def get_availability_index(db: Session) -> AvailabilityIndex:
+    global _index
+
+    index = _index
+    if index is not None and not index.expired() and not _pending_hotels:
+        return index
+
+    with _lock:
+        if _index is None or _index.expired():
+            _index = AvailabilityIndex.load(db)
+        elif _pending_hotels:
+            _index.reload_hotels(db, set(_pending_hotels))
+        _pending_hotels.clear()
+        return _index
+
+
+def invalidate_availability_index(hotel_ids: Optional[Iterable[int]] = None) -> None:
+    """Bez argumentu - pelne przeladowanie, z hotel_ids - tylko te hotele."""
+    global _index
+    with _lock:
+        if hotel_ids is None:
+            _index = None
+            _pending_hotels.clear()
+        else:
+            _pending_hotels.update(hotel_ids)
+
+
+def on_availability_change(changes: List[Change]) -> None:
+    hotel_ids = set()
+    for change in changes:
+        if change.table == "hotel_availability":
+            hotel_ids.add(change.values.get("hotel_id"))
+            hotel_ids.add(change.previous.get("hotel_id"))
+    hotel_ids.discard(None)
+
+    if hotel_ids:
+        invalidate_availability_index(hotel_ids)
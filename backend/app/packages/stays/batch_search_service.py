@@ -0,0 +1,183 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.entities import Flight, Hotel, Transfer
+from app.schemas.search import SearchPreferences, ProposedStay
+from app.external.availability_adapter import get_availability_windows
+from app.packages.inventory.snapshot import get_inventory_snapshot
+from app.packages.stays.filter_service import hotel_matches
+from app.packages.stays.combination_service import (
+    SearchInventory,
+    assemble_stays,
+    candidate_hotel_ids,
+    group_by,
+)
+from app.packages.stays.search_service import search_stays
+
+
+class InventorySlices:
+    """Oferta wspolna dla calej paczki zapytan.
+
+    Kazdy rodzaj danych pobierany jest jednym zapytaniem dla sumy kluczy
+    (lotnisko, data) / miast ze wszystkich zapytan, a potem kazde zapytanie
+    wybiera z tego swoj wycinek - dokladnie te wiersze, ktore dostalby
+    search_stays.
+    """
+
+    def __init__(self, db: Session, queries: List[SearchPreferences]):
+        self.db = db
+        self.snapshot = get_inventory_snapshot(db)
+
+        # loty wylotowe i powrotne - po jednym zapytaniu dla wszystkich kluczy
+        self.outbound = self._flights(
+            "from",
+            Flight.from_airport,
+            {(p.from_location, p.date_from) for p in queries},
+        )
+        self.returns = self._flights(
+            "to",
+            Flight.to_airport,
+            {(p.from_location, p.date_to) for p in queries},
+        )
+
+        destinations = {
+            f.to_airport
+            for p in queries
+            for f in self.outbound_for(p)
+        }
+
+        # hotele bez filtrow - filtry kazdego zapytania stosowane w pamieci
+        if self.snapshot is not None:
+            self.hotels_by_city = {c: self.snapshot.hotels.get(c) for c in destinations}
+            self.transfers_by_city = {c: self.snapshot.transfers.get(c) for c in destinations}
+        else:
+            self.hotels_by_city = group_by(
+                db.scalars(
+                    select(Hotel).where(Hotel.location.in_(destinations)).order_by(Hotel.id)
+                ).all(),
+                "location",
+            )
+            self.transfers_by_city = group_by(
+                db.scalars(
+                    select(Transfer)
+                    .where(
+                        Transfer.location.in_(destinations),
+                        Transfer.available.is_(True),
+                    )
+                    .order_by(Transfer.id)
+                ).all(),
+                "location",
+            )
+
+        self._hotels: Dict[int, Dict[str, List]] = {}
+        for i, p in enumerate(queries):
+            self._hotels[i] = self.hotels_for(p)
+
+        # dostepnosc - jedno zapytanie o okna wszystkich kandydatow
+        candidates = set()
+        for city_hotels in self._hotels.values():
+            candidates |= candidate_hotel_ids(city_hotels)
+
+        self.availability = get_availability_windows(
+            db=db,
+            hotel_ids=candidates,
+            guests=min(p.guests for p in queries),
+            latest_start=max(p.date_from for p in queries),
+            earliest_end=min(p.date_to for p in queries),
+        )
+
+    def _flights(self, direction: str, airport_column, keys) -> Dict[Tuple, List]:
+        if self.snapshot is not None:
+            return {key: self.snapshot.flights.get((direction, *key)) for key in keys}
+
+        flights = self.db.scalars(
+            select(Flight)
+            .where(
+                tuple_(airport_column, Flight.date).in_(list(keys)),
+                Flight.status == "SCHEDULED",
+            )
+            .order_by(Flight.id)
+        ).all()
+
+        grouped: Dict[Tuple, List] = {}
+        for f in flights:
+            grouped.setdefault((getattr(f, airport_column.key), f.date), []).append(f)
+        return grouped
+
+    def outbound_for(self, prefs: SearchPreferences) -> List:
+        flights = self.outbound.get((prefs.from_location, prefs.date_from), [])
+        if prefs.to_location:
+            flights = [f for f in flights if f.to_airport == prefs.to_location]
+        return flights
+
+    def hotels_for(self, prefs: SearchPreferences) -> Dict[str, List]:
+        destinations = {f.to_airport for f in self.outbound_for(prefs)}
+
+        hotels_by_city: Dict[str, List] = {}
+        for city in destinations:
+            city_hotels = [
+                h
+                for h in self.hotels_by_city.get(city, ())
+                if hotel_matches(
+                    h,
+                    prefs.min_hotel_standard,
+                    prefs.require_wifi,
+                    prefs.require_pool,
+                    prefs.require_parking,
+                )
+            ]
+            if city_hotels:
+                hotels_by_city[city] = city_hotels
+
+        return hotels_by_city
+
+    def inventory_for(self, index: int, prefs: SearchPreferences) -> Optional[SearchInventory]:
+        outbound_flights = self.outbound_for(prefs)
+        if not outbound_flights:
+            return None
+
+        destinations = {f.to_airport for f in outbound_flights}
+        hotels_by_city = self._hotels[index]
+
+        available_hotel_ids = self.availability.covering(
+            prefs.date_from,
+            prefs.date_to,
+            prefs.guests,
+            candidate_hotel_ids(hotels_by_city),
+        )
+
+        return SearchInventory(
+            outbound_flights,
+            group_by(self.returns.get((prefs.from_location, prefs.date_to), []), "from_airport"),
+            hotels_by_city,
+            {c: self.transfers_by_city[c] for c in destinations if self.transfers_by_city.get(c)},
+            available_hotel_ids,
+        )
+
+
+def search_stays_batch(
+    db: Session,
+    queries: List[SearchPreferences],
+) -> List[List[ProposedStay]]:
+    """Wyniki w kolejnosci zapytan, kazdy taki jak z search_stays."""
+    results: List[Optional[List[ProposedStay]]] = [None] * len(queries)
+
+    shared = []
+    for i, prefs in enumerate(queries):
+        if prefs.date_flex_days:
+            # okno dat ma wlasne pobieranie wsadowe
+            results[i] = search_stays(db, prefs)
+        else:
+            shared.append((i, prefs))
+
+    if shared:
+        slices = InventorySlices(db, [p for _, p in shared])
+
+        for n, (i, prefs) in enumerate(shared):
+            inventory = slices.inventory_for(n, prefs)
+            results[i] = [] if inventory is None else assemble_stays(prefs, inventory)
+
+    return results
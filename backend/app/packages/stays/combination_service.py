@@ -0,0 +1,570 @@
+from __future__ import annotations
+import heapq
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.schemas.search import SearchPreferences, ProposedStay
+from app.packages.stays.filter_service import nights_between
+from app.packages.metrics.registry import METRICS_ENABLED, count_combinations
+
+
+HOTELS_PER_CITY = 5
+TRANSFERS_PER_CITY = 2
+MAX_CITIES = 5
+MAX_PER_CITY = 2
+OPEN_DESTINATION_LIMIT = 10
+FIXED_DESTINATION_LIMIT = 5
+
+# (zaokraglona cena, [prefiks], indeks lotu wylotowego, powrotnego, hotelu,
+# transferu) - indeksy odtwarzaja kolejnosc generowania, wiec remisy
+# rozstrzygaja sie tak samo jak stabilne sortowanie pelnej listy; prefiks
+# rozroznia kombinacje z roznych przebiegow (np. par dat)
+CombinationKey = Tuple
+
+
+class CityOffer:
+    __slots__ = (
+        "returns",
+        "hotels",
+        "transfers",
+        "min_return",
+        "min_hotel_cost",
+        "min_transfer",
+    )
+
+    def __init__(self, returns, hotels, transfers):
+        # (indeks, cena, obiekt), posortowane rosnaco po cenie
+        self.returns = returns
+        self.hotels = hotels
+        self.transfers = transfers
+
+        self.min_return = returns[0][1]
+        self.min_hotel_cost = hotels[0][1]
+        self.min_transfer = transfers[0][1]
+
+    def lower_bound(self, out_price: float) -> float:
+        # ta sama kolejnosc dodawania co przy cenie kombinacji, zeby
+        # ograniczenie nigdy nie bylo wieksze od ceny ktorejkolwiek z nich
+        return out_price + self.min_return + self.min_hotel_cost + self.min_transfer
+
+
+class SearchInventory:
+    __slots__ = (
+        "outbound_flights",
+        "return_by_city",
+        "hotels_by_city",
+        "transfers_by_city",
+        "available_hotel_ids",
+    )
+
+    def __init__(
+        self,
+        outbound_flights: List,
+        return_by_city: Dict[str, List],
+        hotels_by_city: Dict[str, List],
+        transfers_by_city: Dict[str, List],
+        available_hotel_ids: Set[int],
+    ):
+        self.outbound_flights = outbound_flights
+        self.return_by_city = return_by_city
+        self.hotels_by_city = hotels_by_city
+        self.transfers_by_city = transfers_by_city
+        self.available_hotel_ids = available_hotel_ids
+
+    def city_offers(self, nights: int) -> Dict[str, CityOffer]:
+        return build_city_offers(
+            self.return_by_city,
+            self.hotels_by_city,
+            self.transfers_by_city,
+            self.available_hotel_ids,
+            nights,
+            cities={f.to_airport for f in self.outbound_flights},
+        )
+
+
+class Combination:
+    __slots__ = (
+        "key",
+        "city",
+        "outbound",
+        "return_flight",
+        "hotel",
+        "transfer",
+        "date_from",
+        "date_to",
+    )
+
+    def __init__(self, key, city, outbound, return_flight, hotel, transfer):
+        self.key = key
+        self.city = city
+        self.outbound = outbound
+        self.return_flight = return_flight
+        self.hotel = hotel
+        self.transfer = transfer
+
+        # daty pobytu, gdy roznia sie od dat z preferencji
+        self.date_from = None
+        self.date_to = None
+
+    @property
+    def total_price(self) -> float:
+        return self.key[0]
+
+
+def group_by(rows: List, attr: str) -> Dict:
+    grouped: Dict = {}
+    for row in rows:
+        grouped.setdefault(getattr(row, attr), []).append(row)
+    return grouped
+
+
+def cheapest_hotels(city_hotels: List) -> List:
+    return sorted(
+        city_hotels,
+        key=lambda h: float(h.price_per_night),
+    )[:HOTELS_PER_CITY]
+
+
+def candidate_hotel_ids(hotels_by_city: Dict[str, List]) -> Set[int]:
+    """Hotele, ktorych dostepnosc w ogole ma znaczenie dla wyniku."""
+    return {
+        h.id
+        for city_hotels in hotels_by_city.values()
+        for h in cheapest_hotels(city_hotels)
+    }
+
+
+def build_city_offers(
+    return_by_city: Dict[str, List],
+    hotels_by_city: Dict[str, List],
+    transfers_by_city: Dict[str, List],
+    available_hotel_ids: Set[int],
+    nights: int,
+    cities: Optional[Iterable[str]] = None,
+) -> Dict[str, CityOffer]:
+    offers: Dict[str, CityOffer] = {}
+
+    for city in cities if cities is not None else hotels_by_city.keys():
+        if city not in hotels_by_city:
+            continue
+        if city not in transfers_by_city:
+            continue
+        if city not in return_by_city:
+            continue
+
+        city_hotels = cheapest_hotels(hotels_by_city[city])
+
+        hotels = [
+            (i, float(h.price_per_night) * nights, h)
+            for i, h in enumerate(city_hotels)
+            if h.id in available_hotel_ids
+        ]
+        if not hotels:
+            continue
+
+        city_transfers = sorted(
+            transfers_by_city[city],
+            key=lambda t: float(t.price),
+        )[:TRANSFERS_PER_CITY]
+
+        transfers = [(i, float(t.price), t) for i, t in enumerate(city_transfers)]
+
+        returns = sorted(
+            ((i, float(rf.price), rf) for i, rf in enumerate(return_by_city[city])),
+            key=lambda r: r[1],
+        )
+
+        offers[city] = CityOffer(returns, hotels, transfers)
+
+    return offers
+
+
+class _BoundedHeap:
+    """k najlepszych kombinacji; na szczycie najgorsza z zachowanych."""
+
+    __slots__ = ("k", "items")
+
+    def __init__(self, k: int):
+        self.k = k
+        self.items: List[Tuple[Tuple, Combination]] = []
+
+    @property
+    def full(self) -> bool:
+        return len(self.items) >= self.k
+
+    @property
+    def worst_price(self) -> float:
+        return self.items[0][1].key[0]
+
+    def cannot_improve(self, lower_bound: float) -> bool:
+        return self.full and round(lower_bound, 2) > self.worst_price
+
+    def offers(self, key: CombinationKey) -> bool:
+        return not self.full or key < self.items[0][1].key
+
+    def push(self, combination: Combination) -> None:
+        entry = (tuple(-v for v in combination.key), combination)
+        if not self.full:
+            heapq.heappush(self.items, entry)
+        else:
+            heapq.heapreplace(self.items, entry)
+
+    def sorted(self) -> List[Combination]:
+        return sorted((c for _, c in self.items), key=lambda c: c.key)
+
+
+def push_city_combinations(
+    oi: int,
+    out_flight,
+    offer: CityOffer,
+    budget: float,
+    heap: _BoundedHeap,
+    key_prefix: Tuple = (),
+):
+    """Doklada do kopca kombinacje dla jednego lotu wylotowego.
+
+    Galezie, ktorych dolne ograniczenie ceny przekracza budzet albo nie
+    pobije k-tej najlepszej kombinacji, sa pomijane w calosci. Zwraca
+    liczbe wycenionych kombinacji.
+    """
+    out_price = float(out_flight.price)
+    city = out_flight.to_airport
+    priced = 0
+
+    for ri, return_price, return_flight in offer.returns:
+        base = out_price + return_price
+
+        bound = base + offer.min_hotel_cost + offer.min_transfer
+        if bound > budget or heap.cannot_improve(bound):
+            break
+
+        for hi, hotel_cost, hotel in offer.hotels:
+            bound = base + hotel_cost + offer.min_transfer
+            if bound > budget or heap.cannot_improve(bound):
+                break
+
+            for ti, transfer_price, transfer in offer.transfers:
+                total_price = base + hotel_cost + transfer_price
+                priced += 1
+
+                if total_price > budget:
+                    break
+
+                key = (round(total_price, 2), *key_prefix, oi, ri, hi, ti)
+                if not heap.offers(key):
+                    break
+
+                heap.push(
+                    Combination(key, city, out_flight, return_flight, hotel, transfer)
+                )
+
+    count_combinations("priced", priced)
+    return priced
+
+
+def assemble_top_k(
+    outbound_flights: List,
+    offers: Dict[str, CityOffer],
+    budget: float,
+    k: int,
+    key_prefix: Tuple = (),
+) -> List[Combination]:
+    heap = _BoundedHeap(k)
+
+    for oi, out_flight in enumerate(outbound_flights):
+        offer = offers.get(out_flight.to_airport)
+        if offer is None:
+            continue
+
+        bound = offer.lower_bound(float(out_flight.price))
+        if bound > budget or heap.cannot_improve(bound):
+            continue
+
+        push_city_combinations(oi, out_flight, offer, budget, heap, key_prefix)
+
+    return heap.sorted()
+
+
+def top_per_city(
+    outbound_flights: List,
+    offers: Dict[str, CityOffer],
+    budget: float,
+    k: int = MAX_PER_CITY,
+    key_prefix: Tuple = (),
+) -> Dict[str, List[Combination]]:
+    heaps: Dict[str, _BoundedHeap] = {}
+
+    for oi, out_flight in enumerate(outbound_flights):
+        city = out_flight.to_airport
+        offer = offers.get(city)
+        if offer is None:
+            continue
+
+        bound = offer.lower_bound(float(out_flight.price))
+        heap = heaps.setdefault(city, _BoundedHeap(k))
+        if bound > budget or heap.cannot_improve(bound):
+            continue
+
+        push_city_combinations(oi, out_flight, offer, budget, heap, key_prefix)
+
+    return {city: heap.sorted() for city, heap in heaps.items() if heap.items}
+
+
+def cities_by_bound(
+    outbound_flights: List,
+    offers: Dict[str, CityOffer],
+) -> List[Tuple[str, float, List[Tuple[int, object]]]]:
+    """(miasto, dolne ograniczenie ceny, [(indeks, lot wylotowy)]) od
+    najnizszego ograniczenia; indeksy lotow te same co w top_per_city."""
+    by_city: Dict[str, List[Tuple[int, object]]] = {}
+    for oi, out_flight in enumerate(outbound_flights):
+        if out_flight.to_airport in offers:
+            by_city.setdefault(out_flight.to_airport, []).append((oi, out_flight))
+
+    # lower_bound rosnie z cena lotu - wystarczy najtanszy lot miasta
+    cities = [
+        (city, offers[city].lower_bound(min(float(f.price) for _, f in flights)), flights)
+        for city, flights in by_city.items()
+    ]
+    cities.sort(key=lambda c: (c[1], c[0]))
+    return cities
+
+
+def city_top(
+    flights: List[Tuple[int, object]],
+    offer: CityOffer,
+    budget: float,
+    k: int = MAX_PER_CITY,
+) -> List[Combination]:
+    heap = _BoundedHeap(k)
+    for oi, out_flight in flights:
+        bound = offer.lower_bound(float(out_flight.price))
+        if bound > budget or heap.cannot_improve(bound):
+            continue
+
+        push_city_combinations(oi, out_flight, offer, budget, heap)
+
+    return heap.sorted()
+
+
+def iter_top_per_city(
+    outbound_flights: List,
+    offers: Dict[str, CityOffer],
+    budget: float,
+    k: int = MAX_PER_CITY,
+) -> Iterator[Tuple[str, List[Combination]]]:
+    """To samo co top_per_city, ale miasto po miescie.
+
+    Miasta odwiedzane sa od najnizszego dolnego ograniczenia ceny, wiec
+    najtansze propozycje pojawiaja sie najwczesniej. Indeksy lotow w
+    kluczach sa te same co w top_per_city.
+    """
+    for city, bound, flights in cities_by_bound(outbound_flights, offers):
+        if bound > budget:
+            break
+
+        combinations = city_top(flights, offers[city], budget, k)
+        if combinations:
+            yield city, combinations
+
+
+def assemble_open_destination(
+    outbound_flights: List,
+    offers: Dict[str, CityOffer],
+    budget: float,
+) -> List[Combination]:
+    """Wynik bez miasta docelowego - to samo co pick_diverse_cities na
+    top_per_city, ale bez wyceny wszystkich miast.
+
+    Miasta ida od najnizszego dolnego ograniczenia ceny; kazde daje
+    najwyzej MAX_PER_CITY propozycji, a kopiec MAX_CITIES trzyma miasta
+    z najlepsza propozycja. Gdy ograniczenie kolejnego miasta nie pobije
+    najslabszego z nich, zadne dalsze tez nie pobije - koniec.
+    """
+    best_cities = _BoundedHeap(MAX_CITIES)
+    per_city: Dict[str, List[Combination]] = {}
+
+    for city, bound, flights in cities_by_bound(outbound_flights, offers):
+        if bound > budget or best_cities.cannot_improve(bound):
+            break
+
+        combinations = city_top(flights, offers[city], budget)
+        if combinations and best_cities.offers(combinations[0].key):
+            best_cities.push(combinations[0])
+            per_city[city] = combinations
+
+    selected = [c for best in best_cities.sorted() for c in per_city[best.city]]
+    selected.sort(key=lambda c: c.key)
+
+    return selected[:OPEN_DESTINATION_LIMIT]
+
+
+def push_page_combinations(
+    out_flight,
+    offer: CityOffer,
+    budget: float,
+    heap: _BoundedHeap,
+    key_prefix: Tuple,
+    after: Optional[Tuple],
+) -> List[Combination]:
+    """Jak push_city_combinations, ale z kluczem po id zamiast indeksow
+    i tylko dla kombinacji z kluczem wiekszym niz after.
+
+    Galezie, w ktorych nawet najdrozsza kombinacja jest tansza niz
+    after, sa pomijane w calosci.
+    """
+    out_price = float(out_flight.price)
+    max_hotel_cost = offer.hotels[-1][1]
+    max_transfer = offer.transfers[-1][1]
+    pushed = []
+
+    for _, return_price, return_flight in offer.returns:
+        base = out_price + return_price
+
+        bound = base + offer.min_hotel_cost + offer.min_transfer
+        if bound > budget or heap.cannot_improve(bound):
+            break
+        if after is not None and round(base + max_hotel_cost + max_transfer, 2) < after[0]:
+            continue
+
+        for _, hotel_cost, hotel in offer.hotels:
+            bound = base + hotel_cost + offer.min_transfer
+            if bound > budget or heap.cannot_improve(bound):
+                break
+            if after is not None and round(base + hotel_cost + max_transfer, 2) < after[0]:
+                continue
+
+            for _, transfer_price, transfer in offer.transfers:
+                total_price = base + hotel_cost + transfer_price
+
+                if total_price > budget:
+                    break
+
+                key = (
+                    round(total_price, 2),
+                    *key_prefix,
+                    out_flight.id,
+                    return_flight.id,
+                    hotel.id,
+                    transfer.id,
+                )
+                # przy rownej cenie id nie rosna z cena - bez przerywania petli
+                if after is not None and key <= after:
+                    continue
+                if not heap.offers(key):
+                    continue
+
+                combination = Combination(
+                    key, out_flight.to_airport, out_flight, return_flight, hotel, transfer
+                )
+                heap.push(combination)
+                pushed.append(combination)
+
+    return pushed
+
+
+def assemble_page(
+    runs: Iterable[Tuple[date, date, List, Dict[str, CityOffer]]],
+    budget: float,
+    k: int,
+    after: Optional[Tuple] = None,
+) -> List[Combination]:
+    """k pierwszych kombinacji po after w pelnym rankingu.
+
+    runs to (wylot, powrot, loty wylotowe, oferty miast) dla kolejnych par
+    dat. Klucz: (cena, wylot, powrot, id lotu wylotowego, powrotnego,
+    hotelu, transferu) - nie zalezy od kolejnosci wierszy, wiec kursor
+    pozostaje wazny miedzy zapytaniami.
+    """
+    heap = _BoundedHeap(k)
+
+    for date_from, date_to, outbound_flights, offers in runs:
+        key_prefix = (date_from.toordinal(), date_to.toordinal())
+
+        for out_flight in outbound_flights:
+            offer = offers.get(out_flight.to_airport)
+            if offer is None:
+                continue
+
+            bound = offer.lower_bound(float(out_flight.price))
+            if bound > budget or heap.cannot_improve(bound):
+                continue
+
+            for c in push_page_combinations(out_flight, offer, budget, heap, key_prefix, after):
+                c.date_from, c.date_to = date_from, date_to
+
+    return heap.sorted()
+
+
+def pick_diverse_cities(
+    per_city: Iterable[List[Combination]],
+) -> List[Combination]:
+    """Max 5 miast po 2 propozycje, 10 lacznie.
+
+    Miasta w kolejnosci najlepszej propozycji - jak przy przegladaniu
+    posortowanej listy wszystkich kombinacji. Kazda lista musi byc
+    posortowana po kluczu.
+    """
+    city_best = sorted(
+        (combinations[:MAX_PER_CITY] for combinations in per_city if combinations),
+        key=lambda combinations: combinations[0].key,
+    )[:MAX_CITIES]
+
+    selected = [c for combinations in city_best for c in combinations]
+    selected.sort(key=lambda c: c.key)
+
+    return selected[:OPEN_DESTINATION_LIMIT]
+
+
+def to_proposed_stays(
+    combinations: List[Combination],
+    prefs: SearchPreferences,
+) -> List[ProposedStay]:
+    return [
+        ProposedStay(
+            outbound_flight_id=c.outbound.id,
+            return_flight_id=c.return_flight.id,
+            hotel_id=c.hotel.id,
+            transfer_id=c.transfer.id,
+            date_from=c.date_from or prefs.date_from,
+            date_to=c.date_to or prefs.date_to,
+            total_price=c.total_price,
+        )
+        for c in combinations
+    ]
+
+
+def candidate_count(outbound_flights: List, offers: Dict[str, CityOffer]) -> int:
+    """Liczba wszystkich kombinacji przed odcinaniem budzetem i kopcem."""
+    count = 0
+    for out_flight in outbound_flights:
+        offer = offers.get(out_flight.to_airport)
+        if offer is not None:
+            count += len(offer.returns) * len(offer.hotels) * len(offer.transfers)
+    return count
+
+
+def assemble_stays(
+    prefs: SearchPreferences,
+    inventory: SearchInventory,
+) -> List[ProposedStay]:
+    nights = nights_between(prefs.date_from, prefs.date_to)
+    offers = inventory.city_offers(nights)
+    outbound_flights = inventory.outbound_flights
+
+    if METRICS_ENABLED:
+        count_combinations("candidates", candidate_count(outbound_flights, offers))
+
+    #brak miejsca docelowego - propozycje z roznymi miastami
+    if prefs.to_location is None:
+        combinations = assemble_open_destination(outbound_flights, offers, prefs.budget)
+    else:
+        combinations = assemble_top_k(
+            outbound_flights,
+            offers,
+            prefs.budget,
+            FIXED_DESTINATION_LIMIT,
+        )
+
+    count_combinations("returned", len(combinations))
+    return to_proposed_stays(combinations, prefs)
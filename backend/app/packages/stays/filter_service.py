@@ -27,5 +27,25 @@ def apply_hotel_filters(
     return q
 
 
+def hotel_matches(
+    hotel,
+    min_standard: Optional[int],
+    require_wifi: Optional[bool],
+    require_pool: Optional[bool],
+    require_parking: Optional[bool],
+) -> bool:
+    if min_standard is not None and hotel.standard < min_standard:
+        return False
+
+    if require_wifi is True and not hotel.has_wifi:
+        return False
+    if require_pool is True and not hotel.has_pool:
+        return False
+    if require_parking is True and not hotel.has_parking:
+        return False
+
+    return True
+
+
 def nights_between(date_from: date, date_to: date) -> int:
     return max((date_to - date_from).days, 1)
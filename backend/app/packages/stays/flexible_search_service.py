@@ -0,0 +1,184 @@
+from __future__ import annotations
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.schemas.search import SearchPreferences, ProposedStay
+from app.packages.stays.filter_service import nights_between
+from app.packages.metrics.registry import METRICS_ENABLED, count_combinations
+from app.packages.stays.combination_service import (
+    FIXED_DESTINATION_LIMIT,
+    MAX_PER_CITY,
+    CityOffer,
+    Combination,
+    assemble_top_k,
+    build_city_offers,
+    candidate_count,
+    candidate_hotel_ids,
+    group_by,
+    pick_diverse_cities,
+    to_proposed_stays,
+    top_per_city,
+)
+
+from app.external.flights_adapter import (
+    get_outbound_flights_between,
+    get_return_flights_between,
+)
+from app.external.hotels_adapter import get_hotels
+from app.external.availability_adapter import get_availability_windows
+from app.external.transfers_adapter import get_transfers
+
+
+def date_pairs(prefs: SearchPreferences) -> List[Tuple[date, date]]:
+    flex = prefs.date_flex_days
+    shifts = range(-flex, flex + 1)
+
+    pairs = [
+        (prefs.date_from + timedelta(days=a), prefs.date_to + timedelta(days=b))
+        for a in shifts
+        for b in shifts
+    ]
+
+    return [
+        (d, r)
+        for d, r in pairs
+        if r > d or (d, r) == (prefs.date_from, prefs.date_to)
+    ]
+
+
+def iter_date_pair_offers(
+    db: Session,
+    prefs: SearchPreferences,
+) -> Iterator[Tuple[int, date, date, List, Dict[str, CityOffer]]]:
+    """(indeks pary, wylot, powrot, loty wylotowe, oferty miast) dla kazdej
+    pary dat z okna, ktora ma jakiekolwiek oferty.
+
+    Oferta dla calego okna pobierana jest raz (po jednym zapytaniu na
+    rodzaj), a oferty miast dla kazdej pary liczone w pamieci.
+    """
+    pairs = date_pairs(prefs)
+    departures = sorted({d for d, _ in pairs})
+    returns = sorted({r for _, r in pairs})
+
+    # loty wylotowe i powrotne dla calego okna
+    outbound_flights = get_outbound_flights_between(
+        db=db,
+        from_airport=prefs.from_location,
+        first_day=departures[0],
+        last_day=departures[-1],
+        to_airport=prefs.to_location,
+    )
+
+    if not outbound_flights:
+        return
+
+    return_flights = get_return_flights_between(
+        db=db,
+        to_airport=prefs.from_location,
+        first_day=returns[0],
+        last_day=returns[-1],
+    )
+
+    if not return_flights:
+        return
+
+    destinations = {f.to_airport for f in outbound_flights}
+
+    #transfery i hotele nie zaleza od dat
+    transfers = get_transfers(db=db, locations=destinations)
+    if not transfers:
+        return
+
+    hotels = get_hotels(
+        db=db,
+        locations=destinations,
+        min_standard=prefs.min_hotel_standard,
+        require_wifi=prefs.require_wifi,
+        require_pool=prefs.require_pool,
+        require_parking=prefs.require_parking,
+    )
+    if not hotels:
+        return
+
+    transfers_by_city = group_by(transfers, "location")
+    hotels_by_city = group_by(hotels, "location")
+
+    candidates = candidate_hotel_ids(hotels_by_city)
+
+    #dostepnosc - jedno zapytanie o okna dla calego zakresu dat
+    windows = get_availability_windows(
+        db=db,
+        hotel_ids=candidates,
+        guests=prefs.guests,
+        latest_start=departures[-1],
+        earliest_end=returns[0],
+    )
+
+    outbound_by_date = group_by(outbound_flights, "date")
+    return_by_date = group_by(return_flights, "date")
+
+    for pair_index, (d, r) in enumerate(pairs):
+        day_outbound = outbound_by_date.get(d)
+        day_returns = return_by_date.get(r)
+        if not day_outbound or not day_returns:
+            continue
+
+        available_hotel_ids = windows.covering(d, r, prefs.guests, candidates)
+        if not available_hotel_ids:
+            continue
+
+        offers = build_city_offers(
+            group_by(day_returns, "from_airport"),
+            hotels_by_city,
+            transfers_by_city,
+            available_hotel_ids,
+            nights_between(d, r),
+            cities={f.to_airport for f in day_outbound},
+        )
+
+        yield pair_index, d, r, day_outbound, offers
+
+
+def search_stays_flexible(db: Session, prefs: SearchPreferences) -> List[ProposedStay]:
+    """Najtansze pobyty dla wszystkich par dat w oknie +/- date_flex_days.
+
+    Kazda para (wylot, powrot) wyceniana jest w pamieci tak jak
+    pojedyncze wyszukiwanie. Wynik podlega tym samym regulom co zwykle
+    wyszukiwanie (5 najlepszych albo max 5 miast po 2 propozycje).
+    """
+    per_city: Dict[str, List[Combination]] = {}
+    best: List[Combination] = []
+
+    for pair_index, d, r, day_outbound, offers in iter_date_pair_offers(db, prefs):
+        if METRICS_ENABLED:
+            count_combinations("candidates", candidate_count(day_outbound, offers))
+
+        # prefiks klucza: remis w cenie wygrywa wczesniejsza para dat
+        if prefs.to_location is None:
+            found = top_per_city(day_outbound, offers, prefs.budget, key_prefix=(pair_index,))
+            for combinations in found.values():
+                for c in combinations:
+                    c.date_from, c.date_to = d, r
+            for city, combinations in found.items():
+                merged = sorted(per_city.get(city, []) + combinations, key=lambda c: c.key)
+                per_city[city] = merged[:MAX_PER_CITY]
+        else:
+            found = assemble_top_k(
+                day_outbound,
+                offers,
+                prefs.budget,
+                FIXED_DESTINATION_LIMIT,
+                key_prefix=(pair_index,),
+            )
+            for c in found:
+                c.date_from, c.date_to = d, r
+            best = sorted(best + found, key=lambda c: c.key)[:FIXED_DESTINATION_LIMIT]
+
+    #brak miejsca docelowego - propozycje z roznymi miastami
+    if prefs.to_location is None:
+        best = pick_diverse_cities(per_city.values())
+
+    count_combinations("returned", len(best))
+    return to_proposed_stays(best, prefs)
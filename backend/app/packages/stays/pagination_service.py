@@ -0,0 +1,80 @@
+from __future__ import annotations
+import base64
+import hashlib
+import json
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.schemas.search import SearchPreferences, ProposedStay
+from app.packages.stays.filter_service import nights_between
+from app.packages.stays.combination_service import assemble_page, to_proposed_stays
+from app.packages.stays.search_service import load_inventory
+from app.packages.stays.flexible_search_service import iter_date_pair_offers
+from app.packages.stays.search_cache import canonical_key
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _fingerprint(prefs: SearchPreferences) -> str:
+    # kursor z innego zapytania nie moze byc uzyty
+    return hashlib.sha256(repr(canonical_key(prefs)).encode()).hexdigest()[:16]
+
+
+def encode_cursor(prefs: SearchPreferences, key: Tuple) -> str:
+    payload = json.dumps({"q": _fingerprint(prefs), "k": list(key)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(prefs: SearchPreferences, cursor: str) -> Tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        fingerprint, key = payload["q"], payload["k"]
+        if not isinstance(key, list) or len(key) != 7:
+            raise ValueError
+        after = (float(key[0]), *(int(v) for v in key[1:]))
+    except (ValueError, KeyError, TypeError, IndexError, OverflowError):
+        raise InvalidCursor("Malformed cursor") from None
+
+    if fingerprint != _fingerprint(prefs):
+        raise InvalidCursor("Cursor does not belong to this search")
+    return after
+
+
+def search_page(
+    db: Session,
+    prefs: SearchPreferences,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> Tuple[List[ProposedStay], Optional[str]]:
+    """Strona pelnego rankingu kombinacji w budzecie (cena, potem id).
+
+    Bez limitu wynikow i rozrozniania miast - to ta sama lista, z ktorej
+    search_stays bierze 5 / 10 pierwszych. Kazda strona to top-k po
+    kursorze, wiec kolejne strony kosztuja tyle co pierwsza.
+    """
+    after = decode_cursor(prefs, cursor) if cursor else None
+
+    if prefs.date_flex_days:
+        runs = (
+            (d, r, outbound, offers)
+            for _, d, r, outbound, offers in iter_date_pair_offers(db, prefs)
+        )
+    else:
+        inventory = load_inventory(db, prefs)
+        runs = []
+        if inventory is not None:
+            nights = nights_between(prefs.date_from, prefs.date_to)
+            runs.append(
+                (prefs.date_from, prefs.date_to, inventory.outbound_flights, inventory.city_offers(nights))
+            )
+
+    # jedna kombinacja wiecej - czy jest nastepna strona
+    found = assemble_page(runs, prefs.budget, limit + 1, after)
+    page = found[:limit]
+
+    next_cursor = encode_cursor(prefs, page[-1].key) if len(found) > limit else None
+    return to_proposed_stays(page, prefs), next_cursor
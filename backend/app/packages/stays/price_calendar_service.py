@@ -0,0 +1,393 @@
+"""Kalendarz cen: najtanszy pobyt na cel i dzien wylotu.
+
+Tabela price_calendar trzyma dla (lotnisko wylotu, liczba nocy, dzien,
+cel) najtanszy lot tam, lot z powrotem, hotel z wolnym oknem na te noce
+(dla 1 osoby, bez filtrow standardu) i transfer. Komorki sa przeliczane
+per cel i zakres dni - tylko te, ktorych dotyczy zmiana z feedu oferty.
+
+Pusty kalendarz jest budowany w tle po starcie aplikacji (start());
+do tego czasu odczyt konczy sie CalendarNotReady.
+
+Pelne przeliczenie (np. po app.datagen, ktory pisze z pominieciem ORM):
+
+    python -m app.packages.stays.price_calendar_service
+"""
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.entities import Flight, Hotel, PriceCalendar, Transfer
+from app.packages.inventory.changes import Change
+from app.packages.stays.availability_index import AvailabilityIndex
+
+
+def _nights(spec: str) -> Tuple[int, ...]:
+    values = set()
+    for part in spec.split(","):
+        low, _, high = part.strip().partition("-")
+        values.update(range(int(low), int(high or low) + 1))
+    return tuple(sorted(values))
+
+
+# liczby nocy w kalendarzu, np. "2-7" albo "3,5,7,14"
+PRICE_CALENDAR_NIGHTS = _nights(os.getenv("PRICE_CALENDAR_NIGHTS", "2-7"))
+# zmiany zbierane przez tyle sekund przed przeliczeniem w tle
+PRICE_CALENDAR_DEBOUNCE = float(os.getenv("PRICE_CALENDAR_DEBOUNCE", "1"))
+# przerwa przed ponowieniem nieudanej budowy kalendarza
+PRICE_CALENDAR_RETRY = float(os.getenv("PRICE_CALENDAR_RETRY", "5"))
+
+logger = logging.getLogger(__name__)
+
+# zakres dni wylotu (None - wszystkie)
+DateRange = Optional[Tuple[date, date]]
+
+
+class CalendarNotReady(RuntimeError):
+    pass
+
+
+def _merge(ranges: Dict, key, lo: Optional[date], hi: Optional[date]) -> None:
+    if key in ranges and ranges[key] is None:
+        return
+    if lo is None or hi is None:
+        ranges[key] = None
+        return
+    if key in ranges:
+        old_lo, old_hi = ranges[key]
+        lo, hi = min(lo, old_lo), max(hi, old_hi)
+    ranges[key] = (lo, hi)
+
+
+def _cheapest(rows) -> Dict[Tuple[str, date], Tuple[object, int]]:
+    best: Dict[Tuple[str, date], Tuple[object, int]] = {}
+    for id, airport, day, price in rows:
+        key = (airport, day)
+        if key not in best or (price, id) < best[key]:
+            best[key] = (price, id)
+    return best
+
+
+def refresh_destination(db: Session, destination: str, dates: DateRange = None) -> int:
+    """Przelicza komorki celu w zakresie dni wylotu; zwraca liczbe komorek."""
+    nights = PRICE_CALENDAR_NIGHTS
+    min_nights, max_nights = nights[0], nights[-1]
+
+    if db.bind.dialect.name == "postgresql":
+        # rownolegle przeliczenia tego samego celu (inne procesy) po kolei
+        db.execute(select(func.pg_advisory_xact_lock(func.hashtext("price_calendar:" + destination))))
+
+    if dates is None:
+        lo, hi = db.execute(
+            select(func.min(Flight.date), func.max(Flight.date)).where(Flight.to_airport == destination)
+        ).one()
+        clear = delete(PriceCalendar).where(PriceCalendar.destination == destination)
+    else:
+        lo, hi = dates
+        clear = delete(PriceCalendar).where(
+            PriceCalendar.destination == destination,
+            PriceCalendar.date_from.between(lo, hi),
+        )
+    db.execute(clear)
+    if lo is None:
+        return 0
+
+    outbound = _cheapest(db.execute(
+        select(Flight.id, Flight.from_airport, Flight.date, Flight.price).where(
+            Flight.to_airport == destination,
+            Flight.status == "SCHEDULED",
+            Flight.date.between(lo, hi),
+        )
+    ))
+    if not outbound:
+        return 0
+
+    returns = _cheapest(db.execute(
+        select(Flight.id, Flight.to_airport, Flight.date, Flight.price).where(
+            Flight.from_airport == destination,
+            Flight.status == "SCHEDULED",
+            Flight.date.between(lo + timedelta(days=min_nights), hi + timedelta(days=max_nights)),
+        )
+    ))
+    transfer = db.execute(
+        select(Transfer.id, Transfer.price)
+        .where(Transfer.location == destination, Transfer.available.is_(True))
+        .order_by(Transfer.price, Transfer.id)
+        .limit(1)
+    ).first()
+    hotels = db.execute(
+        select(Hotel.id, Hotel.price_per_night)
+        .where(Hotel.location == destination)
+        .order_by(Hotel.price_per_night, Hotel.id)
+    ).all()
+    if not returns or transfer is None or not hotels:
+        return 0
+
+    index = AvailabilityIndex.load_range(
+        db,
+        {id for id, _ in hotels},
+        1,
+        latest_start=hi,
+        earliest_end=lo + timedelta(days=min_nights),
+    )
+
+    # hotel zalezy tylko od (dzien, noce) - wspolny dla wszystkich lotnisk
+    hotel_for: Dict[Tuple[date, int], Optional[Tuple[int, object]]] = {}
+
+    def cheapest_hotel(day: date, n: int):
+        key = (day, n)
+        if key not in hotel_for:
+            start, end = day.toordinal(), day.toordinal() + n
+            hotel_for[key] = next(
+                (
+                    (id, price)
+                    for id, price in hotels
+                    if id in index.hotels and index.hotels[id].covers(start, end, 1)
+                ),
+                None,
+            )
+        return hotel_for[key]
+
+    transfer_id, transfer_price = transfer
+    rows: List[dict] = []
+    for (origin, day), (out_price, out_id) in outbound.items():
+        for n in nights:
+            back = returns.get((origin, day + timedelta(days=n)))
+            if back is None:
+                continue
+            hotel = cheapest_hotel(day, n)
+            if hotel is None:
+                continue
+
+            return_price, return_id = back
+            hotel_id, price_per_night = hotel
+            flights_price = out_price + return_price
+            hotel_price = price_per_night * n
+            rows.append({
+                "origin": origin,
+                "nights": n,
+                "date_from": day,
+                "destination": destination,
+                "outbound_flight_id": out_id,
+                "return_flight_id": return_id,
+                "hotel_id": hotel_id,
+                "transfer_id": transfer_id,
+                "flights_price": flights_price,
+                "hotel_price": hotel_price,
+                "transfer_price": transfer_price,
+                "total_price": flights_price + hotel_price + transfer_price,
+            })
+
+    if rows:
+        db.execute(insert(PriceCalendar), rows)
+    return len(rows)
+
+
+def all_destinations(db: Session) -> List[str]:
+    return db.execute(select(Flight.to_airport).distinct().order_by(Flight.to_airport)).scalars().all()
+
+
+class PriceCalendarRefresher:
+    """Zaleglosci z feedu zmian i ich przeliczanie.
+
+    Watek w tle najpierw buduje pusty kalendarz, potem przelicza zmiany
+    oferty (po PRICE_CALENDAR_DEBOUNCE). Odczyt kalendarza dolicza tylko
+    zaleglosci - widac wlasne zmiany - i nigdy nie buduje calosci.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._destinations: Dict[str, DateRange] = {}
+        self._hotels: Dict[int, DateRange] = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    # feed zmian
+
+    def on_inventory_change(self, changes: List[Change]) -> None:
+        min_nights, max_nights = PRICE_CALENDAR_NIGHTS[0], PRICE_CALENDAR_NIGHTS[-1]
+
+        with self._lock:
+            for change in changes:
+                versions = [change.values]
+                if change.previous:
+                    versions.append({**change.values, **change.previous})
+
+                for values in versions:
+                    if change.table == "flights":
+                        day = values.get("date")
+                        if day is None:
+                            continue
+                        # lot tam do to_airport albo powrot z from_airport
+                        if values.get("to_airport"):
+                            _merge(self._destinations, values["to_airport"], day, day)
+                        if values.get("from_airport"):
+                            _merge(
+                                self._destinations,
+                                values["from_airport"],
+                                day - timedelta(days=max_nights),
+                                day - timedelta(days=min_nights),
+                            )
+                    elif change.table in ("hotels", "transfers"):
+                        if values.get("location"):
+                            _merge(self._destinations, values["location"], None, None)
+                    elif change.table == "hotel_availability":
+                        start, end = values.get("date_from"), values.get("date_to")
+                        if values.get("hotel_id") is None or start is None or end is None:
+                            continue
+                        # okno obejmuje pobyty z wylotem od jego poczatku
+                        _merge(self._hotels, values["hotel_id"], start, end - timedelta(days=min_nights))
+
+            pending = bool(self._destinations or self._hotels)
+
+        if pending:
+            self.start()
+            self._wakeup.set()
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            return bool(self._destinations or self._hotels)
+
+    def start(self) -> None:
+        """Watek w tle - budowa pustego kalendarza i przeliczanie zmian."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="price-calendar", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._ready.is_set():
+            try:
+                with self.session_factory() as db:
+                    self.build_if_empty(db)
+            except Exception:
+                logger.exception("price calendar build failed")
+                time.sleep(PRICE_CALENDAR_RETRY)
+
+        while True:
+            self._wakeup.wait()
+            time.sleep(PRICE_CALENDAR_DEBOUNCE)
+            self._wakeup.clear()
+            try:
+                with self.session_factory() as db:
+                    self.refresh_pending(db)
+            except Exception:
+                logger.exception("price calendar refresh failed")
+
+    # przeliczanie
+
+    def refresh_pending(self, db: Session) -> int:
+        with self._refresh_lock:
+            with self._lock:
+                destinations, self._destinations = self._destinations, {}
+                hotels, self._hotels = self._hotels, {}
+
+            if hotels:
+                locations = db.execute(
+                    select(Hotel.id, Hotel.location).where(Hotel.id.in_(hotels))
+                ).all()
+                for hotel_id, location in locations:
+                    dates = hotels[hotel_id]
+                    _merge(destinations, location, *(dates or (None, None)))
+
+            cells = 0
+            try:
+                for destination, dates in destinations.items():
+                    cells += refresh_destination(db, destination, dates)
+                db.commit()
+            except Exception:
+                db.rollback()
+                # zaleglosci wracaja do kolejki
+                with self._lock:
+                    for destination, dates in destinations.items():
+                        _merge(self._destinations, destination, *(dates or (None, None)))
+                raise
+            return cells
+
+    def rebuild(self, db: Session) -> int:
+        with self._refresh_lock:
+            cells = self._rebuild(db)
+            db.commit()
+            self._ready.set()
+            return cells
+
+    def _rebuild(self, db: Session) -> int:
+        with self._lock:
+            self._destinations.clear()
+            self._hotels.clear()
+
+        db.execute(delete(PriceCalendar))
+        return sum(refresh_destination(db, destination) for destination in all_destinations(db))
+
+    def build_if_empty(self, db: Session) -> int:
+        """Budowa kalendarza, jesli jest pusty - w PostgreSQL jeden proces
+        naraz, kolejne widza juz zbudowany."""
+        with self._refresh_lock:
+            if db.bind.dialect.name == "postgresql":
+                db.execute(select(func.pg_advisory_xact_lock(func.hashtext("price_calendar"))))
+
+            cells = 0
+            if not self._has_cells(db):
+                cells = self._rebuild(db)
+            db.commit()
+            self._ready.set()
+            return cells
+
+    @staticmethod
+    def _has_cells(db: Session) -> bool:
+        return db.execute(select(PriceCalendar.origin).limit(1)).first() is not None
+
+    def ensure_fresh(self, db: Session) -> None:
+        """Przed odczytem: doliczenie zaleglosci. Pusty kalendarz w budowie
+        (watek w tle) - CalendarNotReady; zbudowany przez inny proces jest
+        od razu uzywany."""
+        if not self._ready.is_set():
+            self.start()
+            if not self._has_cells(db):
+                raise CalendarNotReady("Price calendar is still being built")
+            self._ready.set()
+
+        if self.has_pending():
+            self.refresh_pending(db)
+
+
+price_calendar = PriceCalendarRefresher()
+
+
+def read_calendar(
+    db: Session,
+    origin: str,
+    nights: int,
+    date_from: date,
+    date_to: date,
+    destinations: Optional[Sequence[str]] = None,
+) -> List[PriceCalendar]:
+    """Siatka dni x cele jednym zapytaniem po kluczu tabeli."""
+    price_calendar.ensure_fresh(db)
+
+    query = db.query(PriceCalendar).filter(
+        PriceCalendar.origin == origin,
+        PriceCalendar.nights == nights,
+        PriceCalendar.date_from.between(date_from, date_to),
+    )
+    if destinations:
+        query = query.filter(PriceCalendar.destination.in_(destinations))
+
+    return query.order_by(PriceCalendar.date_from, PriceCalendar.destination).all()
+
+
+if __name__ == "__main__":
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        cells = price_calendar.rebuild(db)
+        print(f"price_calendar: {cells} komorek ({time.perf_counter() - started:.1f}s)")
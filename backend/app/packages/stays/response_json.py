@@ -0,0 +1,32 @@
+"""Odpowiedzi wyszukiwarki prosto do bajtow JSON.
+
+Format taki sam jak po response_model + jsonable_encoder w FastAPI, ale bez
+ponownej walidacji i bez przechodzenia modeli w Pythonie. Z orjson
+(opcjonalny) pola modeli ida wprost z __dict__ - dziala dla schematow
+bez aliasow i wlasnych serializerow, jak te w app.schemas.search.
+Bez orjson - serializer pydantic.
+"""
+from __future__ import annotations
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson jest opcjonalne
+    orjson = None
+
+from pydantic import BaseModel
+
+
+def orjson_available() -> bool:
+    return orjson is not None
+
+
+def _fields(obj):
+    if isinstance(obj, BaseModel):
+        return obj.__dict__
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(response: BaseModel) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(response, default=_fields)
+    return response.model_dump_json().encode()
@@ -0,0 +1,402 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Dict, Hashable, Iterable, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.entities import Hotel
+from app.schemas.search import SearchPreferences, ProposedStay
+from app.packages.inventory.changes import Change
+from app.packages.inventory.snapshot import current_inventory_snapshot
+from app.packages.stays.search_service import search_stays
+from app.packages.stays.async_search_service import search_stays_async
+from app.packages.stays.batch_search_service import search_stays_batch
+from app.packages.stays.single_flight import SEARCH_COALESCING_ENABLED, single_flight
+
+
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "1") == "1"
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "30"))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# przyblizony koszt pamieci wpisu - dokladny pomiar obiektow pydantic
+# kosztowalby wiecej niz samo wyszukiwanie
+ENTRY_OVERHEAD_BYTES = 1024
+ITEM_BYTES = 1200
+
+# filtry hoteli dzialaja tylko dla True, wiec False == None
+_BOOLEAN_FILTERS = ("require_wifi", "require_pool", "require_parking")
+
+
+def canonical_key(prefs: SearchPreferences) -> Hashable:
+    """Klucz, pod ktorym rownowazne zapytania daja ten sam wynik."""
+    values = dict(prefs)
+    for name in _BOOLEAN_FILTERS:
+        values[name] = values.get(name) is True
+
+    return tuple(sorted(values.items()))
+
+
+class _Entry:
+    __slots__ = (
+        "key",
+        "items",
+        "expires_at",
+        "size",
+        "destination",
+        "latest_start",
+        "earliest_end",
+        "flight_ids",
+        "hotel_ids",
+        "transfer_ids",
+    )
+
+    def __init__(self, key, prefs: SearchPreferences, items: List[ProposedStay], ttl: float):
+        self.key = key
+        self.items = items
+        self.expires_at = time.monotonic() + ttl
+        self.size = ENTRY_OVERHEAD_BYTES + ITEM_BYTES * len(items)
+
+        # najkrotszy pobyt, jaki moze byc w wyniku (przy date_flex_days
+        # kazda para dat z okna)
+        flex = timedelta(days=prefs.date_flex_days)
+        self.destination = prefs.to_location
+        self.latest_start = prefs.date_from + flex
+        self.earliest_end = prefs.date_to - flex
+
+        self.flight_ids = {i.outbound_flight_id for i in items} | {i.return_flight_id for i in items}
+        self.hotel_ids = {i.hotel_id for i in items}
+        self.transfer_ids = {i.transfer_id for i in items}
+
+    def within(self, start: date, end: date) -> bool:
+        """Czy jakis pobyt z wyniku moze miescic sie w oknie [start, end]."""
+        return self.latest_start >= start and self.earliest_end <= end
+
+
+class SearchCache:
+    """LRU z limitem pamieci i TTL przed search_stays.
+
+    Oprocz TTL wpisy sa usuwane celowo, gdy zmiana oferty moze zmienic
+    wynik: lot przestaje byc SCHEDULED, zmienia sie dostepnosc hotelu
+    albo transferu.
+    """
+
+    def __init__(self, max_bytes: int = SEARCH_CACHE_MAX_BYTES, ttl: float = SEARCH_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._by_flight: Dict[int, Set[Hashable]] = {}
+        self._by_hotel: Dict[int, Set[Hashable]] = {}
+        self._by_transfer: Dict[int, Set[Hashable]] = {}
+        self._by_destination: Dict[Optional[str], Set[Hashable]] = {}
+
+        # zwiekszane przy kazdym uniewaznieniu - wynik liczony w trakcie
+        # uniewazniania moze byc juz nieaktualny i nie trafia do cache
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    # odczyt / zapis
+
+    def get(self, key: Hashable) -> Optional[List[ProposedStay]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.items
+
+    def put(
+        self,
+        key: Hashable,
+        prefs: SearchPreferences,
+        items: List[ProposedStay],
+        generation: Optional[int] = None,
+    ) -> None:
+        entry = _Entry(key, prefs, items, self.ttl)
+        if entry.size > self.max_bytes:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = entry
+            self._bytes += entry.size
+            self._index(entry)
+
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    # indeksy zaleznosci
+
+    def _index(self, entry: _Entry) -> None:
+        for index, ids in (
+            (self._by_flight, entry.flight_ids),
+            (self._by_hotel, entry.hotel_ids),
+            (self._by_transfer, entry.transfer_ids),
+            (self._by_destination, (entry.destination,)),
+        ):
+            for id in ids:
+                index.setdefault(id, set()).add(entry.key)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+        for index, ids in (
+            (self._by_flight, entry.flight_ids),
+            (self._by_hotel, entry.hotel_ids),
+            (self._by_transfer, entry.transfer_ids),
+            (self._by_destination, (entry.destination,)),
+        ):
+            for id in ids:
+                keys = index.get(id)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del index[id]
+
+    def _invalidate(self, keys: Iterable[Hashable]) -> None:
+        self.generation += 1
+        for key in list(keys):
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    # celowe uniewaznianie
+
+    def invalidate_flights(self, flight_ids: Iterable[int]) -> None:
+        with self._lock:
+            for flight_id in flight_ids:
+                self._invalidate(self._by_flight.get(flight_id, ()))
+
+    def invalidate_location(
+        self,
+        location: str,
+        index: Optional[Dict[int, Set[Hashable]]] = None,
+        id: Optional[int] = None,
+        window: Optional[tuple] = None,
+    ) -> None:
+        """Wpisy do danego miasta, wszystkie bez miasta docelowego oraz te,
+        ktorych wynik zawiera obiekt id z indeksu index.
+
+        window=(date_from, date_to) zaweza do pobytow mieszczacych sie w
+        oknie - tylko one moga zalezec od zmienionej dostepnosci.
+        """
+        with self._lock:
+            keys = set(self._by_destination.get(location, ()))
+            keys |= self._by_destination.get(None, set())
+            if index is not None:
+                keys |= index.get(id, set())
+
+            if window is not None:
+                start, end = window
+                keys = {
+                    key
+                    for key in keys
+                    if key in self._entries and self._entries[key].within(start, end)
+                }
+
+            self._invalidate(keys)
+
+    def on_inventory_change(self, changes: List[Change]) -> None:
+        cancelled_flights = set()
+        availability = []
+
+        for change in changes:
+            if change.table == "flights":
+                was_scheduled = change.previous.get("status", change.values.get("status")) == "SCHEDULED"
+                if was_scheduled and (change.deleted or change.values.get("status") != "SCHEDULED"):
+                    cancelled_flights.add(change.id)
+
+            elif change.table == "transfers":
+                for location in {change.values.get("location"), change.previous.get("location")} - {None}:
+                    self.invalidate_location(location, self._by_transfer, change.id)
+
+            elif change.table == "hotels":
+                for location in {change.values.get("location"), change.previous.get("location")} - {None}:
+                    self.invalidate_location(location, self._by_hotel, change.id)
+
+            elif change.table == "hotel_availability":
+                availability.append(change)
+
+        if cancelled_flights:
+            self.invalidate_flights(cancelled_flights)
+
+        if availability:
+            self._invalidate_availability(availability)
+
+    def _invalidate_availability(self, changes: List[Change]) -> None:
+        hotel_ids = {
+            id
+            for change in changes
+            for id in (change.values.get("hotel_id"), change.previous.get("hotel_id"))
+            if id is not None
+        }
+        locations = hotel_locations(hotel_ids)
+
+        for change in changes:
+            for values in (change.values, {**change.values, **change.previous}):
+                hotel_id = values.get("hotel_id")
+                location = locations.get(hotel_id)
+                window = (values.get("date_from"), values.get("date_to"))
+                if None in window:
+                    window = None
+
+                if location is None:
+                    # nie wiadomo, gdzie jest hotel - uniewaznij wszystko w oknie
+                    self._invalidate_window(window)
+                else:
+                    self.invalidate_location(location, self._by_hotel, hotel_id, window)
+
+    def _invalidate_window(self, window: Optional[tuple]) -> None:
+        with self._lock:
+            if window is None:
+                keys = list(self._entries)
+            else:
+                start, end = window
+                keys = [
+                    key
+                    for key, entry in self._entries.items()
+                    if entry.within(start, end)
+                ]
+            self._invalidate(keys)
+
+
+def hotel_locations(hotel_ids: Set[int]) -> Dict[int, str]:
+    if not hotel_ids:
+        return {}
+
+    snapshot = current_inventory_snapshot()
+    if snapshot is not None:
+        found = {
+            id: snapshot.hotels.by_id[id].location
+            for id in hotel_ids
+            if id in snapshot.hotels.by_id
+        }
+        if len(found) == len(hotel_ids):
+            return found
+
+    with SessionLocal() as db:
+        return dict(
+            db.execute(select(Hotel.id, Hotel.location).where(Hotel.id.in_(hotel_ids))).all()
+        )
+
+
+search_cache = SearchCache()
+
+
+def search_stays_cached(db: Session, prefs: SearchPreferences) -> List[ProposedStay]:
+    key = canonical_key(prefs)
+    if SEARCH_CACHE_ENABLED:
+        items = search_cache.get(key)
+        if items is not None:
+            return items
+
+    def compute() -> List[ProposedStay]:
+        generation = search_cache.generation
+        items = search_stays(db, prefs)
+        if SEARCH_CACHE_ENABLED:
+            search_cache.put(key, prefs, items, generation)
+        return items
+
+    # identyczne wyszukiwania w toku czekaja na jedno przeliczenie
+    if SEARCH_COALESCING_ENABLED:
+        return single_flight.do(key, compute)
+    return compute()
+
+
+async def search_stays_cached_async(prefs: SearchPreferences) -> List[ProposedStay]:
+    key = canonical_key(prefs)
+    if SEARCH_CACHE_ENABLED:
+        items = search_cache.get(key)
+        if items is not None:
+            return items
+
+    async def compute() -> List[ProposedStay]:
+        generation = search_cache.generation
+        items = await search_stays_async(prefs)
+        if SEARCH_CACHE_ENABLED:
+            search_cache.put(key, prefs, items, generation)
+        return items
+
+    if SEARCH_COALESCING_ENABLED:
+        return await single_flight.do_async(key, compute)
+    return await compute()
+
+
+def search_stays_batch_cached(
+    db: Session,
+    queries: List[SearchPreferences],
+) -> List[List[ProposedStay]]:
+    """Trafienia z cache, reszta jednym wsadem (search_stays_batch)."""
+    if not SEARCH_CACHE_ENABLED:
+        return search_stays_batch(db, queries)
+
+    keys = [canonical_key(prefs) for prefs in queries]
+    results = [search_cache.get(key) for key in keys]
+
+    # rownowazne zapytania w jednej paczce liczone raz
+    missing: Dict[Hashable, SearchPreferences] = {}
+    for key, prefs, items in zip(keys, queries, results):
+        if items is None:
+            missing.setdefault(key, prefs)
+
+    if missing:
+        generation = search_cache.generation
+        found = dict(zip(missing, search_stays_batch(db, list(missing.values()))))
+        for key, prefs in missing.items():
+            search_cache.put(key, prefs, found[key], generation)
+
+        results = [found[key] if items is None else items for key, items in zip(keys, results)]
+
+    return results
@@ -1,10 +1,16 @@
 from __future__ import annotations
-from typing import List, Dict
+import os
+from typing import Callable, List, Dict, Optional
 
 from sqlalchemy.orm import Session
 
 from app.schemas.search import SearchPreferences, ProposedStay
-from app.packages.stays.filter_service import nights_between
+from app.packages.stays.combination_service import (
+    SearchInventory,
+    assemble_stays,
+    candidate_hotel_ids,
+    group_by,
+)
 
 from app.external.flights_adapter import (
     get_outbound_flights,
@@ -13,9 +19,37 @@ from app.external.flights_adapter import (
 from app.external.hotels_adapter import get_hotels
 from app.external.availability_adapter import get_available_hotels
 from app.external.transfers_adapter import get_transfers
+from app.packages.stays.sql_search_service import search_stays_sql
+from app.packages.stays.vectorized_service import assemble_stays_vectorized
+from app.packages.stays.flexible_search_service import search_stays_flexible
+from app.packages.metrics.registry import span
+
+
+# python (domyslny), sql albo numpy (eksperymentalny, wolniejszy - patrz
+# vectorized_service)
+SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", "python")
+
+
+def search_stays(
+    db: Session,
+    prefs: SearchPreferences,
+    engine: Optional[str] = None,
+) -> List[ProposedStay]:
+    if prefs.date_flex_days:
+        with span("search", engine="flexible"):
+            return search_stays_flexible(db, prefs)
 
+    name = engine or SEARCH_ENGINE
+    try:
+        run = SEARCH_ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown search engine: {name}") from None
 
-def search_stays(db: Session, prefs: SearchPreferences) -> List[ProposedStay]:
+    with span("search", engine=name):
+        return run(db, prefs)
+
+
+def load_inventory(db: Session, prefs: SearchPreferences) -> Optional[SearchInventory]:
     # loty wylotowe
     outbound_flights = get_outbound_flights(
         db=db,
@@ -25,7 +59,7 @@ def search_stays(db: Session, prefs: SearchPreferences) -> List[ProposedStay]:
     )
 
     if not outbound_flights:
-        return []
+        return None
 
     destinations = {f.to_airport for f in outbound_flights}
 
@@ -37,11 +71,9 @@ def search_stays(db: Session, prefs: SearchPreferences) -> List[ProposedStay]:
     )
 
     if not return_flights:
-        return []
+        return None
 
-    return_by_city: Dict[str, List] = {}
-    for rf in return_flights:
-        return_by_city.setdefault(rf.from_airport, []).append(rf)
+    return_by_city = group_by(return_flights, "from_airport")
 
     #transfery
     transfers = get_transfers(
@@ -50,11 +82,9 @@ def search_stays(db: Session, prefs: SearchPreferences) -> List[ProposedStay]:
     )
 
     if not transfers:
-        return []
+        return None
 
-    transfers_by_city: Dict[str, List] = {}
-    for t in transfers:
-        transfers_by_city.setdefault(t.location, []).append(t)
+    transfers_by_city = group_by(transfers, "location")
 
     #hotele i filtry
     hotels = get_hotels(
@@ -67,109 +97,54 @@ def search_stays(db: Session, prefs: SearchPreferences) -> List[ProposedStay]:
     )
 
     if not hotels:
-        return []
+        return None
 
-    hotels_by_city: Dict[str, List] = {}
-    for h in hotels:
-        hotels_by_city.setdefault(h.location, []).append(h)
+    hotels_by_city = group_by(hotels, "location")
 
-    #dostepnosc hotelu
+    #dostepnosc hotelu - tylko dla hoteli, ktore moga trafic do wyniku
     available_hotel_ids = get_available_hotels(
         db=db,
         date_from=prefs.date_from,
         date_to=prefs.date_to,
         guests=prefs.guests,
+        hotel_ids=candidate_hotel_ids(hotels_by_city),
     )
 
     if not available_hotel_ids:
+        return None
+
+    return SearchInventory(
+        outbound_flights,
+        return_by_city,
+        hotels_by_city,
+        transfers_by_city,
+        available_hotel_ids,
+    )
+
+
+def search_stays_python(db: Session, prefs: SearchPreferences) -> List[ProposedStay]:
+    with span("inventory"):
+        inventory = load_inventory(db, prefs)
+    if inventory is None:
         return []
+
     #skladanie kombinacji
-    nights = nights_between(prefs.date_from, prefs.date_to)
-    results: List[ProposedStay] = []
-
-    for out_flight in outbound_flights:
-        city = out_flight.to_airport
-
-        if city not in hotels_by_city:
-            continue
-        if city not in transfers_by_city:
-            continue
-        if city not in return_by_city:
-            continue
-
-        city_hotels = sorted(
-            hotels_by_city[city],
-            key=lambda h: float(h.price_per_night),
-        )[:5]
-
-        city_transfers = sorted(
-            transfers_by_city[city],
-            key=lambda t: float(t.price),
-        )[:2]
-
-        for return_flight in return_by_city[city]:
-            for hotel in city_hotels:
-                if hotel.id not in available_hotel_ids:
-                    continue
-
-                hotel_cost = float(hotel.price_per_night) * nights
-
-                for transfer in city_transfers:
-                    total_price = (
-                        float(out_flight.price)
-                        + float(return_flight.price)
-                        + hotel_cost
-                        + float(transfer.price)
-                    )
-
-                    if total_price > prefs.budget:
-                        continue
-
-                    results.append(
-                        ProposedStay(
-                            outbound_flight_id=out_flight.id,
-                            return_flight_id=return_flight.id,
-                            hotel_id=hotel.id,
-                            transfer_id=transfer.id,
-                            date_from=prefs.date_from,
-                            date_to=prefs.date_to,
-                            total_price=round(total_price, 2),
-                        )
-                    )
-
-                   # if len(results) >= prefs.limit:
-                     #   return sorted(results, key=lambda r: r.total_price)
-
-    #brak miejsca docelowego - propozycje z roznymi miastami
-    results = sorted(results, key=lambda r: r.total_price)
-
-    if prefs.to_location is None:
-        selected: List[ProposedStay] = []
-        cities_used: Dict[str, int] = {}
-
-        flight_city_map = {
-            f.id: f.to_airport for f in outbound_flights
-        }
-
-        for r in results:
-            city = flight_city_map.get(r.outbound_flight_id)
-            if city is None:
-                continue
-
-            if city not in cities_used and len(cities_used) >= 5:
-                continue
-
-            cities_used.setdefault(city, 0)
-            if cities_used[city] >= 2:
-                continue
-
-            selected.append(r)
-            cities_used[city] += 1
-
-            if len(selected) == 10:
-                break
-
-        return selected
-
-    return results[:5]
+    with span("assemble", engine="python"):
+        return assemble_stays(prefs, inventory)
+
+
+def search_stays_numpy(db: Session, prefs: SearchPreferences) -> List[ProposedStay]:
+    with span("inventory"):
+        inventory = load_inventory(db, prefs)
+    if inventory is None:
+        return []
+
+    with span("assemble", engine="numpy"):
+        return assemble_stays_vectorized(prefs, inventory)
+
 
+SEARCH_ENGINES: Dict[str, Callable[[Session, SearchPreferences], List[ProposedStay]]] = {
+    "python": search_stays_python,
+    "sql": search_stays_sql,
+    "numpy": search_stays_numpy,
+}
@@ -0,0 +1,145 @@
+"""Wspolne liczenie identycznych wyszukiwan w toku (single flight).
+
+Pierwsze zapytanie z danym kluczem liczy wynik, kolejne - synchroniczne
+(watki) i asynchroniczne (petla zdarzen) - czekaja na ten sam
+concurrent.futures.Future i dostaja ten sam wynik albo ten sam wyjatek.
+
+Czekanie na klucz trwa najwyzej SEARCH_COALESCE_TIMEOUT od startu
+liczenia. Po tym czasie czekajacy dostaja CoalescingTimeout, a nowe
+zapytania zaczynaja liczyc od nowa, zamiast dolaczac do zawieszonego.
+"""
+from __future__ import annotations
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+from app.packages.metrics.registry import registry
+
+
+SEARCH_COALESCING_ENABLED = os.getenv("SEARCH_COALESCING_ENABLED", "1") == "1"
+SEARCH_COALESCE_TIMEOUT = float(os.getenv("SEARCH_COALESCE_TIMEOUT", "10"))
+
+COALESCED = registry.counter(
+    "tripplanner_search_coalesced_total",
+    "Wyszukiwania, ktore czekaly na identyczne wyszukiwanie w toku",
+)
+
+T = TypeVar("T")
+
+
+class CoalescingTimeout(TimeoutError):
+    pass
+
+
+class _Call:
+    __slots__ = ("future", "deadline")
+
+    def __init__(self, deadline: float):
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.deadline = deadline
+
+    def remaining(self) -> float:
+        return max(self.deadline - time.monotonic(), 0.0)
+
+
+class SingleFlight:
+    def __init__(self, timeout: float = SEARCH_COALESCE_TIMEOUT):
+        self.timeout = timeout
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def _join(self, key: Hashable, mode: str) -> Tuple[_Call, bool]:
+        """(wywolanie, czy liczymy sami)."""
+        now = time.monotonic()
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and call.deadline > now:
+                self.coalesced += 1
+                COALESCED.inc(mode=mode)
+                return call, False
+
+            call = _Call(now + self.timeout)
+            self._calls[key] = call
+            self.leaders += 1
+            return call, True
+
+    def _finish(self, key: Hashable, call: _Call) -> None:
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+    def _timed_out(self) -> CoalescingTimeout:
+        with self._lock:
+            self.timeouts += 1
+        return CoalescingTimeout(f"Identical search still running after {self.timeout:g}s")
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        call, leader = self._join(key, "sync")
+        if not leader:
+            try:
+                return call.future.result(timeout=call.remaining())
+            except concurrent.futures.TimeoutError:
+                raise self._timed_out() from None
+            except concurrent.futures.CancelledError:
+                # liczacy zostal przerwany - liczymy sami
+                return fn()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, call)
+            call.future.set_exception(e)
+            raise
+
+        self._finish(key, call)
+        call.future.set_result(result)
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call, leader = self._join(key, "async")
+        if not leader:
+            # shield - timeout jednego czekajacego nie anuluje wspolnego Future
+            waiter = asyncio.shield(asyncio.wrap_future(call.future))
+            try:
+                return await asyncio.wait_for(waiter, call.remaining())
+            except asyncio.TimeoutError:
+                raise self._timed_out() from None
+            except (asyncio.CancelledError, concurrent.futures.CancelledError):
+                if not call.future.cancelled():
+                    raise
+                return await fn()
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self._finish(key, call)
+            call.future.cancel()
+            raise
+        except BaseException as e:
+            self._finish(key, call)
+            call.future.set_exception(e)
+            raise
+
+        self._finish(key, call)
+        call.future.set_result(result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "timeout": self.timeout,
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "timeouts": self.timeouts,
+            }
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,215 @@
+from __future__ import annotations
+from typing import List
+
+from sqlalchemy import and_, exists, func, select
+from sqlalchemy.orm import Session
+
+from app.models.entities import Flight, Hotel, HotelAvailability, Transfer
+from app.schemas.search import SearchPreferences, ProposedStay
+from app.packages.stays.filter_service import apply_hotel_filters, nights_between
+from app.packages.stays.combination_service import (
+    HOTELS_PER_CITY,
+    TRANSFERS_PER_CITY,
+    MAX_CITIES,
+    MAX_PER_CITY,
+    OPEN_DESTINATION_LIMIT,
+    FIXED_DESTINATION_LIMIT,
+)
+
+
+def search_stays_sql(db: Session, prefs: SearchPreferences) -> List[ProposedStay]:
+    """Cala wyszukiwarka jako jedno zapytanie SQL (CTE + funkcje okna).
+
+    Zwraca dokladnie te same propozycje co silnik pythonowy: ta sama
+    kolejnosc generowania kombinacji (lot wylotowy, lot powrotny, hotel
+    wg ceny, transfer wg ceny) rozstrzyga remisy w cenie.
+    """
+    nights = nights_between(prefs.date_from, prefs.date_to)
+
+    # loty wylotowe
+    outbound_q = select(
+        Flight.id.label("flight_id"),
+        Flight.to_airport.label("city"),
+        Flight.price.label("price"),
+    ).where(
+        Flight.from_airport == prefs.from_location,
+        Flight.date == prefs.date_from,
+        Flight.status == "SCHEDULED",
+    )
+    if prefs.to_location:
+        outbound_q = outbound_q.where(Flight.to_airport == prefs.to_location)
+    outbound = outbound_q.cte("outbound")
+
+    destinations = select(outbound.c.city)
+
+    # loty powrotne
+    returns = (
+        select(
+            Flight.id.label("flight_id"),
+            Flight.from_airport.label("city"),
+            Flight.price.label("price"),
+        )
+        .where(
+            Flight.to_airport == prefs.from_location,
+            Flight.date == prefs.date_to,
+            Flight.status == "SCHEDULED",
+            Flight.from_airport.in_(destinations),
+        )
+        .cte("returns")
+    )
+
+    # hotele i filtry - 5 najtanszych w miescie, przed sprawdzeniem dostepnosci
+    hotels_q = select(
+        Hotel.id.label("hotel_id"),
+        Hotel.location.label("city"),
+        Hotel.price_per_night.label("price_per_night"),
+        func.row_number()
+        .over(
+            partition_by=Hotel.location,
+            order_by=(Hotel.price_per_night, Hotel.id),
+        )
+        .label("rank"),
+    ).where(Hotel.location.in_(destinations))
+    hotels_q = apply_hotel_filters(
+        hotels_q,
+        prefs.min_hotel_standard,
+        prefs.require_wifi,
+        prefs.require_pool,
+        prefs.require_parking,
+    )
+    hotels = hotels_q.cte("candidate_hotels")
+
+    # transfery - 2 najtansze w miescie
+    transfers = (
+        select(
+            Transfer.id.label("transfer_id"),
+            Transfer.location.label("city"),
+            Transfer.price.label("price"),
+            func.row_number()
+            .over(
+                partition_by=Transfer.location,
+                order_by=(Transfer.price, Transfer.id),
+            )
+            .label("rank"),
+        )
+        .where(
+            Transfer.location.in_(destinations),
+            Transfer.available.is_(True),
+        )
+        .cte("candidate_transfers")
+    )
+
+    # dostepnosc hotelu
+    available = exists().where(
+        HotelAvailability.hotel_id == hotels.c.hotel_id,
+        HotelAvailability.is_available.is_(True),
+        HotelAvailability.max_guests >= prefs.guests,
+        HotelAvailability.date_from <= prefs.date_from,
+        HotelAvailability.date_to >= prefs.date_to,
+    )
+
+    total_price = (
+        outbound.c.price
+        + returns.c.price
+        + hotels.c.price_per_night * nights
+        + transfers.c.price
+    )
+
+    # skladanie kombinacji
+    combinations = (
+        select(
+            outbound.c.flight_id.label("outbound_flight_id"),
+            returns.c.flight_id.label("return_flight_id"),
+            hotels.c.hotel_id.label("hotel_id"),
+            transfers.c.transfer_id.label("transfer_id"),
+            outbound.c.city.label("city"),
+            total_price.label("total_price"),
+            hotels.c.rank.label("hotel_rank"),
+            transfers.c.rank.label("transfer_rank"),
+        )
+        .select_from(
+            outbound.join(returns, returns.c.city == outbound.c.city)
+            .join(
+                hotels,
+                and_(
+                    hotels.c.city == outbound.c.city,
+                    hotels.c.rank <= HOTELS_PER_CITY,
+                ),
+            )
+            .join(
+                transfers,
+                and_(
+                    transfers.c.city == outbound.c.city,
+                    transfers.c.rank <= TRANSFERS_PER_CITY,
+                ),
+            )
+        )
+        .where(available, total_price <= prefs.budget)
+        .cte("combinations")
+    )
+
+    ordering = (
+        combinations.c.total_price,
+        combinations.c.outbound_flight_id,
+        combinations.c.return_flight_id,
+        combinations.c.hotel_rank,
+        combinations.c.transfer_rank,
+    )
+
+    if prefs.to_location is None:
+        stmt = _diverse_destinations(combinations, ordering)
+    else:
+        stmt = (
+            select(combinations)
+            .order_by(*ordering)
+            .limit(FIXED_DESTINATION_LIMIT)
+        )
+
+    return [
+        ProposedStay(
+            outbound_flight_id=row.outbound_flight_id,
+            return_flight_id=row.return_flight_id,
+            hotel_id=row.hotel_id,
+            transfer_id=row.transfer_id,
+            date_from=prefs.date_from,
+            date_to=prefs.date_to,
+            total_price=round(float(row.total_price), 2),
+        )
+        for row in db.execute(stmt)
+    ]
+
+
+def _diverse_destinations(combinations, ordering):
+    # brak miejsca docelowego - max 5 miast, po 2 propozycje, 10 lacznie
+    ranked = select(
+        combinations,
+        func.row_number().over(order_by=ordering).label("position"),
+        func.row_number()
+        .over(partition_by=combinations.c.city, order_by=ordering)
+        .label("city_rank"),
+    ).cte("ranked")
+
+    per_city = (
+        select(
+            ranked,
+            func.min(ranked.c.position)
+            .over(partition_by=ranked.c.city)
+            .label("city_first"),
+        )
+        .where(ranked.c.city_rank <= MAX_PER_CITY)
+        .cte("per_city")
+    )
+
+    cities = select(
+        per_city,
+        func.dense_rank()
+        .over(order_by=per_city.c.city_first)
+        .label("city_order"),
+    ).cte("cities")
+
+    return (
+        select(cities)
+        .where(cities.c.city_order <= MAX_CITIES)
+        .order_by(cities.c.position)
+        .limit(OPEN_DESTINATION_LIMIT)
+    )
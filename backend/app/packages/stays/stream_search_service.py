@@ -0,0 +1,111 @@
+from __future__ import annotations
+import json
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.schemas.search import SearchPreferences, ProposedStay
+from app.packages.stays.filter_service import nights_between
+from app.packages.metrics.registry import METRICS_ENABLED, count_combinations, span
+from app.packages.stays.combination_service import (
+    FIXED_DESTINATION_LIMIT,
+    MAX_PER_CITY,
+    Combination,
+    candidate_count,
+    iter_top_per_city,
+    pick_diverse_cities,
+    to_proposed_stays,
+)
+from app.packages.stays.search_service import load_inventory
+from app.packages.stays.flexible_search_service import search_stays_flexible
+from app.packages.stays.search_cache import (
+    SEARCH_CACHE_ENABLED,
+    canonical_key,
+    search_cache,
+)
+
+
+# zdarzenia strumienia:
+#   start        - od razu, zanim zacznie sie pobieranie oferty
+#   provisional  - najtansza propozycja kolejnego miasta (moze nie trafic do wyniku)
+#   result       - ostateczny wynik, w kolejnosci rankingu (pole rank)
+#   end          - koniec, count = liczba wynikow
+Event = Tuple[str, dict]
+
+
+def _item(stay: ProposedStay) -> dict:
+    return stay.model_dump(mode="json")
+
+
+def _results(items: List[ProposedStay]) -> Iterator[Event]:
+    for rank, stay in enumerate(items):
+        yield "result", {"rank": rank, "item": _item(stay)}
+    yield "end", {"count": len(items)}
+
+
+def stream_search_events(db: Session, prefs: SearchPreferences) -> Iterator[Event]:
+    """Wyszukiwanie jako ciag zdarzen.
+
+    Ostateczne wyniki sa takie same jak z search_stays; przed nimi
+    przychodza tymczasowe propozycje miasto po miescie, od najtanszych.
+    """
+    yield "start", {}
+
+    key = canonical_key(prefs)
+    if SEARCH_CACHE_ENABLED:
+        items = search_cache.get(key)
+        if items is not None:
+            yield from _results(items)
+            return
+    generation = search_cache.generation
+
+    if prefs.date_flex_days:
+        items = search_stays_flexible(db, prefs)
+    else:
+        items = []
+        with span("inventory"):
+            inventory = load_inventory(db, prefs)
+
+        if inventory is not None:
+            offers = inventory.city_offers(nights_between(prefs.date_from, prefs.date_to))
+            if METRICS_ENABLED:
+                count_combinations("candidates", candidate_count(inventory.outbound_flights, offers))
+
+            k = MAX_PER_CITY if prefs.to_location is None else FIXED_DESTINATION_LIMIT
+
+            per_city: Dict[str, List[Combination]] = {}
+            for city, combinations in iter_top_per_city(
+                inventory.outbound_flights,
+                offers,
+                prefs.budget,
+                k,
+            ):
+                per_city[city] = combinations
+                provisional = to_proposed_stays(combinations[:1], prefs)[0]
+                yield "provisional", {"city": city, "item": _item(provisional)}
+
+            if prefs.to_location is None:
+                best = pick_diverse_cities(per_city.values())
+            else:
+                best = sorted(
+                    (c for combinations in per_city.values() for c in combinations),
+                    key=lambda c: c.key,
+                )[:FIXED_DESTINATION_LIMIT]
+
+            count_combinations("returned", len(best))
+            items = to_proposed_stays(best, prefs)
+
+    if SEARCH_CACHE_ENABLED:
+        search_cache.put(key, prefs, items, generation)
+
+    yield from _results(items)
+
+
+def to_ndjson(events: Iterator[Event]) -> Iterator[str]:
+    for event, data in events:
+        yield json.dumps({"event": event, **data}) + "\n"
+
+
+def to_sse(events: Iterator[Event]) -> Iterator[str]:
+    for event, data in events:
+        yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,163 @@
+"""Wycena kombinacji na tensorach numpy (SEARCH_ENGINE=numpy).
+
+Eksperymentalne, niezalecane: liczy cene kazdej kombinacji, a silnik
+pythonowy (combination_service) odcina hotele, powroty i miasta
+ograniczeniami dolnymi ceny i jest przez to okolo 2.5-3 razy szybszy
+(benchmarks/bench_pricing.py). Zostaje do porownan wynikow.
+"""
+from __future__ import annotations
+from typing import Dict, List
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy jest opcjonalne
+    np = None
+
+from app.schemas.search import SearchPreferences, ProposedStay
+from app.packages.stays.filter_service import nights_between
+from app.packages.stays.combination_service import (
+    FIXED_DESTINATION_LIMIT,
+    MAX_PER_CITY,
+    CityOffer,
+    Combination,
+    SearchInventory,
+    pick_diverse_cities,
+    to_proposed_stays,
+)
+
+
+# maksymalna liczba elementow tensora kombinacji liczonego naraz
+MAX_CHUNK_SIZE = 1_000_000
+
+# round(x, 2) moze przesunac cene o pol grosza, wiec kandydaci tuz nad
+# k-ta cena tez moga wygrac po zaokragleniu
+ROUNDING_MARGIN = 0.01
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError(
+            "Wektorowa wycena wymaga pakietu numpy (pip install numpy)"
+        )
+
+
+def _add_candidates(
+    candidates: List[Combination],
+    totals,
+    budget: float,
+    k: int,
+    block: List,
+    offer: CityOffer,
+    return_start: int,
+    hotel_start: int,
+) -> None:
+    flat = totals.ravel()
+    valid = np.flatnonzero(flat <= budget)
+    if valid.size == 0:
+        return
+
+    if valid.size > k:
+        prices = flat[valid]
+        kth = prices[np.argpartition(prices, k - 1)[k - 1]]
+        valid = valid[prices <= kth + ROUNDING_MARGIN]
+
+    positions = np.unravel_index(valid, totals.shape)
+    for i, o, r, h, t in zip(valid.tolist(), *(p.tolist() for p in positions)):
+        oi, out_flight = block[o]
+        ri, _, return_flight = offer.returns[return_start + r]
+        hi, _, hotel = offer.hotels[hotel_start + h]
+        ti, _, transfer = offer.transfers[t]
+
+        key = (round(float(flat[i]), 2), oi, ri, hi, ti)
+        candidates.append(
+            Combination(key, out_flight.to_airport, out_flight, return_flight, hotel, transfer)
+        )
+
+    candidates.sort(key=lambda c: c.key)
+    del candidates[k:]
+
+
+def _city_top_k(
+    flights: List,
+    offer: CityOffer,
+    budget: float,
+    k: int,
+) -> List[Combination]:
+    """k najlepszych kombinacji miasta liczonych na tensorze cen.
+
+    Tensor ma wymiary (lot wylotowy, powrotny, hotel, transfer); sumy
+    liczone sa w tej samej kolejnosci co w petli pythonowej, wiec ceny
+    sa identyczne co do bitu. Loty, powroty i hotele sa dzielone na
+    bloki, tak zeby tensor mial najwyzej MAX_CHUNK_SIZE elementow (poza
+    miastem z wiecej niz MAX_CHUNK_SIZE transferami).
+    """
+    if not (flights and offer.returns and offer.hotels and offer.transfers):
+        return []
+
+    return_prices = np.array([r[1] for r in offer.returns])
+    hotel_costs = np.array([h[1] for h in offer.hotels])
+    transfer_prices = np.array([t[1] for t in offer.transfers])
+
+    hotel_chunk = max(1, MAX_CHUNK_SIZE // transfer_prices.size)
+    hotels = min(hotel_costs.size, hotel_chunk)
+    return_chunk = max(1, MAX_CHUNK_SIZE // (hotels * transfer_prices.size))
+    returns = min(return_prices.size, return_chunk)
+    flight_chunk = max(1, MAX_CHUNK_SIZE // (returns * hotels * transfer_prices.size))
+
+    candidates: List[Combination] = []
+
+    for start in range(0, len(flights), flight_chunk):
+        block = flights[start:start + flight_chunk]
+        out_prices = np.array([float(f.price) for _, f in block])
+
+        for return_start in range(0, return_prices.size, return_chunk):
+            return_block = return_prices[return_start:return_start + return_chunk]
+
+            for hotel_start in range(0, hotel_costs.size, hotel_chunk):
+                hotel_block = hotel_costs[hotel_start:hotel_start + hotel_chunk]
+
+                totals = (
+                    (out_prices[:, None, None, None] + return_block[None, :, None, None])
+                    + hotel_block[None, None, :, None]
+                ) + transfer_prices[None, None, None, :]
+
+                _add_candidates(candidates, totals, budget, k, block, offer, return_start, hotel_start)
+
+    return candidates
+
+
+def assemble_stays_vectorized(
+    prefs: SearchPreferences,
+    inventory: SearchInventory,
+) -> List[ProposedStay]:
+    _require_numpy()
+
+    nights = nights_between(prefs.date_from, prefs.date_to)
+    offers = inventory.city_offers(nights)
+
+    flights_by_city: Dict[str, List] = {}
+    for oi, f in enumerate(inventory.outbound_flights):
+        if f.to_airport in offers:
+            flights_by_city.setdefault(f.to_airport, []).append((oi, f))
+
+    k = MAX_PER_CITY if prefs.to_location is None else FIXED_DESTINATION_LIMIT
+
+    per_city = [
+        _city_top_k(flights, offers[city], prefs.budget, k)
+        for city, flights in flights_by_city.items()
+    ]
+
+    #brak miejsca docelowego - propozycje z roznymi miastami
+    if prefs.to_location is None:
+        combinations = pick_diverse_cities(per_city)
+    else:
+        combinations = sorted(
+            (c for city_combinations in per_city for c in city_combinations),
+            key=lambda c: c.key,
+        )[:FIXED_DESTINATION_LIMIT]
+
+    return to_proposed_stays(combinations, prefs)
@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+
+
+class Alert(BaseModel):
+    id: int
+    stay_id: int
+    news_event_id: Optional[int] = None
+    message: str
+    created_at: datetime
+    read: bool
+
+    class Config:
+        from_attributes = True
+
+
+class AlertPage(BaseModel):
+    items: List[Alert]
+    # None - ostatnia strona
+    next_cursor: Optional[str] = None
+
+
+class UnreadCounts(BaseModel):
+    counts: Dict[int, int]
+    total: int
+
+
+class MarkReadRequest(BaseModel):
+    # konkretne alerty albo wszystkie alerty pobytow
+    ids: Optional[List[int]] = Field(default=None, max_length=1000)
+    stay_ids: Optional[List[int]] = Field(default=None, max_length=1000)
+
+
+class MarkReadResponse(BaseModel):
+    updated: int
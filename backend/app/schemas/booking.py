@@ -1,13 +1,36 @@
-from pydantic import BaseModel
+from datetime import date, datetime
+from typing import Optional
+from pydantic import BaseModel, Field
 
 
 class BookingCreate(BaseModel):
-    stay_id: int
     user_id: int
 
+    # propozycja z wyszukiwarki (ProposedStay)
+    outbound_flight_id: int
+    return_flight_id: int
+    hotel_id: int
+    transfer_id: int
+
+    date_from: date
+    date_to: date
+
+    guests: int = Field(ge=1)
+
+    # token metody platnosci od operatora (nie dane karty)
+    payment_token: Optional[str] = Field(default=None, max_length=200)
+
 
-class BookingRead(BookingCreate):
+class BookingRead(BaseModel):
     id: int
+    user_id: int
+    stay_id: int
+
+    # PENDING -> PROCESSING -> CONFIRMED / FAILED
+    status: str
+    amount: float
+
+    created_at: Optional[datetime] = None
 
     class Config:
-        orm_mode = True
+        from_attributes = True
@@ -17,6 +17,9 @@ class SearchPreferences(BaseModel):
     require_pool: Optional[bool] = None
     require_parking: Optional[bool] = None
 
+    # szukanie w oknie +/- N dni wokol date_from i date_to
+    date_flex_days: int = Field(default=0, ge=0, le=7)
+
 
 class ProposedStay(BaseModel):
     outbound_flight_id: int
@@ -33,3 +36,39 @@ class ProposedStay(BaseModel):
 
 class SearchResponse(BaseModel):
     items: List[ProposedStay]
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[SearchPreferences] = Field(min_length=1, max_length=100)
+
+
+class BatchSearchResponse(BaseModel):
+    results: List[SearchResponse]
+
+
+class SearchPage(BaseModel):
+    items: List[ProposedStay]
+    next_cursor: Optional[str] = None
+
+
+class CalendarCell(BaseModel):
+    destination: str
+    date_from: date
+    nights: int
+
+    outbound_flight_id: int
+    return_flight_id: int
+    hotel_id: int
+    transfer_id: int
+
+    flights_price: float
+    hotel_price: float
+    transfer_price: float
+    total_price: float
+
+    class Config:
+        from_attributes = True
+
+
+class PriceCalendarResponse(BaseModel):
+    cells: List[CalendarCell]
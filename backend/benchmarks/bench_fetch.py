@@ -0,0 +1,137 @@
+"""Adaptery: encje ORM vs rekordy z samych kolumn (ADAPTER_FETCH_MODE).
+
+Dla kazdego punktu skali (dane z app.datagen, jak w bench_search) te same
+zapytania ida przez adaptery i search_stays raz w trybie "orm", raz
+"records" - kazde wywolanie w nowej sesji, jak w zadaniu HTTP. Raport:
+p50/p95, szczyt pamieci na wywolanie i zmiana records wzgledem orm.
+Z katalogu backend (UWAGA - czysci tabele oferty):
+
+    python -m benchmarks.bench_fetch --scales small,medium,large
+    python -m benchmarks.bench_fetch --scales large --keep-data --queries 200
+"""
+from __future__ import annotations
+import argparse
+import time
+from typing import Callable, Dict, List
+
+from app.database import SessionLocal, engine
+from app.datagen import generate, truncate
+from app.schemas.search import SearchPreferences
+from app.packages.inventory import records as records_module
+from app.packages.stays.search_service import search_stays
+from app.external.flights_adapter import get_outbound_flights, get_return_flights
+from app.external.hotels_adapter import get_hotels
+from app.external.transfers_adapter import get_transfers
+from benchmarks.bench_search import SCALES, measure, sample_queries
+
+
+FETCH_MODES = ("orm", "records")
+
+
+def in_session(fn: Callable) -> Callable[[], object]:
+    def call():
+        with SessionLocal() as db:
+            return fn(db)
+    return call
+
+
+def fetch_calls(queries: List[SearchPreferences]) -> Dict[str, List[Callable]]:
+    calls: Dict[str, List[Callable]] = {
+        "adapter.outbound_flights": [],
+        "adapter.return_flights": [],
+        "adapter.hotels": [],
+        "adapter.transfers": [],
+        "search_stays.python": [],
+    }
+
+    with SessionLocal() as db:
+        destinations = [
+            {f.to_airport for f in get_outbound_flights(db, p.from_location, p.date_from, p.to_location)}
+            for p in queries
+        ]
+
+    for p, d in zip(queries, destinations):
+        calls["adapter.outbound_flights"].append(
+            in_session(lambda db, p=p: get_outbound_flights(db, p.from_location, p.date_from, p.to_location))
+        )
+        calls["adapter.return_flights"].append(
+            in_session(lambda db, p=p: get_return_flights(db, p.from_location, p.date_to))
+        )
+        if d:
+            calls["adapter.hotels"].append(
+                in_session(
+                    lambda db, p=p, d=d: get_hotels(
+                        db, d, p.min_hotel_standard, p.require_wifi, p.require_pool, p.require_parking
+                    )
+                )
+            )
+            calls["adapter.transfers"].append(in_session(lambda db, d=d: get_transfers(db, d)))
+        calls["search_stays.python"].append(
+            in_session(lambda db, p=p: search_stays(db, p, engine="python"))
+        )
+
+    return calls
+
+
+def run_scale(name: str, args) -> Dict[str, Dict[str, dict]]:
+    spec = SCALES[name]
+    if not args.keep_data:
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            truncate(conn)
+            counts = generate(conn, spec)
+        print(f"[{name}] dane: {counts} ({time.perf_counter() - started:.1f}s)")
+
+    calls = fetch_calls(sample_queries(spec, args.queries))
+    results: Dict[str, Dict[str, dict]] = {}
+
+    for mode in FETCH_MODES:
+        records_module.ADAPTER_FETCH_MODE = mode
+        for bench, bench_calls in calls.items():
+            if bench_calls:
+                results.setdefault(bench, {})[mode] = measure(bench_calls)
+
+    return results
+
+
+def print_report(name: str, results: Dict[str, Dict[str, dict]]) -> None:
+    print(f"\n== {name} ==")
+    print(
+        f"{'benchmark':<26} {'tryb':<8} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'peak KB':>9} {'p50':>7} {'peak':>7}"
+    )
+
+    for bench, modes in results.items():
+        orm = modes["orm"]
+        for mode, r in modes.items():
+            line = (
+                f"{bench:<26} {mode:<8} {r['n']:>5} {r['p50_ms']:>9.2f} "
+                f"{r['p95_ms']:>9.2f} {r['peak_kb']:>9.0f}"
+            )
+            if mode != "orm" and orm["p50_ms"] > 0 and orm["peak_kb"] > 0:
+                line += (
+                    f" {r['p50_ms'] / orm['p50_ms'] - 1:>+7.0%}"
+                    f" {r['peak_kb'] / orm['peak_kb'] - 1:>+7.0%}"
+                )
+            print(line)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="small,medium", help=f"lista z {', '.join(SCALES)}")
+    parser.add_argument("--queries", type=int, default=100, help="liczba zapytan na skale")
+    parser.add_argument("--keep-data", action="store_true", help="nie generuj danych, uzyj obecnej bazy")
+    args = parser.parse_args()
+
+    scales = [s.strip() for s in args.scales.split(",") if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"nieznane skale: {', '.join(unknown)}")
+
+    for name in scales:
+        print_report(name, run_scale(name, args))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
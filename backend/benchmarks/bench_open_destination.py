@@ -0,0 +1,70 @@
+"""Wyszukiwanie bez miasta docelowego: wszystkie miasta vs ograniczenia.
+
+Porownuje dawne skladanie (top_per_city dla wszystkich miast +
+pick_diverse_cities) z assemble_open_destination na rosnacej liczbie
+miast. Wyniki musza byc identyczne.
+
+Uruchomienie (z katalogu backend, DATABASE_URL musi byc ustawione - baza
+nie jest uzywana, ale wymaga jej import modeli):
+
+    python -m benchmarks.bench_open_destination --cities 50,200,1000
+"""
+from __future__ import annotations
+import argparse
+import random
+
+from app.packages.stays.combination_service import (
+    assemble_open_destination,
+    candidate_count,
+    pick_diverse_cities,
+    top_per_city,
+)
+from benchmarks.bench_pricing import build_inventory, measure
+
+
+def all_cities(outbound_flights, offers, budget):
+    return pick_diverse_cities(top_per_city(outbound_flights, offers, budget).values())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cities", default="50,200,1000,4000")
+    parser.add_argument("--flights", type=int, default=6)
+    parser.add_argument("--returns", type=int, default=6)
+    parser.add_argument("--hotels", type=int, default=20)
+    parser.add_argument("--transfers", type=int, default=3)
+    parser.add_argument("--nights", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=4000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for cities in (int(c) for c in args.cities.split(",")):
+        inventory = build_inventory(
+            random.Random(args.seed),
+            cities,
+            args.flights,
+            args.returns,
+            args.hotels,
+            args.transfers,
+            0.7,
+        )
+        offers = inventory.city_offers(args.nights)
+        flights = inventory.outbound_flights
+
+        expected = all_cities(flights, offers, args.budget)
+        actual = assemble_open_destination(flights, offers, args.budget)
+        if [c.key for c in expected] != [c.key for c in actual]:
+            raise SystemExit(f"Rozne wyniki dla {cities} miast")
+
+        before = measure(lambda: all_cities(flights, offers, args.budget), args.repeat)
+        after = measure(lambda: assemble_open_destination(flights, offers, args.budget), args.repeat)
+        print(
+            f"{cities:>6} miast ({candidate_count(flights, offers):>10} kombinacji): "
+            f"wszystkie miasta {before * 1000:8.2f} ms | "
+            f"ograniczenia {after * 1000:8.2f} ms | x{before / after:5.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Porownanie wyceny kombinacji: petla pythonowa vs numpy.
+
+Silnik numpy jest eksperymentalny - wolniejszy od pythonowego, ktory
+odcina kombinacje ograniczeniami ceny; wyniki musza byc identyczne.
+
+Uruchomienie (z katalogu backend, DATABASE_URL musi byc ustawione - baza
+nie jest uzywana, ale wymaga jej import modeli):
+
+    python -m benchmarks.bench_pricing --cities 200 --flights 6 --returns 6
+"""
+from __future__ import annotations
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from app.schemas.search import SearchPreferences
+from app.packages.stays.combination_service import SearchInventory, assemble_stays
+from app.packages.stays.vectorized_service import assemble_stays_vectorized
+
+
+class Row:
+    __slots__ = ("id", "from_airport", "to_airport", "location", "price", "price_per_night")
+
+    def __init__(self, id, price, from_airport=None, to_airport=None, location=None):
+        self.id = id
+        self.price = price
+        self.price_per_night = price
+        self.from_airport = from_airport
+        self.to_airport = to_airport
+        self.location = location
+
+
+def build_inventory(
+    rnd: random.Random,
+    cities: int,
+    flights: int,
+    returns: int,
+    hotels: int,
+    transfers: int,
+    availability: float,
+) -> SearchInventory:
+    ids = iter(range(1, 10**9))
+    outbound, return_by_city, hotels_by_city, transfers_by_city = [], {}, {}, {}
+    available = set()
+
+    for c in range(cities):
+        city = f"C{c:04d}"
+        for _ in range(flights):
+            outbound.append(Row(next(ids), rnd.randint(150, 900), "WAW", city))
+        return_by_city[city] = [
+            Row(next(ids), rnd.randint(150, 900), city, "WAW") for _ in range(returns)
+        ]
+        hotels_by_city[city] = []
+        for _ in range(hotels):
+            h = Row(next(ids), rnd.randint(80, 400), location=city)
+            hotels_by_city[city].append(h)
+            if rnd.random() < availability:
+                available.add(h.id)
+        transfers_by_city[city] = [
+            Row(next(ids), rnd.randint(20, 120), location=city) for _ in range(transfers)
+        ]
+
+    rnd.shuffle(outbound)
+    return SearchInventory(outbound, return_by_city, hotels_by_city, transfers_by_city, available)
+
+
+def measure(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cities", type=int, default=200)
+    parser.add_argument("--flights", type=int, default=6)
+    parser.add_argument("--returns", type=int, default=6)
+    parser.add_argument("--hotels", type=int, default=20)
+    parser.add_argument("--transfers", type=int, default=3)
+    parser.add_argument("--availability", type=float, default=0.7)
+    parser.add_argument("--budget", type=float, default=4000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    inventory = build_inventory(
+        random.Random(args.seed),
+        args.cities,
+        args.flights,
+        args.returns,
+        args.hotels,
+        args.transfers,
+        args.availability,
+    )
+    start = date(2026, 1, 1)
+
+    for to_location in (None, "C0000"):
+        prefs = SearchPreferences(
+            date_from=start,
+            date_to=start + timedelta(days=5),
+            budget=args.budget,
+            guests=2,
+            from_location="WAW",
+            to_location=to_location,
+        )
+
+        expected = assemble_stays(prefs, inventory)
+        actual = assemble_stays_vectorized(prefs, inventory)
+        if expected != actual:
+            raise SystemExit(f"Rozne wyniki dla to_location={to_location}")
+
+        python_time = measure(lambda: assemble_stays(prefs, inventory), args.repeat)
+        numpy_time = measure(lambda: assemble_stays_vectorized(prefs, inventory), args.repeat)
+
+        label = to_location or "open"
+        print(
+            f"{label:>6}: python {python_time * 1000:8.2f} ms | "
+            f"numpy {numpy_time * 1000:8.2f} ms | "
+            f"x{python_time / numpy_time:5.2f} | wyniki: {len(expected)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
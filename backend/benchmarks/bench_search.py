@@ -0,0 +1,332 @@
+"""Benchmark wyszukiwarki na wygenerowanych danych (app.datagen).
+
+Dla kazdego punktu skali baza jest czyszczona i generowana od nowa, po
+czym mierzone sa:
+  - adaptery (kazde zapytanie osobno) i skladanie kombinacji w pamieci,
+  - search_stays dla kazdego silnika,
+  - odtworzenie logu zapytan POST /search (JSONL, jedno body na linie)
+    przez cala aplikacje.
+
+Raport: p50/p95/p99, przepustowosc i szczyt pamieci (tracemalloc,
+w osobnym przebiegu).
+Wynik mozna zapisac jako baseline i porownac z nim kolejne uruchomienie.
+Z katalogu backend (UWAGA - czysci tabele oferty):
+
+    python -m benchmarks.bench_search --scales small,medium --save-baseline b.json
+    python -m benchmarks.bench_search --scales small,medium --baseline b.json
+    python -m benchmarks.bench_search --make-log log.jsonl --scales medium
+    python -m benchmarks.bench_search --scales medium --log log.jsonl --keep-data
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.database import SessionLocal, engine
+from app.datagen import DataSpec, destination_cities, generate, origin_airports, truncate
+from app.schemas.search import SearchPreferences
+from app.packages.stays import search_cache as search_cache_module
+from app.packages.stays.combination_service import assemble_stays, candidate_hotel_ids, group_by
+from app.packages.stays.search_service import SEARCH_ENGINES, load_inventory, search_stays
+from app.external.flights_adapter import get_outbound_flights, get_return_flights
+from app.external.hotels_adapter import get_hotels
+from app.external.availability_adapter import get_available_hotels
+from app.external.transfers_adapter import get_transfers
+
+
+SCALES: Dict[str, DataSpec] = {
+    "small": DataSpec(seed=1, airports=2, cities=20, days=30, hotels_per_city=10),
+    "medium": DataSpec(seed=1, airports=3, cities=150, days=60, hotels_per_city=30, flights_per_route=3),
+    "large": DataSpec(seed=1, airports=5, cities=400, days=90, hotels_per_city=60, flights_per_route=4),
+}
+
+# wzrost p50 ponad ten ulamek wzgledem baseline to regresja
+REGRESSION_THRESHOLD = 0.15
+
+
+def sample_queries(spec: DataSpec, count: int, seed: int = 7) -> List[SearchPreferences]:
+    rnd = random.Random(seed)
+    origins = origin_airports(spec)
+    cities = destination_cities(spec)
+
+    queries = []
+    for _ in range(count):
+        date_from = spec.base_date + timedelta(days=rnd.randrange(max(spec.days - 8, 1)))
+        queries.append(
+            SearchPreferences(
+                date_from=date_from,
+                date_to=date_from + timedelta(days=rnd.randint(2, 7)),
+                budget=rnd.choice([1500, 2500, 4000, 8000]),
+                guests=rnd.randint(1, 4),
+                from_location=rnd.choice(origins),
+                to_location=rnd.choice(cities) if rnd.random() < 0.3 else None,
+                min_hotel_standard=rnd.choice([None, None, 3, 4]),
+                require_wifi=rnd.choice([None, True]),
+            )
+        )
+    return queries
+
+
+def read_log(path: str) -> List[dict]:
+    """Body zapytan z logu JSONL (samo body albo obiekt z polem body).
+
+    Linie, ktore nie sa poprawnym SearchPreferences, sa pomijane.
+    """
+    bodies, skipped = [], 0
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                body = record.get("body", record) if isinstance(record, dict) else record
+                SearchPreferences(**body)
+            except (ValueError, TypeError, ValidationError):
+                skipped += 1
+                continue
+            bodies.append(body)
+
+    if skipped:
+        print(f"  log: pominieto {skipped} linii, ktore nie sa zapytaniami POST /search")
+    return bodies
+
+
+def write_log(path: str, queries: List[SearchPreferences]) -> None:
+    with open(path, "w") as f:
+        for prefs in queries:
+            f.write(prefs.model_dump_json(exclude_none=True) + "\n")
+
+
+# pomiary
+
+def summarize(timings: List[float], wall: float, peak: int) -> dict:
+    ordered = sorted(timings)
+    if len(ordered) > 1:
+        cuts = statistics.quantiles(ordered, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = ordered[0]
+
+    return {
+        "n": len(ordered),
+        "p50_ms": p50 * 1000,
+        "p95_ms": p95 * 1000,
+        "p99_ms": p99 * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "throughput": len(ordered) / wall if wall else 0.0,
+        "peak_kb": peak / 1024,
+    }
+
+
+def measure(
+    calls: List[Callable[[], object]],
+    concurrency: int = 1,
+    reset: Callable[[], None] = lambda: None,
+) -> dict:
+    """Czasy bez tracemalloc (spowalnia wykonanie), pamiec w drugim
+    przebiegu; reset przywraca stan (np. pusty cache) przed kazdym."""
+    def timed(call):
+        start = time.perf_counter()
+        call()
+        return time.perf_counter() - start
+
+    reset()
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            timings = list(pool.map(timed, calls))
+    else:
+        timings = [timed(call) for call in calls]
+    wall = time.perf_counter() - started
+
+    reset()
+    tracemalloc.start()
+    for call in calls:
+        call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return summarize(timings, wall, peak)
+
+
+def adapter_calls(db, queries: List[SearchPreferences]) -> Dict[str, List[Callable]]:
+    """Wywolania kazdego adaptera z argumentami takimi jak w load_inventory."""
+    calls: Dict[str, List[Callable]] = {
+        "adapter.outbound_flights": [],
+        "adapter.return_flights": [],
+        "adapter.transfers": [],
+        "adapter.hotels": [],
+        "adapter.available_hotels": [],
+        "assemble_stays": [],
+    }
+
+    for prefs in queries:
+        outbound = get_outbound_flights(db, prefs.from_location, prefs.date_from, prefs.to_location)
+        if not outbound:
+            continue
+        destinations = {f.to_airport for f in outbound}
+        hotels_by_city = group_by(
+            get_hotels(
+                db,
+                destinations,
+                prefs.min_hotel_standard,
+                prefs.require_wifi,
+                prefs.require_pool,
+                prefs.require_parking,
+            ),
+            "location",
+        )
+        candidates = candidate_hotel_ids(hotels_by_city)
+
+        calls["adapter.outbound_flights"].append(
+            lambda p=prefs: get_outbound_flights(db, p.from_location, p.date_from, p.to_location)
+        )
+        calls["adapter.return_flights"].append(
+            lambda p=prefs: get_return_flights(db, p.from_location, p.date_to)
+        )
+        calls["adapter.transfers"].append(lambda d=destinations: get_transfers(db, d))
+        calls["adapter.hotels"].append(
+            lambda p=prefs, d=destinations: get_hotels(
+                db, d, p.min_hotel_standard, p.require_wifi, p.require_pool, p.require_parking
+            )
+        )
+        calls["adapter.available_hotels"].append(
+            lambda p=prefs, c=candidates: get_available_hotels(db, p.date_from, p.date_to, p.guests, c)
+        )
+
+        inventory = load_inventory(db, prefs)
+        if inventory is not None:
+            calls["assemble_stays"].append(lambda p=prefs, i=inventory: assemble_stays(p, i))
+
+    return calls
+
+
+def run_scale(name: str, spec: DataSpec, args) -> Dict[str, dict]:
+    if not args.keep_data:
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            truncate(conn)
+            counts = generate(conn, spec)
+        print(f"[{name}] dane: {counts} ({time.perf_counter() - started:.1f}s)")
+
+    results: Dict[str, dict] = {}
+    queries = sample_queries(spec, args.queries)
+
+    with SessionLocal() as db:
+        for bench, calls in adapter_calls(db, queries).items():
+            if calls:
+                results[bench] = measure(calls)
+
+        for engine_name in SEARCH_ENGINES:
+            results[f"search_stays.{engine_name}"] = measure(
+                [lambda p=prefs, e=engine_name: search_stays(db, p, engine=e) for prefs in queries]
+            )
+
+    if args.log:
+        bodies = read_log(args.log)
+    else:
+        bodies = [json.loads(p.model_dump_json()) for p in queries]
+
+    if bodies:
+        # odtworzenie przez cala aplikacje: walidacja, cache, serializacja
+        from app.main import app
+
+        search_cache_module.SEARCH_CACHE_ENABLED = not args.no_cache
+
+        with TestClient(app) as client:
+            def post(body):
+                response = client.post("/search", json=body)
+                response.raise_for_status()
+
+            results["replay.POST /search"] = measure(
+                [lambda b=body: post(b) for body in bodies],
+                concurrency=args.concurrency,
+                reset=search_cache_module.search_cache.clear,
+            )
+
+    return results
+
+
+# raport i baseline
+
+def print_report(results: Dict[str, Dict[str, dict]], baseline: Optional[dict]) -> int:
+    regressions = 0
+
+    for scale, benches in results.items():
+        print(f"\n== {scale} ==")
+        print(f"{'benchmark':<30} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>9} {'peak KB':>9}")
+
+        for bench, r in benches.items():
+            line = (
+                f"{bench:<30} {r['n']:>5} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+                f"{r['p99_ms']:>9.2f} {r['throughput']:>9.1f} {r['peak_kb']:>9.0f}"
+            )
+
+            before = (baseline or {}).get(scale, {}).get(bench)
+            if before and before["p50_ms"] > 0:
+                change = r["p50_ms"] / before["p50_ms"] - 1
+                line += f"  p50 {change:+.0%}"
+                if change > REGRESSION_THRESHOLD:
+                    line += "  REGRESJA"
+                    regressions += 1
+
+            print(line)
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="small", help=f"lista z {', '.join(SCALES)}")
+    parser.add_argument("--queries", type=int, default=100, help="liczba zapytan na skale")
+    parser.add_argument("--log", help="log JSONL z body POST /search do odtworzenia")
+    parser.add_argument("--make-log", help="zapisz wygenerowany log zapytan i zakoncz")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--no-cache", action="store_true", help="odtwarzanie bez cache wynikow")
+    parser.add_argument("--keep-data", action="store_true", help="nie generuj danych, uzyj obecnej bazy")
+    parser.add_argument("--baseline", help="porownaj z zapisanym baseline")
+    parser.add_argument("--save-baseline", help="zapisz wyniki jako baseline")
+    args = parser.parse_args()
+
+    scales = [s.strip() for s in args.scales.split(",") if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"nieznane skale: {', '.join(unknown)}")
+
+    if args.make_log:
+        write_log(args.make_log, sample_queries(SCALES[scales[0]], args.queries))
+        print(f"zapisano {args.queries} zapytan do {args.make_log}")
+        return 0
+
+    results = {name: run_scale(name, SCALES[name], args) for name in scales}
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = print_report(results, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nbaseline zapisany do {args.save_baseline}")
+
+    if regressions:
+        print(f"\n{regressions} regresji p50 > {REGRESSION_THRESHOLD:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""Koszt serializacji odpowiedzi /search na 1000 wynikow.
+
+Porownuje dawna sciezke (jsonable_encoder + JSONResponse), sciezke
+response_model FastAPI (walidacja zwroconego modelu + jsonable_encoder)
+i obecna (app.packages.stays.response_json - z orjson i bez). Wszystkie
+daja te same bajty - jest to sprawdzane przed pomiarem.
+
+Uruchomienie (z katalogu backend, DATABASE_URL musi byc ustawione - baza
+nie jest uzywana, ale wymaga jej import modeli):
+
+    python -m benchmarks.bench_serialize --sizes 10,100,1000
+"""
+from __future__ import annotations
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.schemas.search import ProposedStay, SearchResponse
+from app.packages.stays import response_json
+
+
+def build_response(rnd: random.Random, size: int) -> SearchResponse:
+    start = date(2026, 1, 1)
+    items = []
+    for _ in range(size):
+        date_from = start + timedelta(days=rnd.randrange(60))
+        items.append(
+            ProposedStay(
+                outbound_flight_id=rnd.randrange(1, 10**6),
+                return_flight_id=rnd.randrange(1, 10**6),
+                hotel_id=rnd.randrange(1, 10**5),
+                transfer_id=rnd.randrange(1, 10**4),
+                date_from=date_from,
+                date_to=date_from + timedelta(days=rnd.randint(2, 14)),
+                total_price=round(rnd.uniform(300, 20000), 2),
+            )
+        )
+    return SearchResponse(items=items)
+
+
+def jsonable(response: SearchResponse) -> bytes:
+    return JSONResponse(jsonable_encoder(response)).body
+
+
+def response_model(response: SearchResponse) -> bytes:
+    # jak FastAPI dla zwroconego modelu: walidacja w response_model, potem encoder
+    validated = SearchResponse.model_validate(response.model_dump())
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def fast_pydantic(response: SearchResponse) -> bytes:
+    orjson, response_json.orjson = response_json.orjson, None
+    try:
+        return response_json.dumps(response)
+    finally:
+        response_json.orjson = orjson
+
+
+PATHS = {
+    "jsonable_encoder": jsonable,
+    "response_model": response_model,
+    "dumps (pydantic)": fast_pydantic,
+}
+if response_json.orjson_available():
+    PATHS["dumps (orjson)"] = response_json.dumps
+
+
+def measure(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000", help="liczby wynikow w odpowiedzi")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if not response_json.orjson_available():
+        print("orjson niezainstalowany - tylko sciezka pydantic")
+
+    rnd = random.Random(args.seed)
+    for size in (int(s) for s in args.sizes.split(",")):
+        response = build_response(rnd, size)
+
+        expected = jsonable(response)
+        for name, fn in PATHS.items():
+            if fn(response) != expected:
+                raise SystemExit(f"{name}: inny JSON niz jsonable_encoder")
+
+        baseline = None
+        print(f"\n== {size} wynikow ==")
+        for name, fn in PATHS.items():
+            per_1k = measure(lambda: fn(response), args.repeat) * 1000 / size * 1000
+            baseline = baseline or per_1k
+            print(f"{name:<18} {per_1k:9.2f} ms / 1k wynikow | x{baseline / per_1k:6.2f}")
+
+
+if __name__ == "__main__":
+    main()
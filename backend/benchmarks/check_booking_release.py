@@ -0,0 +1,140 @@
+"""Sprawdza, ze odrzucona platnosc nie zostawia pocietej dostepnosci.
+
+Okno 1-10 listopada, rezerwacja 3-5 odrzucona przez bank, potem
+rezerwacja 2-6 (przez dawne granice podzialu) musi sie udac, a okno
+wrocic do jednego wiersza. Drugi przypadek: czesc odcieta przy
+rezerwacji zostaje w miedzyczasie zajeta - zwolnione noce lacza sie
+tylko z wolnymi oknami, zajete zostaje nietkniete.
+
+Baza SQLite w pamieci (DATABASE_URL musi byc ustawione tylko dla importu
+modeli). Z katalogu backend:
+
+    python -m benchmarks.check_booking_release
+"""
+from __future__ import annotations
+from datetime import date
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import Flight, Hotel, HotelAvailability, Transfer
+from app.schemas.booking import BookingCreate
+from app.packages.booking.db_service import BookingDBService, SoldOut
+from app.packages.booking.payment_queue import PaymentQueue
+
+
+class DecliningPayments:
+    def charge(self, amount_cents: int, payment_method: dict) -> dict:
+        return {"status": "declined", "amount": amount_cents, "reference": None}
+
+
+def nov(day: int) -> date:
+    return date(2026, 11, day)
+
+
+def setup(session_factory) -> dict:
+    with session_factory() as db:
+        hotel = Hotel(name="Check", location="AAA", standard=3, price_per_night=100,
+                      has_wifi=True, has_pool=False, has_parking=False)
+        transfer = Transfer(type="BUS", location="AAA", price=20, available=True)
+        db.add_all([hotel, transfer])
+        db.flush()
+
+        flights = {}
+        for day in range(1, 11):
+            for origin, to in (("WAW", "AAA"), ("AAA", "WAW")):
+                flight = Flight(from_airport=origin, to_airport=to, date=nov(day), price=300, status="SCHEDULED")
+                db.add(flight)
+                flights[(origin, day)] = flight
+
+        db.add(HotelAvailability(hotel_id=hotel.id, date_from=nov(1), date_to=nov(10),
+                                 max_guests=2, is_available=True))
+        db.commit()
+        return {
+            "hotel_id": hotel.id,
+            "transfer_id": transfer.id,
+            "flights": {key: f.id for key, f in flights.items()},
+        }
+
+
+def request(ids: dict, first: int, last: int) -> BookingCreate:
+    return BookingCreate(
+        user_id=1,
+        outbound_flight_id=ids["flights"][("WAW", first)],
+        return_flight_id=ids["flights"][("AAA", last)],
+        hotel_id=ids["hotel_id"],
+        transfer_id=ids["transfer_id"],
+        date_from=nov(first),
+        date_to=nov(last),
+        guests=1,
+    )
+
+
+def free_windows(session_factory, hotel_id: int) -> list:
+    with session_factory() as db:
+        return [
+            (start.day, end.day)
+            for start, end in db.execute(
+                select(HotelAvailability.date_from, HotelAvailability.date_to)
+                .where(HotelAvailability.hotel_id == hotel_id, HotelAvailability.is_available.is_(True))
+                .order_by(HotelAvailability.date_from)
+            )
+        ]
+
+
+def book(session_factory, data: BookingCreate):
+    with session_factory() as db:
+        booking, _ = BookingDBService().create_booking(db, data)
+        return booking.id
+
+
+def check(condition: bool, message: str) -> None:
+    if not condition:
+        raise SystemExit(f"BLAD: {message}")
+    print(f"ok: {message}")
+
+
+def main() -> None:
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    queue = PaymentQueue(session_factory=session_factory, workers=0, payments=DecliningPayments())
+
+    # odrzucona platnosc, potem rezerwacja przez granice podzialu
+    ids = setup(session_factory)
+    declined = book(session_factory, request(ids, 3, 5))
+    check(free_windows(session_factory, ids["hotel_id"]) == [(1, 3), (5, 10)], "rezerwacja tnie okno")
+    queue.process(declined)
+    check(free_windows(session_factory, ids["hotel_id"]) == [(1, 10)], "po odrzuceniu okno 1-10 w calosci")
+    try:
+        book(session_factory, request(ids, 2, 6))
+    except SoldOut:
+        raise SystemExit("BLAD: rezerwacja 2-6 po odrzuceniu 3-5 - SoldOut")
+    check(True, "rezerwacja 2-6 przez dawne granice")
+
+    # czesc po pobycie zajeta w miedzyczasie - laczenie tylko z wolnym sasiadem
+    ids = setup(session_factory)
+    declined = book(session_factory, request(ids, 3, 5))
+    book(session_factory, request(ids, 6, 9))
+    queue.process(declined)
+    windows = free_windows(session_factory, ids["hotel_id"])
+    check(windows == [(1, 6), (9, 10)], f"laczenie z wolnymi czesciami: {windows}")
+    with session_factory() as db:
+        claimed = db.execute(
+            select(HotelAvailability.is_available).where(
+                HotelAvailability.hotel_id == ids["hotel_id"],
+                HotelAvailability.date_from == nov(5),
+                HotelAvailability.date_to == nov(10),
+            )
+        ).scalar_one()
+    check(claimed is False, "okno zajete przez 6-9 nietkniete")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Sprawdza plany zapytan wyszukiwarki - zadne nie moze robic Seq Scan.
+
+Uruchamiane na bazie z duzym seedem (na malych tabelach planner i tak
+wybierze Seq Scan). Z katalogu backend:
+
+    python -m benchmarks.check_query_plans
+
+Zwraca kod 1, jesli ktores zapytanie ktoregokolwiek silnika czyta
+sekwencyjnie jedna z tabel wyszukiwarki.
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+from datetime import date, timedelta
+from typing import Iterator, List, Tuple
+
+from sqlalchemy import event, func, select, text
+
+from app.database import SessionLocal, engine
+from app.models.entities import Flight
+from app.schemas.search import SearchPreferences
+from app.packages.stays.search_service import search_stays
+
+
+SEARCH_TABLES = {"flights", "hotels", "hotel_availability", "transfers"}
+
+# silnik numpy korzysta z tych samych zapytan co pythonowy
+CHECKED_ENGINES = ("python", "sql")
+
+
+def sample_preferences(db, from_location: str | None, date_from: date | None) -> List[SearchPreferences]:
+    if from_location is None:
+        from_location = db.execute(
+            select(Flight.from_airport)
+            .where(Flight.status == "SCHEDULED")
+            .group_by(Flight.from_airport)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).scalar_one()
+
+    if date_from is None:
+        date_from = db.execute(
+            select(func.min(Flight.date)).where(
+                Flight.from_airport == from_location,
+                Flight.status == "SCHEDULED",
+            )
+        ).scalar_one()
+
+    destination = db.execute(
+        select(Flight.to_airport)
+        .where(Flight.from_airport == from_location, Flight.date == date_from)
+        .limit(1)
+    ).scalar_one()
+
+    base = dict(
+        date_from=date_from,
+        date_to=date_from + timedelta(days=5),
+        budget=10_000,
+        guests=2,
+        from_location=from_location,
+    )
+    return [
+        SearchPreferences(**base),
+        SearchPreferences(**base, to_location=destination),
+        SearchPreferences(**base, min_hotel_standard=4, require_wifi=True),
+    ]
+
+
+def captured_statements(db, prefs: SearchPreferences, engine_name: str) -> List[Tuple[str, object]]:
+    statements: List[Tuple[str, object]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        search_stays(db, prefs, engine=engine_name)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    return statements
+
+
+def seq_scans(plan: dict) -> Iterator[str]:
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in SEARCH_TABLES:
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--from-location")
+    parser.add_argument("--date-from", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    failures = 0
+
+    try:
+        for table in sorted(SEARCH_TABLES):
+            db.execute(text(f"ANALYZE {table}"))
+
+        for prefs in sample_preferences(db, args.from_location, args.date_from):
+            for engine_name in CHECKED_ENGINES:
+                for statement, parameters in captured_statements(db, prefs, engine_name):
+                    plan = db.connection().exec_driver_sql(
+                        "EXPLAIN (FORMAT JSON) " + statement,
+                        parameters,
+                    ).scalar_one()
+                    if isinstance(plan, str):
+                        plan = json.loads(plan)
+
+                    tables = sorted(set(seq_scans(plan[0]["Plan"])))
+                    if tables:
+                        failures += 1
+                        print(f"[{engine_name}] Seq Scan on {', '.join(tables)}:")
+                        print("   ", " ".join(statement.split()))
+    finally:
+        db.close()
+
+    if failures:
+        print(f"{failures} zapytan bez indeksu")
+        return 1
+
+    print("OK - wszystkie zapytania uzywaja indeksow")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
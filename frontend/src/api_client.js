@@ -2,3 +2,69 @@ export async function get(url){
   const res = await fetch(url)
   return res.json()
 }
+
+// wyszukiwanie strumieniowe (NDJSON) - onEvent dostaje kazde zdarzenie:
+// start, provisional, result, end
+export async function streamSearch(prefs, onEvent){
+  const res = await fetch('/search/stream', {
+    method: 'POST',
+    headers: {'Content-Type': 'application/json'},
+    body: JSON.stringify(prefs),
+  })
+  if(!res.ok) throw new Error(`search failed: ${res.status}`)
+
+  const reader = res.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+
+  while(true){
+    const {done, value} = await reader.read()
+    if(done) break
+
+    buffer += decoder.decode(value, {stream: true})
+    const lines = buffer.split('\n')
+    buffer = lines.pop()
+    for(const line of lines){
+      if(line) onEvent(JSON.parse(line))
+    }
+  }
+  if(buffer) onEvent(JSON.parse(buffer))
+}
+
+export async function post(url, body){
+  const res = await fetch(url, {
+    method: 'POST',
+    headers: {'Content-Type': 'application/json'},
+    body: JSON.stringify(body),
+  })
+  return res.json()
+}
+
+function stayQuery(stayIds){
+  return (stayIds || []).map(id => `stay_id=${id}`).join('&')
+}
+
+// push alertow (SSE) - zdarzenia alert i unread; EventSource sam wznawia
+// polaczenie z Last-Event-ID. Zwraca funkcje zamykajaca strumien.
+export function subscribeAlerts(stayIds, {onAlert, onUnread}){
+  const source = new EventSource(`/alerts/stream?${stayQuery(stayIds)}`)
+  source.addEventListener('alert', e => onAlert(JSON.parse(e.data)))
+  source.addEventListener('unread', e => onUnread(JSON.parse(e.data)))
+  return () => source.close()
+}
+
+export function markAlertsRead(stayIds){
+  return post('/alerts/read', {stay_ids: stayIds})
+}
+
+// siatka najtanszych pobytow: dzien wylotu x cel, jedno zapytanie
+export function getPriceCalendar({fromLocation, dateFrom, dateTo, nights, destinations}){
+  const params = new URLSearchParams({
+    from_location: fromLocation,
+    date_from: dateFrom,
+    date_to: dateTo,
+    nights,
+  })
+  for(const destination of destinations || []) params.append('destination', destination)
+  return get(`/search/calendar?${params}`)
+}
@@ -1,5 +1,32 @@
-import React from 'react'
+import React, {useEffect, useState} from 'react'
+import {markAlertsRead, subscribeAlerts} from '../../api_client'
+import Button from '../../components/Button'
 
-export default function AlertPopup(){
-  return <div>Alert</div>
+// ostatnie alerty do pokazania
+const VISIBLE = 5
+
+export default function AlertPopup({stayIds}){
+  const [alerts, setAlerts] = useState([])
+  const [unread, setUnread] = useState(0)
+
+  useEffect(() => subscribeAlerts(stayIds, {
+    onAlert: alert => setAlerts(items => [alert, ...items].slice(0, VISIBLE)),
+    onUnread: counts => setUnread(counts.total),
+  }), [(stayIds || []).join(',')])
+
+  async function markRead(){
+    await markAlertsRead(stayIds)
+    setAlerts(items => items.map(alert => ({...alert, read: true})))
+    setUnread(0)
+  }
+
+  if(!unread && !alerts.length) return null
+
+  return (
+    <div>
+      <div>Alert ({unread})</div>
+      {alerts.map(alert => <div key={alert.id}>{alert.message}</div>)}
+      {unread > 0 && <Button onClick={markRead}>Mark read</Button>}
+    </div>
+  )
 }
@@ -1,5 +1,33 @@
-import React from 'react'
+import React, {useState} from 'react'
+import {streamSearch} from '../../api_client'
+import Button from '../../components/Button'
+import StayCard from '../../components/StayCard'
 
-export default function SearchView(){
-  return <div>Search Stays</div>
+export default function SearchView({prefs}){
+  const [provisional, setProvisional] = useState([])
+  const [results, setResults] = useState([])
+  const [done, setDone] = useState(false)
+
+  async function search(){
+    setProvisional([])
+    setResults([])
+    setDone(false)
+
+    await streamSearch(prefs, event => {
+      if(event.event === 'provisional') setProvisional(items => [...items, event.item])
+      if(event.event === 'result') setResults(items => [...items, event.item])
+      if(event.event === 'end') setDone(true)
+    })
+  }
+
+  // tymczasowe propozycje widac, dopoki nie przyjdzie ranking
+  const stays = results.length || done ? results : provisional
+
+  return (
+    <div>
+      <div>Search Stays</div>
+      <Button onClick={search}>Search</Button>
+      {stays.map((stay, i) => <StayCard key={i} stay={stay}/>)}
+    </div>
+  )
 }
@@ -1,6 +1,54 @@
+import argparse
+import asyncio
+import logging
+
+from src.engine import BATCH_SIZE, POLL_INTERVAL, WORKERS, Engine
+from src.scheduler import MONITOR_CONCURRENCY, Scheduler
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Watchdog - alerty dla pobytow z NewsEvent")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    parser.add_argument("--once", action="store_true", help="przetworz zalegle zdarzenia i zakoncz")
+    parser.add_argument("--no-monitors", action="store_true", help="bez odpytywania dostawcow")
+    parser.add_argument("--concurrency", type=int, default=MONITOR_CONCURRENCY)
+    parser.add_argument("--locations", help="stala lista miejsc (domyslnie miejsca pobytow z bazy)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
     print("Watchdog started")
 
+    engine = Engine(
+        batch_size=args.batch_size,
+        poll_interval=args.poll_interval,
+        workers=args.workers,
+    )
+
+    if args.once:
+        events, created = engine.drain()
+        print(f"Processed {events} events, {created} alerts")
+        return
+
+    if args.no_monitors:
+        engine.run()
+        return
+
+    locations = None
+    if args.locations:
+        locations = [l.strip() for l in args.locations.split(",") if l.strip()]
+
+    scheduler = Scheduler(locations=locations, concurrency=args.concurrency)
+
+    engine.start()
+    try:
+        asyncio.run(scheduler.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+
 
 if __name__ == '__main__':
     main()
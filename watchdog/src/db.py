@@ -0,0 +1,75 @@
+import os
+from dotenv import load_dotenv
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    func,
+)
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+
+if not DATABASE_URL:
+    raise RuntimeError("Brak DATABASE_URL w .env")
+
+# polaczenie na kazdy worker silnika (WATCHDOG_WORKERS)
+engine = create_engine(
+    DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=max(5, int(os.getenv("WATCHDOG_WORKERS", "1"))),
+)
+
+
+# schemat nalezy do backendu (migracje alembic w backend/) - tutaj tylko
+# kolumny, ktorych uzywa watchdog
+metadata = MetaData()
+
+news_events = Table(
+    "news_events",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("type", String(30), nullable=False),
+    Column("location", String(100), nullable=False),
+    Column("start_time", DateTime, nullable=False),
+    Column("end_time", DateTime, nullable=False),
+    Column("severity", String(10), nullable=False),
+    Column("processed", Boolean, nullable=False, default=False),
+)
+
+hotels = Table(
+    "hotels",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("location", String(100), nullable=False),
+)
+
+stays = Table(
+    "stays",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("hotel_id", Integer, nullable=False),
+    Column("date_from", Date, nullable=False),
+    Column("date_to", Date, nullable=False),
+    Column("status", String(20), nullable=False),
+)
+
+alerts = Table(
+    "alerts",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("stay_id", Integer, nullable=False),
+    Column("news_event_id", Integer, nullable=True),
+    Column("message", String, nullable=False),
+    Column("created_at", DateTime, server_default=func.now()),
+    Column("read", Boolean, nullable=False, default=False),
+)
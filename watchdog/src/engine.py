@@ -1,3 +1,173 @@
+import logging
+import os
+import threading
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Date, cast, func, insert, select, update
+from sqlalchemy.engine import Connection
+
+from src.db import alerts, engine as default_engine, hotels, news_events, stays
+from src.notifier import notify
+
+
+BATCH_SIZE = int(os.getenv("WATCHDOG_BATCH_SIZE", "100"))
+# przerwa, gdy nie ma zaleglych zdarzen
+POLL_INTERVAL = float(os.getenv("WATCHDOG_POLL_INTERVAL", "5"))
+WORKERS = int(os.getenv("WATCHDOG_WORKERS", "1"))
+
+logger = logging.getLogger("watchdog.engine")
+
+
+def _day(conn: Connection, column):
+    # sqlite: CAST(... AS DATE) zwraca liczbe, date() - tekst jak w kolumnie Date
+    if conn.dialect.name == "sqlite":
+        return func.date(column)
+    return cast(column, Date)
+
+
+def claim_events(conn: Connection, batch_size: int) -> List[int]:
+    """Id nieprzetworzonych zdarzen zablokowanych do konca transakcji.
+
+    SKIP LOCKED - zdarzenia wziete przez inny worker sa pomijane, zamiast
+    czekac na jego commit.
+    """
+    return conn.execute(
+        select(news_events.c.id)
+        .where(~news_events.c.processed)
+        .order_by(news_events.c.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+
+
+def insert_alerts(conn: Connection, event_ids: List[int]) -> int:
+    """Alerty dla pobytow w miejscu zdarzenia, ktore nakladaja sie z nim
+    w czasie - jednym INSERT ... SELECT (ix_hotels_location_price,
+    ix_stays_hotel_dates)."""
+    e, h, s = news_events, hotels, stays
+
+    message = e.c.type + " - " + e.c.location + " (" + e.c.severity + ")"
+
+    affected = (
+        select(s.c.id, e.c.id, message)
+        .select_from(
+            e.join(h, h.c.location == e.c.location).join(s, s.c.hotel_id == h.c.id)
+        )
+        .where(
+            e.c.id.in_(event_ids),
+            s.c.status != "CANCELLED",
+            s.c.date_from <= _day(conn, e.c.end_time),
+            s.c.date_to >= _day(conn, e.c.start_time),
+        )
+    )
+
+    result = conn.execute(
+        insert(alerts).from_select(["stay_id", "news_event_id", "message"], affected)
+    )
+    return result.rowcount
+
+
+def mark_processed(conn: Connection, event_ids: List[int]) -> None:
+    conn.execute(
+        update(news_events)
+        .where(news_events.c.id.in_(event_ids))
+        .values(processed=True)
+    )
+
+
 class Engine:
-    def run(self):
-        print("Engine running")
+    """Przetwarzanie NewsEvent partiami.
+
+    Partia = jedna transakcja: pobranie zdarzen (FOR UPDATE SKIP LOCKED),
+    alerty, oznaczenie processed. Po bledzie wszystko jest wycofywane
+    i zdarzenia wracaja do kolejki. Workery (watki tutaj albo osobne
+    procesy / instancje) nie dziela zdarzen, wiec mozna je dokladac.
+
+    SKIP LOCKED jest tylko w PostgreSQL - na innych bazach dziala jeden worker.
+    """
+
+    def __init__(
+        self,
+        db_engine=default_engine,
+        batch_size: int = BATCH_SIZE,
+        poll_interval: float = POLL_INTERVAL,
+        workers: int = WORKERS,
+    ):
+        self.db_engine = db_engine
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.workers = workers
+        self.stopped = threading.Event()
+        self.threads: List[threading.Thread] = []
+
+        if workers > 1 and db_engine.dialect.name != "postgresql":
+            logger.warning("%s: brak SKIP LOCKED, uruchamiam jeden worker", db_engine.dialect.name)
+            self.workers = 1
+
+    def process_batch(self) -> Tuple[int, int]:
+        """(liczba zdarzen, liczba alertow) z jednej partii."""
+        with self.db_engine.begin() as conn:
+            event_ids = claim_events(conn, self.batch_size)
+            if not event_ids:
+                return 0, 0
+
+            created = insert_alerts(conn, event_ids)
+            mark_processed(conn, event_ids)
+
+        return len(event_ids), created
+
+    def drain(self) -> Tuple[int, int]:
+        """Przetwarza zalegle zdarzenia i konczy (jeden worker)."""
+        events = created = 0
+        while not self.stopped.is_set():
+            batch_events, batch_alerts = self.process_batch()
+            events += batch_events
+            created += batch_alerts
+            if batch_events < self.batch_size:
+                break
+        return events, created
+
+    def _worker(self) -> None:
+        while not self.stopped.is_set():
+            try:
+                events, created = self.process_batch()
+            except Exception:
+                logger.exception("batch failed")
+                self.stopped.wait(self.poll_interval)
+                continue
+
+            if created:
+                notify(f"{created} alerts for {events} events")
+
+            # pelna partia - pewnie sa kolejne, bez czekania
+            if events < self.batch_size:
+                self.stopped.wait(self.poll_interval)
+
+    def start(self) -> List[threading.Thread]:
+        """Uruchamia workery w tle."""
+        self.threads = [
+            threading.Thread(target=self._worker, name=f"watchdog-{n}", daemon=True)
+            for n in range(self.workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+        logger.info("engine running: %d workers, batch %d", self.workers, self.batch_size)
+        return self.threads
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        if stop is not None:
+            self.stopped = stop
+
+        threads = self.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self.stop()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        for thread in self.threads:
+            thread.join()
@@ -0,0 +1,30 @@
+import os
+from datetime import datetime
+from typing import Optional
+
+SEVERITIES = ("LOW", "MEDIUM", "HIGH")
+
+# wspolny timeout zapytan do dostawcow (s)
+HTTP_TIMEOUT = float(os.getenv("MONITOR_HTTP_TIMEOUT", "5"))
+
+
+def make_event(type: str, location: str, start, end, severity: str) -> Optional[dict]:
+    """Wiersz news_events z odpowiedzi dostawcy (None - niepoprawny)."""
+    severity = str(severity).upper()
+    if severity not in SEVERITIES:
+        return None
+
+    try:
+        start_time = start if isinstance(start, datetime) else datetime.fromisoformat(start)
+        end_time = end if isinstance(end, datetime) else datetime.fromisoformat(end)
+    except (TypeError, ValueError):
+        return None
+
+    return {
+        "type": str(type)[:30],
+        "location": location,
+        "start_time": start_time,
+        "end_time": max(start_time, end_time),
+        "severity": severity,
+        "processed": False,
+    }
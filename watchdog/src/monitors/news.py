@@ -1,2 +1,20 @@
-def check_news():
-    return {"headlines": []}
+import os
+from typing import List
+
+import requests
+
+from src.monitors.common import HTTP_TIMEOUT, make_event
+
+NEWS_API_URL = os.getenv("NEWS_API_URL", "http://localhost:8081")
+
+
+def check_news(session: requests.Session, location: str) -> List[dict]:
+    """Zdarzenia (strajki, zamkniete lotniska) dla miejsca."""
+    response = session.get(f"{NEWS_API_URL}/news", params={"location": location}, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+
+    events = (
+        make_event(item.get("type"), location, item.get("start"), item.get("end"), item.get("severity"))
+        for item in response.json().get("events", [])
+    )
+    return [event for event in events if event is not None]
@@ -1,2 +1,20 @@
-def check_weather():
-    return {"status": "ok"}
+import os
+from typing import List
+
+import requests
+
+from src.monitors.common import HTTP_TIMEOUT, make_event
+
+WEATHER_API_URL = os.getenv("WEATHER_API_URL", "http://localhost:8081")
+
+
+def check_weather(session: requests.Session, location: str) -> List[dict]:
+    """Ostrzezenia pogodowe dla miejsca jako zdarzenia WEATHER_ALERT."""
+    response = session.get(f"{WEATHER_API_URL}/weather", params={"location": location}, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+
+    events = (
+        make_event("WEATHER_ALERT", location, item.get("start"), item.get("end"), item.get("severity"))
+        for item in response.json().get("alerts", [])
+    )
+    return [event for event in events if event is not None]
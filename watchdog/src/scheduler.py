@@ -0,0 +1,309 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import insert, select, tuple_
+
+from src.db import engine as default_engine, hotels, news_events, stays
+from src.monitors.news import check_news
+from src.monitors.weather import check_weather
+
+
+# rownolegle zapytania do dostawcow (i rozmiar puli polaczen HTTP)
+MONITOR_CONCURRENCY = int(os.getenv("MONITOR_CONCURRENCY", "20"))
+# interwaly monitorow w sekundach
+NEWS_INTERVAL = float(os.getenv("NEWS_INTERVAL", "300"))
+WEATHER_INTERVAL = float(os.getenv("WEATHER_INTERVAL", "600"))
+# limit zapytan na sekunde na dostawce (0 = bez limitu)
+PROVIDER_RATE = float(os.getenv("PROVIDER_RATE", "10"))
+# +- ulamek interwalu, zeby monitory sie nie synchronizowaly
+MONITOR_JITTER = float(os.getenv("MONITOR_JITTER", "0.1"))
+MAX_BACKOFF = float(os.getenv("MONITOR_MAX_BACKOFF", "3600"))
+# zapis zdarzen: co FLUSH_INTERVAL s albo po FLUSH_SIZE wierszach
+FLUSH_INTERVAL = float(os.getenv("MONITOR_FLUSH_INTERVAL", "5"))
+FLUSH_SIZE = int(os.getenv("MONITOR_FLUSH_SIZE", "500"))
+# co ile odswiezana jest lista obserwowanych miejsc
+LOCATIONS_REFRESH = float(os.getenv("LOCATIONS_REFRESH", "300"))
+
+SEEN_SIZE = 100_000
+
+logger = logging.getLogger("watchdog.scheduler")
+
+Check = Callable[[requests.Session, str], List[dict]]
+
+# dostawca -> (funkcja, interwal)
+PROVIDERS: Dict[str, Tuple[Check, float]] = {
+    "news": (check_news, NEWS_INTERVAL),
+    "weather": (check_weather, WEATHER_INTERVAL),
+}
+
+
+@dataclass
+class Monitor:
+    provider: str
+    location: str
+    check: Check
+    interval: float
+    failures: int = 0
+
+
+class RateLimiter:
+    """Najwyzej rate zapytan na sekunde (rowne odstepy)."""
+
+    def __init__(self, rate: float):
+        self.spacing = 1 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if not self.spacing:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.spacing
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def make_session(pool_size: int) -> requests.Session:
+    """Jedna sesja dla wszystkich monitorow - polaczenia keep-alive
+    z puli zamiast nowego polaczenia na kazde zapytanie."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=len(PROVIDERS), pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def watched_locations(db_engine) -> List[str]:
+    """Miejsca hoteli z aktualnymi, nieanulowanymi pobytami."""
+    with db_engine.connect() as conn:
+        return conn.execute(
+            select(hotels.c.location)
+            .join(stays, stays.c.hotel_id == hotels.c.id)
+            .where(stays.c.status != "CANCELLED", stays.c.date_to >= date.today())
+            .distinct()
+            .order_by(hotels.c.location)
+        ).scalars().all()
+
+
+def _key(event: dict) -> tuple:
+    return event["type"], event["location"], event["start_time"]
+
+
+def insert_events(db_engine, events: List[dict]) -> int:
+    """Zapis partii zdarzen jednym executemany.
+
+    Dostawcy zwracaja to samo zdarzenie przy kazdym odpytaniu - wiersze
+    juz zapisane (type, location, start_time) sa pomijane.
+    """
+    with db_engine.begin() as conn:
+        existing = set(
+            conn.execute(
+                select(news_events.c.type, news_events.c.location, news_events.c.start_time)
+                .where(tuple_(news_events.c.location, news_events.c.start_time).in_(
+                    {(e["location"], e["start_time"]) for e in events}
+                ))
+            ).all()
+        )
+        rows = [e for e in events if _key(e) not in existing]
+        if rows:
+            conn.execute(insert(news_events), rows)
+    return len(rows)
+
+
+class Scheduler:
+    """Monitory (dostawca x miejsce) jako korutyny w jednej petli asyncio.
+
+    Zapytania blokujace (requests) ida do puli watkow o rozmiarze
+    concurrency - tyle samo co semafor i pula polaczen HTTP, wiec liczba
+    watkow nie zalezy od liczby monitorow. Po bledzie interwal monitora
+    rosnie wykladniczo (do max_backoff). Zdarzenia sa zbierane w buforze
+    i zapisywane partiami.
+    """
+
+    def __init__(
+        self,
+        db_engine=default_engine,
+        providers: Dict[str, Tuple[Check, float]] = PROVIDERS,
+        locations: Optional[Iterable[str]] = None,
+        concurrency: int = MONITOR_CONCURRENCY,
+        rate: float = PROVIDER_RATE,
+        jitter: float = MONITOR_JITTER,
+        max_backoff: float = MAX_BACKOFF,
+        flush_interval: float = FLUSH_INTERVAL,
+        flush_size: int = FLUSH_SIZE,
+        locations_refresh: float = LOCATIONS_REFRESH,
+    ):
+        self.db_engine = db_engine
+        self.providers = providers
+        # stala lista miejsc (None - z bazy, odswiezana)
+        self.fixed_locations = list(locations) if locations is not None else None
+        self.concurrency = concurrency
+        self.rate = rate
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.locations_refresh = locations_refresh
+
+        self.session = make_session(concurrency)
+        self.executor = ThreadPoolExecutor(concurrency, thread_name_prefix="monitor")
+
+        self.monitors: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.pending: List[dict] = []
+        self.seen: "OrderedDict[tuple, None]" = OrderedDict()
+        self.stats = {"checks": 0, "failures": 0, "events": 0, "inserted": 0}
+
+    # harmonogram
+
+    def delay(self, monitor: Monitor) -> float:
+        interval = monitor.interval
+        if monitor.failures:
+            interval = min(interval * 2 ** min(monitor.failures, 16), self.max_backoff)
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    async def _sleep(self, seconds: float) -> bool:
+        """Czeka; True, jesli w tym czasie zatrzymano scheduler."""
+        try:
+            await asyncio.wait_for(self.stopped.wait(), timeout=max(seconds, 0))
+            return True
+        except asyncio.TimeoutError:
+            return self.stopped.is_set()
+
+    async def _run_monitor(self, monitor: Monitor) -> None:
+        loop = asyncio.get_running_loop()
+        limiter = self.limiters[monitor.provider]
+
+        # pierwsze odpytanie rozlozone na caly interwal
+        if await self._sleep(random.uniform(0, monitor.interval)):
+            return
+
+        while True:
+            try:
+                async with self.semaphore:
+                    if self.stopped.is_set():
+                        return
+                    await limiter.acquire()
+                    events = await loop.run_in_executor(
+                        self.executor, monitor.check, self.session, monitor.location
+                    )
+            except Exception as exc:
+                monitor.failures += 1
+                self.stats["failures"] += 1
+                logger.warning(
+                    "%s %s failed (%d in a row): %s",
+                    monitor.provider, monitor.location, monitor.failures, exc,
+                )
+            else:
+                monitor.failures = 0
+                self.collect(events)
+
+            self.stats["checks"] += 1
+
+            if await self._sleep(self.delay(monitor)):
+                return
+
+    # zapis zdarzen
+
+    def collect(self, events: List[dict]) -> None:
+        for event in events:
+            key = _key(event)
+            if key in self.seen:
+                continue
+            self.seen[key] = None
+            if len(self.seen) > SEEN_SIZE:
+                self.seen.popitem(last=False)
+            self.pending.append(event)
+            self.stats["events"] += 1
+
+        if len(self.pending) >= self.flush_size:
+            self.flush_soon.set()
+
+    async def flush(self) -> None:
+        if not self.pending:
+            return
+        events, self.pending = self.pending, []
+        loop = asyncio.get_running_loop()
+        try:
+            self.stats["inserted"] += await loop.run_in_executor(None, insert_events, self.db_engine, events)
+        except Exception:
+            logger.exception("insert of %d events failed", len(events))
+            # sprobuj ponownie przy nastepnym zapisie
+            self.pending = events + self.pending
+
+    async def _flusher(self) -> None:
+        while not self.stopped.is_set():
+            try:
+                await asyncio.wait_for(self.flush_soon.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.flush_soon.clear()
+            await self.flush()
+
+    # lista monitorow
+
+    async def sync_monitors(self) -> None:
+        if self.fixed_locations is not None:
+            locations = self.fixed_locations
+        else:
+            loop = asyncio.get_running_loop()
+            locations = await loop.run_in_executor(None, watched_locations, self.db_engine)
+
+        wanted = {(provider, location) for provider in self.providers for location in locations}
+
+        for key in set(self.monitors) - wanted:
+            self.monitors.pop(key).cancel()
+
+        for provider, location in wanted - set(self.monitors):
+            check, interval = self.providers[provider]
+            self.monitors[(provider, location)] = asyncio.create_task(
+                self._run_monitor(Monitor(provider, location, check, interval))
+            )
+
+        logger.info("%d monitors for %d locations", len(self.monitors), len(locations))
+
+    async def _refresher(self) -> None:
+        while not await self._sleep(self.locations_refresh):
+            try:
+                await self.sync_monitors()
+            except Exception:
+                logger.exception("locations refresh failed")
+
+    async def run(self, duration: Optional[float] = None) -> None:
+        self.stopped = asyncio.Event()
+        self.flush_soon = asyncio.Event()
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.limiters = {provider: RateLimiter(self.rate) for provider in self.providers}
+
+        await self.sync_monitors()
+        background = [asyncio.create_task(self._flusher())]
+        if self.fixed_locations is None:
+            background.append(asyncio.create_task(self._refresher()))
+
+        try:
+            if duration is None:
+                await self.stopped.wait()
+            else:
+                await self._sleep(duration)
+        finally:
+            self.stopped.set()
+            tasks = list(self.monitors.values()) + background
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.monitors.clear()
+            await self.flush()
+            self.executor.shutdown(wait=False)
+            self.session.close()
+
+    def stop(self) -> None:
+        self.stopped.set()
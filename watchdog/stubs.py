@@ -0,0 +1,54 @@
+"""Lokalne atrapy dostawcow news / pogody do testow schedulera.
+
+    uvicorn stubs:app --port 8081
+
+Odpowiedzi sa deterministyczne dla (miejsce, dzien). STUB_FAILURE_RATE
+to ulamek zapytan konczonych bledem 503, a STUB_LATENCY_MS to opoznienie
+odpowiedzi.
+"""
+import asyncio
+import os
+import random
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI, HTTPException
+
+STUB_FAILURE_RATE = float(os.getenv("STUB_FAILURE_RATE", "0"))
+STUB_LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "0"))
+
+app = FastAPI(title="watchdog stubs")
+
+
+def _events(kind: str, location: str, types):
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    rng = random.Random(f"{kind}:{location}:{today.date()}")
+
+    events = []
+    for _ in range(rng.randint(0, 2)):
+        start = today + timedelta(hours=rng.randint(0, 14 * 24))
+        events.append({
+            "type": rng.choice(types),
+            "start": start.isoformat(),
+            "end": (start + timedelta(hours=rng.randint(2, 72))).isoformat(),
+            "severity": rng.choice(["LOW", "MEDIUM", "HIGH"]),
+        })
+    return events
+
+
+async def _simulate():
+    if STUB_LATENCY_MS:
+        await asyncio.sleep(STUB_LATENCY_MS / 1000)
+    if random.random() < STUB_FAILURE_RATE:
+        raise HTTPException(status_code=503, detail="stub failure")
+
+
+@app.get("/news")
+async def news(location: str):
+    await _simulate()
+    return {"events": _events("news", location, ["STRIKE", "AIRPORT_CLOSED"])}
+
+
+@app.get("/weather")
+async def weather(location: str):
+    await _simulate()
+    return {"alerts": _events("weather", location, ["STORM"])}